@@ -1,4 +1,5 @@
 from django.contrib import admin
+from core.busqueda import filtro_documento
 from .models import Cliente
 
 
@@ -10,3 +11,8 @@ class ClienteAdmin(admin.ModelAdmin):
     search_fields = ['nombre', 'cedula_nit', 'email']
     readonly_fields = ['fecha_registro']
 
+    def get_search_results(self, request, queryset, search_term):
+        """Busca con los índices de core/busqueda.py (también lo usa el autocompletado del admin)."""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(filtro_documento(Cliente, search_term, 'cedula_nit')), False
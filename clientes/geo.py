@@ -0,0 +1,269 @@
+"""
+Consultas espaciales sobre la ubicación de los clientes (latitud/longitud).
+
+- Cada cliente guarda el geohash de su ubicación (Cliente.geohash), una celda de una
+  cuadrícula jerárquica: los clientes cuyo geohash comparte los primeros n caracteres
+  están en la misma celda de nivel n. El mapa agrupa por ese prefijo en la base de
+  datos y solo envía un marcador por celda (ver clusters_mapa).
+- Los clientes cercanos a un punto se buscan primero en un recuadro (índice sobre
+  latitud/longitud) que se amplía hasta reunir suficientes candidatos, y luego se
+  ordenan por distancia haversine (con NumPy si está instalado).
+"""
+import math
+
+from django.core.cache import cache
+from django.db.models import Avg, Count, Min, Q
+from django.db.models.functions import Substr
+
+from core.utils import get_version_cache, invalidar_version_cache
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy es opcional
+    np = None
+
+# Versión de los datos del mapa; cambia al guardar o eliminar clientes
+MAPA_VERSION_KEY = 'clientes:mapa:version'
+
+# Tiempo máximo de vida de una respuesta del mapa; la invalidación real es por versión
+MAPA_TIMEOUT = 60 * 60
+
+# Caracteres del geohash guardado (~5 m de lado)
+GEOHASH_PRECISION = 9
+
+# Desde este zoom el mapa muestra clientes individuales en lugar de grupos
+ZOOM_MARCADORES = 17
+
+# Zoom máximo admitido (el de Google Maps); valores mayores se tratan como este
+ZOOM_MAXIMO = 22
+
+# Máximo de marcadores individuales por respuesta
+MARCADORES_MAXIMOS = 2000
+
+RADIO_TIERRA_KM = 6371.0088
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def codificar_geohash(latitud, longitud, precision=GEOHASH_PRECISION):
+    """
+    Geohash de una coordenada.
+
+    Returns:
+        str: Geohash de `precision` caracteres ('' si falta alguna coordenada)
+    """
+    if latitud is None or longitud is None:
+        return ''
+    rango_lat = [-90.0, 90.0]
+    rango_lng = [-180.0, 180.0]
+    caracteres = []
+    bits = 0
+    valor = 0
+    es_longitud = True
+    while len(caracteres) < precision:
+        rango, coordenada = (rango_lng, longitud) if es_longitud else (rango_lat, latitud)
+        medio = (rango[0] + rango[1]) / 2
+        valor <<= 1
+        if coordenada >= medio:
+            valor |= 1
+            rango[0] = medio
+        else:
+            rango[1] = medio
+        es_longitud = not es_longitud
+        bits += 1
+        if bits == 5:
+            caracteres.append(_BASE32[valor])
+            bits = 0
+            valor = 0
+    return ''.join(caracteres)
+
+
+def precision_para_zoom(zoom):
+    """
+    Largo del prefijo de geohash con el que se agrupa un nivel de zoom del mapa
+    (zoom de Google Maps/OSM, 0 = mundo completo): la celda más grande que no supera
+    media tesela de ancho, así un grupo nunca cubre más que eso en pantalla.
+    """
+    return max(1, min(8, (zoom * 2 + 6) // 5))
+
+
+def invalidar_mapa():
+    """Invalida las respuestas cacheadas del mapa cuando la transacción actual se confirme."""
+    invalidar_version_cache(MAPA_VERSION_KEY)
+
+
+def _ajustar_recuadro(zoom, sur, oeste, norte, este):
+    """
+    Amplía el recuadro visible a la cuadrícula de teselas del zoom, para que
+    desplazamientos pequeños del mapa reutilicen la misma respuesta cacheada.
+    """
+    paso = 360.0 / (2 ** zoom)
+    if este - oeste >= 360 - paso:
+        oeste, este = -180.0, 180.0
+    else:
+        oeste = math.floor(oeste / paso) * paso
+        este = math.ceil(este / paso) * paso
+    sur = max(-90.0, math.floor(sur / paso) * paso)
+    norte = min(90.0, math.ceil(norte / paso) * paso)
+    return sur, oeste, norte, este
+
+
+def filtro_recuadro(sur, oeste, norte, este):
+    """Q de los clientes dentro del recuadro; admite recuadros que cruzan el antimeridiano."""
+    condicion = Q(latitud__gte=sur, latitud__lte=norte)
+    if oeste <= este:
+        return condicion & Q(longitud__gte=oeste, longitud__lte=este)
+    return condicion & (Q(longitud__gte=oeste) | Q(longitud__lte=este))
+
+
+def clientes_ubicados():
+    """Clientes activos con ubicación."""
+    from .models import Cliente
+    return Cliente.objects.filter(activo=True, latitud__isnull=False, longitud__isnull=False)
+
+
+def clusters_mapa(zoom, sur, oeste, norte, este):
+    """
+    Marcadores del mapa de clientes activos para un zoom y recuadro visible.
+
+    Por debajo de ZOOM_MARCADORES los clientes se agrupan en la base de datos por
+    prefijo de geohash en una sola consulta (GROUP BY); cada grupo lleva su cantidad y
+    el centroide de sus clientes. Un grupo de un solo cliente se envía como marcador.
+
+    Returns:
+        dict: {'grupos': [{latitud, longitud, cantidad}], 'marcadores': [{id, nombre, latitud, longitud}],
+               'truncado': bool}
+    """
+    zoom = max(0, min(ZOOM_MAXIMO, int(zoom)))
+    sur, oeste, norte, este = _ajustar_recuadro(zoom, sur, oeste, norte, este)
+    clave = f'clientes:mapa:{get_version_cache(MAPA_VERSION_KEY)}:{zoom}:{sur}:{oeste}:{norte}:{este}'
+    datos = cache.get(clave)
+    if datos is not None:
+        return datos
+
+    qs = clientes_ubicados().filter(filtro_recuadro(sur, oeste, norte, este)).order_by()
+    if zoom >= ZOOM_MARCADORES:
+        grupos = []
+        marcadores = list(qs.values('id', 'nombre', 'latitud', 'longitud')[:MARCADORES_MAXIMOS + 1])
+    else:
+        celdas = (
+            qs.annotate(celda=Substr('geohash', 1, precision_para_zoom(zoom)))
+            .values('celda')
+            # En una celda con un solo cliente, Min() devuelve los datos de ese cliente
+            .annotate(cantidad=Count('id'), latitud=Avg('latitud'), longitud=Avg('longitud'),
+                      cliente_id=Min('id'), cliente_nombre=Min('nombre'))
+        )
+        grupos, marcadores = [], []
+        for celda in celdas:
+            if celda['cantidad'] == 1:
+                marcadores.append({
+                    'id': celda['cliente_id'],
+                    'nombre': celda['cliente_nombre'],
+                    'latitud': celda['latitud'],
+                    'longitud': celda['longitud'],
+                })
+            else:
+                grupos.append({
+                    'latitud': round(celda['latitud'], 6),
+                    'longitud': round(celda['longitud'], 6),
+                    'cantidad': celda['cantidad'],
+                })
+
+    datos = {
+        'grupos': grupos,
+        'marcadores': marcadores[:MARCADORES_MAXIMOS],
+        'truncado': len(marcadores) > MARCADORES_MAXIMOS,
+    }
+    cache.set(clave, datos, MAPA_TIMEOUT)
+    return datos
+
+
+def distancias_km(latitud, longitud, latitudes, longitudes):
+    """Distancias haversine (km) desde un punto a una lista de puntos."""
+    if np is not None:
+        lat1 = np.radians(latitud)
+        lat2 = np.radians(np.asarray(latitudes, dtype=float))
+        dlat = lat2 - lat1
+        dlng = np.radians(np.asarray(longitudes, dtype=float) - longitud)
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng / 2) ** 2
+        return (2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))).tolist()
+
+    lat1 = math.radians(latitud)
+    cos_lat1 = math.cos(lat1)
+    resultado = []
+    for lat, lng in zip(latitudes, longitudes):
+        lat2 = math.radians(lat)
+        a = (
+            math.sin((lat2 - lat1) / 2) ** 2
+            + cos_lat1 * math.cos(lat2) * math.sin(math.radians(lng - longitud) / 2) ** 2
+        )
+        resultado.append(2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0))))
+    return resultado
+
+
+def _recuadro_radio(latitud, longitud, radio_km):
+    """Recuadro (sur, oeste, norte, este) que contiene el círculo de `radio_km`."""
+    delta_lat = math.degrees(radio_km / RADIO_TIERRA_KM)
+    sur, norte = latitud - delta_lat, latitud + delta_lat
+    if sur <= -90 or norte >= 90:
+        return max(sur, -90.0), -180.0, min(norte, 90.0), 180.0
+    delta_lng = math.degrees(radio_km / (RADIO_TIERRA_KM * math.cos(math.radians(max(abs(sur), abs(norte))))))
+    if delta_lng >= 180:
+        return sur, -180.0, norte, 180.0
+    oeste, este = longitud - delta_lng, longitud + delta_lng
+    if oeste < -180:
+        oeste += 360
+    if este > 180:
+        este -= 360
+    return sur, oeste, norte, este
+
+
+def clientes_cercanos(latitud, longitud, cantidad=10, radio_inicial_km=2.0, radio_maximo_km=500.0):
+    """
+    Los `cantidad` clientes activos más cercanos a un punto, hasta `radio_maximo_km`.
+
+    El radio de búsqueda empieza en `radio_inicial_km` y se duplica hasta reunir al
+    menos `cantidad` clientes; en cada intento solo se traen de la base de datos (id y
+    coordenadas) los clientes del recuadro que contiene el círculo, y las distancias se
+    calculan en memoria. Los datos de los elegidos se cargan con una sola consulta.
+
+    Returns:
+        list: [{id, nombre, direccion, telefono, latitud, longitud, distancia_km}] por distancia
+    """
+    radio = radio_inicial_km
+    while True:
+        candidatos = list(
+            clientes_ubicados()
+            .filter(filtro_recuadro(*_recuadro_radio(latitud, longitud, radio)))
+            .order_by()
+            .values_list('id', 'latitud', 'longitud')
+        )
+        cercanos = []
+        if candidatos:
+            ids, latitudes, longitudes = zip(*candidatos)
+            # Las esquinas del recuadro quedan fuera del círculo: solo cuentan los del radio
+            cercanos = [
+                (distancia, id_)
+                for id_, distancia in zip(ids, distancias_km(latitud, longitud, latitudes, longitudes))
+                if distancia <= radio
+            ]
+        if len(cercanos) >= cantidad or radio >= radio_maximo_km:
+            break
+        radio = min(radio * 2, radio_maximo_km)
+
+    cercanos = sorted(cercanos)[:cantidad]
+    from .models import Cliente
+    detalles = Cliente.objects.in_bulk([id_ for _, id_ in cercanos])
+    return [
+        {
+            'id': id_,
+            'nombre': detalles[id_].nombre,
+            'direccion': detalles[id_].direccion,
+            'telefono': detalles[id_].telefono,
+            'latitud': detalles[id_].latitud,
+            'longitud': detalles[id_].longitud,
+            'distancia_km': round(distancia, 3),
+        }
+        for distancia, id_ in cercanos
+        if id_ in detalles
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:08
+
+from django.db import migrations, models
+
+from clientes.geo import codificar_geohash
+from core.busqueda import instalar_indices_busqueda
+
+
+def calcular_geohash(apps, schema_editor):
+    """Calcula el geohash de los clientes existentes con ubicación."""
+    Cliente = apps.get_model('clientes', 'Cliente')
+    ubicados = Cliente.objects.filter(latitud__isnull=False, longitud__isnull=False).only('latitud', 'longitud')
+    lote = []
+    for cliente in ubicados.iterator(chunk_size=2000):
+        cliente.geohash = codificar_geohash(cliente.latitud, cliente.longitud)
+        lote.append(cliente)
+        if len(lote) >= 2000:
+            Cliente.objects.bulk_update(lote, ['geohash'])
+            lote = []
+    Cliente.objects.bulk_update(lote, ['geohash'])
+
+
+def reinstalar_indices_busqueda(apps, schema_editor):
+    """
+    En SQLite, AddField con default recrea clientes_cliente y se pierden los triggers
+    FTS5 de core.0007_indices_busqueda; se vuelven a crear y se reconstruye el índice.
+    """
+    instalar_indices_busqueda(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0001_initial'),
+        ('core', '0007_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='geohash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=12),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['latitud', 'longitud'], name='cliente_ubicacion_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['geohash'], name='cliente_geohash_idx'),
+        ),
+        migrations.RunPython(reinstalar_indices_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(calcular_geohash, migrations.RunPython.noop),
+    ]
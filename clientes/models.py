@@ -1,5 +1,37 @@
 from django.db import models
 
+from core.autocompletar import NombreBusquedaQuerySet, normalizar_nombre
+from .geo import codificar_geohash, invalidar_mapa
+
+
+class ClienteQuerySet(NombreBusquedaQuerySet):
+    """
+    Las escrituras en lote no llaman a save() ni envían señales: aquí se calcula el
+    geohash de cada cliente y se invalida el mapa. (queryset.update() de latitud o
+    longitud no recalcula el geohash.)
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for cliente in objs:
+            cliente.actualizar_geohash()
+        update_fields = kwargs.get('update_fields')
+        if update_fields and {'latitud', 'longitud'} & set(update_fields) and 'geohash' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'geohash']
+        creados = super().bulk_create(objs, *args, **kwargs)
+        invalidar_mapa()
+        return creados
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if {'latitud', 'longitud'} & set(fields) and 'geohash' not in fields:
+            for cliente in objs:
+                cliente.actualizar_geohash()
+            fields = [*fields, 'geohash']
+        actualizados = super().bulk_update(objs, fields, *args, **kwargs)
+        invalidar_mapa()
+        return actualizados
+
 
 class Cliente(models.Model):
     """
@@ -26,14 +58,45 @@ class Cliente(models.Model):
         help_text='Longitud de la ubicación del cliente'
     )
     
+    # Celda de la ubicación para el mapa agrupado (ver clientes/geo.py); se calcula al guardar
+    geohash = models.CharField(max_length=12, blank=True, default='', editable=False)
+
+    # Nombre normalizado para el autocompletado (core/autocompletar.py); se calcula al guardar
+    nombre_busqueda = models.CharField(max_length=200, blank=True, default='', editable=False)
+
     fecha_registro = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True)
 
+    objects = ClienteQuerySet.as_manager()
+
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        indexes = [
+            models.Index(fields=['latitud', 'longitud'], name='cliente_ubicacion_idx'),
+            models.Index(fields=['geohash'], name='cliente_geohash_idx'),
+            # Autocompletado por prefijo del nombre (core/autocompletar.py)
+            models.Index(fields=['nombre_busqueda'], condition=models.Q(activo=True), name='cliente_activo_busqueda_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - {self.cedula_nit}"
 
+    def actualizar_geohash(self):
+        """Recalcula el geohash a partir de latitud y longitud."""
+        self.geohash = codificar_geohash(self.latitud, self.longitud)
+
+    def save(self, *args, **kwargs):
+        self.actualizar_geohash()
+        self.nombre_busqueda = normalizar_nombre(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            if {'latitud', 'longitud'} & update_fields:
+                update_fields.add('geohash')
+            if 'nombre' in update_fields:
+                update_fields.add('nombre_busqueda')
+            kwargs['update_fields'] = update_fields
+        super().save(*args, **kwargs)
+
@@ -0,0 +1,15 @@
+"""
+Señales de la app de clientes.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .geo import invalidar_mapa
+from .models import Cliente
+
+
+@receiver(post_save, sender=Cliente)
+@receiver(post_delete, sender=Cliente)
+def invalidar_mapa_clientes(sender, **kwargs):
+    """Invalida las respuestas cacheadas del mapa de clientes al confirmar cambios."""
+    invalidar_mapa()
@@ -1,3 +1,334 @@
-from django.test import TestCase
+import io
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from core.archivos import leer_filas
+from core.autocompletar import normalizar_nombre
+from core.busqueda import filtro_documento, filtro_texto
+from core.models import CustomUser
+from core.sincronizacion import Sincronizador
+from transacciones.forms import VentaForm
+from .geo import codificar_geohash
+from .models import Cliente
+
+# Caché en memoria: las versiones de caché no deben pasar de una prueba a otra
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def crear_clientes(cantidad, desde=0, **datos):
+    return Cliente.objects.bulk_create([
+        Cliente(
+            nombre=f'Cliente {numero:03d}', cedula_nit=str(10000 + numero), direccion='Calle 1',
+            telefono='3000000000', email=f'cliente{numero}@ejemplo.com', **datos
+        )
+        for numero in range(desde, desde + cantidad)
+    ])
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, CONSULTAS_PARALELAS=False)
+class ClientesTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user('vendedor', password='clave-de-prueba')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+
+class ListadoClientesTests(ClientesTestCase):
+    """Listado asíncrono de clientes con las consultas en serie (CONSULTAS_PARALELAS = False)."""
+
+    def test_contexto_del_listado(self):
+        crear_clientes(13)
+        respuesta = self.client.get('/clientes/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        ids = list(Cliente.objects.order_by('-id').values_list('id', flat=True))
+        self.assertEqual([cliente.pk for cliente in respuesta.context['clientes']], ids[:10])
+        self.assertEqual(respuesta.context['paginator'].count, 13)
+
+    def test_consultas_del_listado_no_dependen_de_los_clientes(self):
+        crear_clientes(2)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get('/clientes/')
+        crear_clientes(40, desde=2)
+        with self.assertNumQueries(len(pocas)):
+            self.client.get('/clientes/?page=3')
+
+
+class BusquedaClientesTests(ClientesTestCase):
+    """Búsqueda indexada (core.busqueda): FTS5 trigram en SQLite e icontains como respaldo."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        datos = {'direccion': 'Calle 1', 'telefono': '3000000000'}
+        cls.esquina = Cliente.objects.create(nombre='Tienda La Esquina', cedula_nit='1010', email='esquina@ejemplo.com', **datos)
+        cls.granero = Cliente.objects.create(nombre='Granero El Sol', cedula_nit='2020', email='sol@otro.com', **datos)
+
+    def buscar(self, q):
+        return set(Cliente.objects.filter(filtro_documento(Cliente, q, 'cedula_nit')).values_list('pk', flat=True))
+
+    def test_fts_sin_distinguir_mayusculas_y_sincronizado(self):
+        self.assertIn('clientes_cliente_fts', str(Cliente.objects.filter(filtro_texto(Cliente, 'esquina')).query))
+        self.assertEqual(self.buscar('ESQUI'), {self.esquina.pk})
+        self.assertEqual(self.buscar('ejemplo.com'), {self.esquina.pk})
+        self.assertEqual(self.buscar('"sol'), set())
+
+        # Los triggers mantienen la tabla FTS al editar y eliminar
+        self.granero.nombre = 'Granero La Esquina'
+        self.granero.save()
+        self.assertEqual(self.buscar('esquina'), {self.esquina.pk, self.granero.pk})
+        self.esquina.delete()
+        self.assertEqual(self.buscar('esquina'), {self.granero.pk})
+
+    def test_textos_cortos_y_otros_motores_usan_icontains(self):
+        self.assertNotIn('_fts', str(Cliente.objects.filter(filtro_texto(Cliente, 'so')).query))
+        self.assertEqual(self.buscar('so'), {self.granero.pk})
+
+        with mock.patch('core.busqueda._usa_fts', return_value=False):
+            self.assertNotIn('_fts', str(Cliente.objects.filter(filtro_texto(Cliente, 'esquina')).query))
+            self.assertEqual(self.buscar('ESQUI'), {self.esquina.pk})
+
+    def test_documento_por_igualdad_exacta(self):
+        condicion = filtro_documento(Cliente, ' 2020 ', 'cedula_nit')
+        self.assertIn(('cedula_nit', '2020'), condicion.children)
+        self.assertEqual(self.buscar('2020'), {self.granero.pk})
+        self.assertNotIn(('cedula_nit', 'sol'), filtro_documento(Cliente, 'sol', 'cedula_nit').children)
+
+    def test_listado_filtra_por_la_busqueda(self):
+        respuesta = self.client.get('/clientes/', {'q': 'granero'})
+        self.assertEqual([cliente.pk for cliente in respuesta.context['clientes']], [self.granero.pk])
+
+
+@override_settings(PAGINACION_CURSOR=True)
+class PaginacionCursorTests(ClientesTestCase):
+    """Paginación por cursor (core.pagination.KeysetPaginationMixin) en el listado de clientes."""
+
+    def setUp(self):
+        super().setUp()
+        crear_clientes(25)
+        self.ids = list(Cliente.objects.order_by('-id').values_list('id', flat=True))
+
+    def pagina(self, **params):
+        respuesta = self.client.get('/clientes/', params)
+        self.assertEqual(respuesta.status_code, 200)
+        pagina = respuesta.context['page_obj']
+        return [cliente.pk for cliente in pagina], pagina
+
+    def test_limites_de_las_paginas(self):
+        ids, pagina = self.pagina()
+        self.assertEqual(ids, self.ids[:10])
+        self.assertEqual((pagina.cursor_anterior, pagina.cursor_siguiente), (None, self.ids[9]))
+        self.assertEqual(pagina.total_aproximado, 25)
+
+        ids, pagina = self.pagina(despues=self.ids[9])
+        self.assertEqual(ids, self.ids[10:20])
+        self.assertEqual((pagina.cursor_anterior, pagina.cursor_siguiente), (self.ids[10], self.ids[19]))
+
+        # Última página incompleta: sin siguiente
+        ids, pagina = self.pagina(despues=self.ids[19])
+        self.assertEqual(ids, self.ids[20:])
+        self.assertEqual((pagina.cursor_anterior, pagina.cursor_siguiente), (self.ids[20], None))
+
+        ids, pagina = self.pagina(antes=self.ids[20])
+        self.assertEqual(ids, self.ids[10:20])
+        self.assertTrue(pagina.has_previous() and pagina.has_next())
+
+        # Al retroceder con menos de una página por delante se muestra la primera completa
+        ids, pagina = self.pagina(antes=self.ids[5])
+        self.assertEqual(ids, self.ids[:10])
+        self.assertFalse(pagina.has_previous())
+
+    def test_cursor_invalido_muestra_la_primera_pagina(self):
+        self.assertEqual(self.pagina(despues='abc')[0], self.ids[:10])
+
+    def test_consultas_no_dependen_de_la_profundidad(self):
+        self.client.get('/clientes/')
+        with CaptureQueriesContext(connection) as primera:
+            self.client.get('/clientes/', {'despues': self.ids[9]})
+        with self.assertNumQueries(len(primera)):
+            self.client.get('/clientes/', {'despues': self.ids[19]})
+
+
+class AutocompletarClientesTests(ClientesTestCase):
+    """Endpoint de autocompletado (core.autocompletar.buscar_por_prefijo) y su widget."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        datos = {'direccion': 'Calle 1', 'telefono': '3000000000', 'email': 'cliente@ejemplo.com'}
+        cls.maria = Cliente.objects.create(nombre='María  Peña', cedula_nit='52001', **datos)
+        cls.mario = Cliente.objects.create(nombre='mario gómez', cedula_nit='79002', **datos)
+        cls.marta = Cliente.objects.create(nombre='Marta Ruiz', cedula_nit='52003', activo=False, **datos)
+        cls.tienda = Cliente.objects.create(nombre='Tienda Marí', cedula_nit='90004', **datos)
+
+    def buscar(self, q):
+        respuesta = self.client.get('/clientes/autocompletar/', {'q': q})
+        self.assertEqual(respuesta.status_code, 200)
+        return [resultado['id'] for resultado in respuesta.json()['resultados']]
+
+    def test_prefijo_del_nombre_sin_tildes_ni_mayusculas(self):
+        self.assertEqual(self.buscar('mari'), [self.maria.pk, self.mario.pk])
+        self.assertEqual(self.buscar('MARÍA PE'), [self.maria.pk])
+        self.assertEqual(self.buscar('  maría   peña '), [self.maria.pk])
+        # Solo prefijo: 'Tienda Marí' no empieza por 'mari'
+        self.assertNotIn(self.tienda.pk, self.buscar('mari'))
+        self.assertEqual(self.buscar('x'), [])
+        self.assertEqual(self.buscar(''), [])
+
+    def test_solo_activos(self):
+        self.assertEqual(self.buscar('mart'), [])
+        self.assertEqual(self.buscar('520'), [self.maria.pk])
+
+    def test_prefijo_del_documento_y_texto(self):
+        respuesta = self.client.get('/clientes/autocompletar/', {'q': '7900'})
+        self.assertEqual(respuesta.json()['resultados'], [{'id': self.mario.pk, 'texto': 'mario gómez - 79002'}])
+
+    def test_requiere_sesion(self):
+        self.client.logout()
+        self.assertEqual(self.client.get('/clientes/autocompletar/', {'q': 'mar'}).status_code, 302)
+
+    def test_widget_envia_el_id_y_muestra_el_elegido(self):
+        formulario = VentaForm(data={'cliente': self.maria.pk})
+        self.assertTrue(formulario.is_valid())
+        self.assertEqual(formulario.cleaned_data['cliente'], self.maria)
+
+        html = str(formulario['cliente'])
+        self.assertIn(f'type="hidden" name="cliente" value="{self.maria.pk}"', html)
+        self.assertIn('value="María  Peña - 52001"', html)
+        self.assertIn('data-autocompletar="/clientes/autocompletar/"', html)
+
+        self.assertFalse(VentaForm(data={'cliente': 999999}).is_valid())
+
+
+class SincronizacionClientesTests(ClientesTestCase):
+    """Sincronización en lote (core.sincronizacion.Sincronizador) de clientes."""
+
+    def setUp(self):
+        super().setUp()
+        datos = {'direccion': 'Calle 1', 'telefono': '3000000000', 'email': 'cliente@ejemplo.com'}
+        self.esquina = Cliente.objects.create(nombre='Tienda La Esquina', cedula_nit='1010', **datos)
+        self.sol = Cliente.objects.create(nombre='Granero El Sol', cedula_nit='2020', latitud=4.6, longitud=-74.08, **datos)
+
+    def sincronizar(self, *filas, **opciones):
+        contenido = '\n'.join(['cedula_nit;nombre;latitud;longitud;activo', *filas]).encode('utf-8')
+        sincronizador = Sincronizador('clientes', **opciones)
+        resultado = sincronizador.ejecutar(leer_filas(io.BytesIO(contenido), 'clientes.csv', sincronizador.obligatorias))
+        return resultado, sincronizador.errores
+
+    def assertSincroniza(self):
+        resultado, errores = self.sincronizar(
+            '1010;Tienda La Esquina;;;',
+            '2020;Granero Él Sol;6,25;-75,56;no',
+            '3030;Ñapa Express;4.7;-74.1;',
+            '4040;;;;',
+            '3030;Ñapa Repetida;;;',
+        )
+        self.assertEqual(resultado, {'creados': 1, 'actualizados': 1, 'sin_cambios': 1, 'filas_con_error': 2})
+        self.assertEqual(errores, [(5, 'falta nombre'), (6, 'cedula_nit repetido en el archivo')])
+
+        sol = Cliente.objects.get(pk=self.sol.pk)
+        self.assertEqual((sol.nombre, sol.latitud, sol.longitud, sol.activo), ('Granero Él Sol', 6.25, -75.56, False))
+        # Las celdas vacías no borran lo guardado
+        self.assertEqual(Cliente.objects.get(pk=self.esquina.pk).direccion, 'Calle 1')
+        # Los campos calculados se mantienen aunque la escritura no pase por save()
+        self.assertEqual((sol.nombre_busqueda, sol.geohash), (normalizar_nombre('granero el sol'), codificar_geohash(6.25, -75.56)))
+        napa = Cliente.objects.get(cedula_nit='3030')
+        self.assertEqual((napa.nombre_busqueda, napa.geohash, napa.activo), (normalizar_nombre('napa express'), codificar_geohash(4.7, -74.1), True))
+        self.assertEqual(self.client.get('/clientes/autocompletar/', {'q': 'napa'}).json()['resultados'][0]['id'], napa.pk)
+
+    def test_crea_actualiza_y_cuenta_sin_cambios(self):
+        with self.assertNumQueries(2):
+            # Una lectura y una escritura (INSERT ... ON CONFLICT) por lote
+            self.sincronizar('1010;Tienda Nueva;;;', '5050;Otra;;;')
+        self.esquina.nombre = 'Tienda La Esquina'
+        self.esquina.save()
+        self.assertSincroniza()
+
+    def test_sin_upsert_usa_bulk_create_y_bulk_update(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.assertSincroniza()
+
+    def test_solo_validar_no_escribe(self):
+        resultado, _ = self.sincronizar('2020;Otro Nombre;;;', '9090;Nuevo;;;', solo_validar=True)
+
+        self.assertEqual((resultado['creados'], resultado['actualizados']), (1, 1))
+        self.assertFalse(Cliente.objects.filter(cedula_nit='9090').exists())
+        self.assertEqual(Cliente.objects.get(pk=self.sol.pk).nombre, 'Granero El Sol')
+
+
+class MapaClientesTests(ClientesTestCase):
+    """Mapa agrupado por geohash (clientes.geo.clusters_mapa) y búsqueda de cercanos."""
+
+    recuadro = {'sur': '-5', 'oeste': '-80', 'norte': '13', 'este': '-66'}
+
+    def setUp(self):
+        super().setUp()
+        ubicaciones = [(4.6097, -74.0817), (4.6101, -74.0812), (4.6093, -74.0821), (6.2442, -75.5812)]
+        *self.bogota, self.medellin = [
+            crear_clientes(1, desde=numero, latitud=latitud, longitud=longitud)[0]
+            for numero, (latitud, longitud) in enumerate(ubicaciones)
+        ]
+        crear_clientes(1, desde=10, latitud=4.6098, longitud=-74.0816, activo=False)
+        crear_clientes(1, desde=11)
+
+    def mapa(self, **params):
+        return self.client.get('/clientes/mapa/datos/', {**self.recuadro, **params})
+
+    def test_grupos_y_marcadores_segun_el_zoom(self):
+        datos = self.mapa(zoom='6').json()
+        self.assertEqual([grupo['cantidad'] for grupo in datos['grupos']], [3])
+        self.assertAlmostEqual(datos['grupos'][0]['latitud'], 4.6097, places=3)
+        self.assertEqual([marcador['id'] for marcador in datos['marcadores']], [self.medellin.pk])
+        self.assertFalse(datos['truncado'])
+
+        datos = self.mapa(zoom='18').json()
+        self.assertEqual(datos['grupos'], [])
+        self.assertEqual(
+            {marcador['id'] for marcador in datos['marcadores']},
+            {cliente.pk for cliente in [*self.bogota, self.medellin]},
+        )
+
+    def test_respuesta_cacheada_hasta_que_cambian_los_clientes(self):
+        self.mapa(zoom='6')
+        with self.assertNumQueries(2):
+            # Sesión y usuario; el mapa sale de la caché
+            self.mapa(zoom='6')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.medellin.activo = False
+            self.medellin.save()
+        self.assertEqual(self.mapa(zoom='6').json()['marcadores'], [])
+
+    def test_parametros_invalidos_responden_400(self):
+        for params in [
+            {'zoom': '6', 'sur': ''},
+            {'zoom': 'nan'},
+            {'zoom': '6', 'norte': 'inf'},
+            {'zoom': '6', 'sur': '14'},
+            {'zoom': '6', 'norte': '91'},
+            {'zoom': '6', 'este': '181'},
+            {'zoom': '23'},
+            {'zoom': '-1'},
+        ]:
+            with self.subTest(params=params):
+                respuesta = self.mapa(**params)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('error', respuesta.json())
+        respuesta = self.client.get('/clientes/mapa/datos/', {'zoom': '6'})
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_cercanos_ordenados_por_distancia(self):
+        respuesta = self.client.get('/clientes/cercanos/', {'lat': '4.6097', 'lng': '-74.0817', 'n': '4'})
+        clientes = respuesta.json()['clientes']
+        cerca, mas_lejos, medio = self.bogota
+        self.assertEqual([cliente['id'] for cliente in clientes], [cerca.pk, medio.pk, mas_lejos.pk, self.medellin.pk])
+        self.assertEqual(clientes[0]['distancia_km'], 0)
+        self.assertEqual(self.client.get('/clientes/cercanos/', {'lat': '95', 'lng': '0'}).status_code, 400)
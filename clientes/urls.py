@@ -7,7 +7,12 @@ from .views import (
     ClienteDetailView,
     ClienteCreateView,
     ClienteUpdateView,
-    ClienteDeleteView
+    ClienteDeleteView,
+    ClienteSincronizarView,
+    ClienteAutocompletarView,
+    ClienteMapaView,
+    ClienteMapaDatosView,
+    ClienteCercanosView,
 )
 
 app_name = 'clientes'
@@ -18,4 +23,9 @@ urlpatterns = [
     path('crear/', ClienteCreateView.as_view(), name='create'),
     path('<int:pk>/editar/', ClienteUpdateView.as_view(), name='update'),
     path('<int:pk>/eliminar/', ClienteDeleteView.as_view(), name='delete'),
+    path('sincronizar/', ClienteSincronizarView.as_view(), name='sincronizar'),
+    path('autocompletar/', ClienteAutocompletarView.as_view(), name='autocompletar'),
+    path('mapa/', ClienteMapaView.as_view(), name='mapa'),
+    path('mapa/datos/', ClienteMapaDatosView.as_view(), name='mapa_datos'),
+    path('cercanos/', ClienteCercanosView.as_view(), name='cercanos'),
 ]
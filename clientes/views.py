@@ -1,13 +1,20 @@
+import math
+
 from django.shortcuts import render
 from django.urls import reverse_lazy
-from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q
+from django.http import JsonResponse
+from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView, TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
+from core.pagination import KeysetPaginationMixin
+from core.concurrencia import AsyncLoginRequiredMixin, ListadoAsincronoMixin
+from core.busqueda import filtro_documento
+from core.views import AutocompletarView, SincronizacionView
+from .geo import ZOOM_MAXIMO, clientes_cercanos, clusters_mapa
 from .models import Cliente
 from .forms import ClienteForm
 
 
-class ClienteListView(LoginRequiredMixin, ListView):
+class ClienteListView(AsyncLoginRequiredMixin, KeysetPaginationMixin, ListadoAsincronoMixin, ListView):
     """Vista para listar todos los clientes."""
     model = Cliente
     template_name = 'clientes/cliente_list.html'
@@ -19,12 +26,7 @@ class ClienteListView(LoginRequiredMixin, ListView):
         qs = super().get_queryset().order_by('-id')
         q = self.request.GET.get('q')
         if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q) |
-                Q(cedula_nit__icontains=q) |
-                Q(telefono__icontains=q) |
-                Q(email__icontains=q)
-            )
+            qs = qs.filter(filtro_documento(Cliente, q, 'cedula_nit'))
         return qs
 
     def get_context_data(self, **kwargs):
@@ -66,3 +68,81 @@ class ClienteDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('clientes:list')
     login_url = 'core:login'
 
+
+class ClienteSincronizarView(SincronizacionView):
+    """Vista para crear o actualizar clientes en lote desde un archivo CSV o XLSX."""
+    tipo = 'clientes'
+    url_listado = reverse_lazy('clientes:list')
+    titulo = 'Sincronizar Clientes'
+
+
+class ClienteAutocompletarView(AutocompletarView):
+    """Clientes activos por prefijo de nombre o cédula/NIT, para el selector de ventas."""
+    tipo = 'clientes'
+
+
+# Máximo de clientes por búsqueda de cercanos
+CERCANOS_MAXIMO = 100
+
+
+def _parametros_float(params, *nombres):
+    """Lee parámetros numéricos de la URL; ValueError si falta alguno o no es un número finito."""
+    valores = []
+    for nombre in nombres:
+        try:
+            valor = float(params[nombre].replace(',', '.'))
+        except (KeyError, ValueError):
+            valor = None
+        if valor is None or not math.isfinite(valor):
+            raise ValueError(f"Parámetro '{nombre}' inválido o ausente.")
+        valores.append(valor)
+    return valores
+
+
+def _coordenadas_validas(*puntos):
+    """True si cada (latitud, longitud) está en ±90 y ±180."""
+    return all(-90 <= latitud <= 90 and -180 <= longitud <= 180 for latitud, longitud in puntos)
+
+
+class ClienteMapaView(LoginRequiredMixin, TemplateView):
+    """Mapa de todos los clientes activos con ubicación, agrupados según el zoom."""
+    template_name = 'clientes/cliente_mapa.html'
+    login_url = 'core:login'
+
+
+class ClienteMapaDatosView(LoginRequiredMixin, View):
+    """
+    Marcadores del mapa de clientes en JSON para el recuadro visible y el zoom:
+    ?zoom=&sur=&oeste=&norte=&este= (ver clientes.geo.clusters_mapa).
+    """
+    login_url = 'core:login'
+
+    def get(self, request):
+        try:
+            zoom, sur, oeste, norte, este = _parametros_float(request.GET, 'zoom', 'sur', 'oeste', 'norte', 'este')
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        if not _coordenadas_validas((sur, oeste), (norte, este)) or sur > norte:
+            return JsonResponse({'error': 'Recuadro fuera de rango.'}, status=400)
+        if not 0 <= zoom <= ZOOM_MAXIMO:
+            return JsonResponse({'error': f'El zoom debe estar entre 0 y {ZOOM_MAXIMO}.'}, status=400)
+        return JsonResponse(clusters_mapa(zoom, sur, oeste, norte, este))
+
+
+class ClienteCercanosView(LoginRequiredMixin, View):
+    """
+    Clientes activos más cercanos a un punto en JSON, ordenados por distancia:
+    ?lat=&lng=&n= (n por defecto 10, máximo CERCANOS_MAXIMO).
+    """
+    login_url = 'core:login'
+
+    def get(self, request):
+        try:
+            latitud, longitud = _parametros_float(request.GET, 'lat', 'lng')
+            cantidad = int(request.GET.get('n', 10))
+        except ValueError as error:
+            return JsonResponse({'error': str(error)}, status=400)
+        if not _coordenadas_validas((latitud, longitud)):
+            return JsonResponse({'error': 'Coordenadas fuera de rango.'}, status=400)
+        cantidad = max(1, min(cantidad, CERCANOS_MAXIMO))
+        return JsonResponse({'clientes': clientes_cercanos(latitud, longitud, cantidad)})
@@ -1,6 +1,67 @@
+from datetime import timedelta
+
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser, TransaccionCaja
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from .models import CustomUser, TransaccionCaja, SaldoCaja, CajaResumenDiario, TrabajoExportacion, MetricaSQLVista
+from .pagination import ConteoAproximadoPaginator
+from .utils import aplicar_transaccion_caja, eliminar_transacciones_caja, filtro_rango_fechas
+
+
+class FechaHoraFilter(admin.SimpleListFilter):
+    """
+    Filtro por rangos de fecha de `fecha_hora` con límites semiabiertos
+    (ver filtro_rango_fechas), que usan el índice de la columna.
+    """
+    title = 'fecha'
+    parameter_name = 'rango'
+    campo = 'fecha_hora'
+
+    def lookups(self, request, model_admin):
+        return [
+            ('hoy', 'Hoy'),
+            ('ayer', 'Ayer'),
+            ('7d', 'Últimos 7 días'),
+            ('30d', 'Últimos 30 días'),
+            ('mes', 'Mes en curso'),
+            ('mes_anterior', 'Mes anterior'),
+            ('anio', 'Año en curso'),
+        ]
+
+    def rango(self):
+        """(fecha inicial, fecha final) inclusivas del valor elegido; None si no es válido."""
+        hoy = timezone.localdate()
+        inicio_mes = hoy.replace(day=1)
+        fin_mes_anterior = inicio_mes - timedelta(days=1)
+        return {
+            'hoy': (hoy, hoy),
+            'ayer': (hoy - timedelta(days=1), hoy - timedelta(days=1)),
+            '7d': (hoy - timedelta(days=6), hoy),
+            '30d': (hoy - timedelta(days=29), hoy),
+            'mes': (inicio_mes, hoy),
+            'mes_anterior': (fin_mes_anterior.replace(day=1), fin_mes_anterior),
+            'anio': (hoy.replace(month=1, day=1), hoy),
+        }.get(self.value())
+
+    def queryset(self, request, queryset):
+        rango = self.rango()
+        if rango is None:
+            return queryset
+        return queryset.filter(**filtro_rango_fechas(self.campo, *rango))
+
+
+class ListadoGrandeAdmin(admin.ModelAdmin):
+    """
+    Admin de tablas con muchas filas: el changelist no ejecuta el COUNT(*) de toda la
+    tabla (show_full_result_count) y el total del paginador es aproximado (estimado o
+    cacheado, ver contar_aproximado). Las subclases deben definir list_select_related
+    para las relaciones que muestran.
+    """
+    show_full_result_count = False
+    paginator = ConteoAproximadoPaginator
+    list_filter = [FechaHoraFilter]
 
 
 @admin.register(CustomUser)
@@ -10,10 +71,100 @@ class CustomUserAdmin(UserAdmin):
 
 
 @admin.register(TransaccionCaja)
-class TransaccionCajaAdmin(admin.ModelAdmin):
+class TransaccionCajaAdmin(ListadoGrandeAdmin):
     """Admin para el modelo TransaccionCaja."""
-    list_display = ['tipo', 'monto', 'fecha_hora', 'venta', 'compra']
-    list_filter = ['tipo', 'fecha_hora']
+    list_display = ['tipo', 'monto', 'fecha_hora', 'documento']
+    list_filter = ['tipo', FechaHoraFilter]
     search_fields = ['descripcion']
     readonly_fields = ['fecha_hora']
+    autocomplete_fields = ['venta', 'compra']
+
+    @admin.display(description='Documento')
+    def documento(self, obj):
+        """Enlace a la venta o compra por su id, sin cargarla (ni a su cliente o proveedor)."""
+        if obj.venta_id:
+            url = reverse('admin:transacciones_venta_change', args=[obj.venta_id])
+            return format_html('<a href="{}">Venta #{}</a>', url, obj.venta_id)
+        if obj.compra_id:
+            url = reverse('admin:transacciones_compra_change', args=[obj.compra_id])
+            return format_html('<a href="{}">Compra #{}</a>', url, obj.compra_id)
+        return '-'
+
+    def get_readonly_fields(self, request, obj=None):
+        """Al editar, el tipo y el monto son de solo lectura: cambiarlos desajustaría el saldo y el resumen diario."""
+        if obj is not None:
+            return ['tipo', 'monto', 'fecha_hora']
+        return self.readonly_fields
+
+    def save_model(self, request, obj, form, change):
+        """Guarda la transacción y, si es nueva, suma su efecto al saldo acumulado y al resumen diario."""
+        obj.save()
+        if not change:
+            aplicar_transaccion_caja(obj)
+
+    def delete_model(self, request, obj):
+        """Elimina la transacción manteniendo el saldo acumulado."""
+        eliminar_transacciones_caja(TransaccionCaja.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        """Elimina las transacciones seleccionadas manteniendo el saldo acumulado."""
+        eliminar_transacciones_caja(queryset)
+
+
+@admin.register(SaldoCaja)
+class SaldoCajaAdmin(admin.ModelAdmin):
+    """Admin de solo lectura para el saldo acumulado de caja."""
+    list_display = ['saldo', 'actualizado']
+    readonly_fields = ['saldo', 'actualizado']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(CajaResumenDiario)
+class CajaResumenDiarioAdmin(admin.ModelAdmin):
+    """Admin de solo lectura para los resúmenes diarios de caja."""
+    list_display = ['fecha', 'ingresos', 'egresos']
+    date_hierarchy = 'fecha'
+    readonly_fields = ['fecha', 'ingresos', 'egresos']
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(TrabajoExportacion)
+class TrabajoExportacionAdmin(admin.ModelAdmin):
+    """Admin para los trabajos de exportación en segundo plano."""
+    list_display = ['id', 'tipo', 'usuario', 'estado', 'creado', 'terminado']
+    list_filter = ['estado', 'tipo']
+    list_select_related = ['usuario']
+    readonly_fields = ['creado', 'reclamado', 'terminado', 'huella']
+
+
+@admin.register(MetricaSQLVista)
+class MetricaSQLVistaAdmin(admin.ModelAdmin):
+    """Admin de solo lectura para el resumen SQL por vista y hora."""
+    list_display = [
+        'vista', 'hora', 'peticiones', 'consultas_promedio', 'repetidas',
+        'tiempo_db_promedio', 'max_tiempo_db_ms', 'max_consultas',
+    ]
+    list_filter = ['hora']
+    search_fields = ['vista']
+    date_hierarchy = 'hora'
+
+    @admin.display(description='Consultas/petición')
+    def consultas_promedio(self, obj):
+        return round(obj.consultas / obj.peticiones, 1) if obj.peticiones else 0
+
+    @admin.display(description='ms BD/petición')
+    def tiempo_db_promedio(self, obj):
+        return round(obj.tiempo_db_ms / obj.peticiones, 1) if obj.peticiones else 0
+
+    def has_add_permission(self, request):
+        return False
 
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,68 @@
+"""
+Lectura en streaming de archivos tabulares (CSV o XLSX) subidos por los usuarios,
+usada por las importaciones de ventas/compras y la sincronización de clientes/proveedores.
+"""
+import csv
+import io
+
+from openpyxl import load_workbook
+
+
+def normalizar_encabezado(valor):
+    """Nombre de columna en minúsculas y con guiones bajos: 'Cedula NIT' -> 'cedula_nit'."""
+    return str(valor or '').strip().lower().replace(' ', '_')
+
+
+def texto_celda(valor):
+    """Valor de una celda como texto sin espacios alrededor ('' si está vacía)."""
+    return '' if valor is None else str(valor).strip()
+
+
+def _validar_encabezados(encabezados, obligatorias):
+    faltantes = [columna for columna in obligatorias if columna not in encabezados]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en el archivo: {', '.join(faltantes)}")
+
+
+def leer_filas(archivo, nombre, obligatorias=()):
+    """
+    Lee un archivo CSV (separado por comas o punto y coma, UTF-8) o XLSX fila por fila,
+    sin cargarlo completo en memoria. Las filas vacías se omiten.
+
+    Args:
+        archivo: Archivo abierto en modo binario
+        nombre (str): Nombre del archivo; la extensión decide el formato
+        obligatorias (iterable): Columnas que deben estar en el encabezado
+
+    Yields:
+        tuple: (número de fila en el archivo, {columna: valor})
+
+    Raises:
+        ValueError: Si faltan columnas obligatorias
+    """
+    if nombre.lower().endswith('.xlsx'):
+        libro = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            filas = libro.active.iter_rows(values_only=True)
+            encabezados = [normalizar_encabezado(valor) for valor in next(filas, ())]
+            _validar_encabezados(encabezados, obligatorias)
+            for numero, valores in enumerate(filas, start=2):
+                if any(texto_celda(valor) for valor in valores):
+                    yield numero, dict(zip(encabezados, valores))
+        finally:
+            libro.close()
+        return
+
+    texto = io.TextIOWrapper(archivo, encoding='utf-8-sig', newline='')
+    try:
+        primera = texto.readline()
+        delimitador = ';' if primera.count(';') > primera.count(',') else ','
+        encabezados = [normalizar_encabezado(valor) for valor in next(csv.reader([primera], delimiter=delimitador), [])]
+        _validar_encabezados(encabezados, obligatorias)
+        for numero, valores in enumerate(csv.reader(texto, delimiter=delimitador), start=2):
+            if any(valor.strip() for valor in valores):
+                yield numero, dict(zip(encabezados, valores))
+    finally:
+        # El archivo lo cierra quien lo abrió
+        texto.detach()
+
@@ -0,0 +1,118 @@
+"""
+Búsqueda por prefijo para los selectores de cliente y proveedor de ventas y compras.
+
+Los formularios ya no envían todos los clientes/proveedores en un <select>: el widget
+AutocompletarWidget (core/widgets.py) consulta un endpoint JSON mientras se escribe y
+el formulario solo recibe el id elegido.
+
+- Solo registros activos, por prefijo del nombre (sin distinguir mayúsculas) o del
+  documento (cédula/NIT).
+- El prefijo del nombre se busca como un rango sobre nombre_busqueda: el nombre en
+  mayúsculas y sin tildes calculado en Python al guardar (normalizar_nombre), con un
+  índice parcial de los activos. No depende de UPPER() del motor, que en SQLite solo
+  convierte letras ASCII ('marí' no encontraría a 'María'). El prefijo del documento
+  usa el índice único de la columna.
+- Los resultados se cachean unos segundos (AUTOCOMPLETAR_TIMEOUT) por texto buscado:
+  las teclas repetidas y varios usuarios buscando lo mismo no vuelven a consultar.
+"""
+import hashlib
+import unicodedata
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models
+
+# Modelo y campo de documento, por tipo
+MODELOS_AUTOCOMPLETABLES = {
+    'clientes': ('clientes.Cliente', 'cedula_nit'),
+    'proveedores': ('proveedores.Proveedor', 'nit'),
+}
+
+# Resultados por búsqueda
+AUTOCOMPLETAR_LIMITE = 20
+
+# Largo máximo del texto buscado (más allá no acota más la búsqueda)
+AUTOCOMPLETAR_MAX_CARACTERES = 50
+
+# Mayor carácter Unicode: todo texto que empieza por p cumple p <= texto < p + FIN_PREFIJO
+FIN_PREFIJO = '\U0010ffff'
+
+
+def normalizar_nombre(texto, largo=200):
+    """Nombre en mayúsculas, sin tildes y con espacios simples: 'María  Peña' -> 'MARIA PENA'."""
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_tildes = ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+    return ' '.join(sin_tildes.upper().split())[:largo]
+
+
+class NombreBusquedaQuerySet(models.QuerySet):
+    """
+    Las escrituras en lote no llaman a save(): aquí se calcula nombre_busqueda de
+    clientes y proveedores. (queryset.update() del nombre no lo recalcula.)
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.nombre_busqueda = normalizar_nombre(obj.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields and 'nombre' in update_fields and 'nombre_busqueda' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'nombre_busqueda']
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        if 'nombre' in fields and 'nombre_busqueda' not in fields:
+            for obj in objs:
+                obj.nombre_busqueda = normalizar_nombre(obj.nombre)
+            fields = [*fields, 'nombre_busqueda']
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
+def _rango_prefijo(campo, prefijo):
+    return {f'{campo}__gte': prefijo, f'{campo}__lt': prefijo + FIN_PREFIJO}
+
+
+def buscar_por_prefijo(tipo, q, limite=AUTOCOMPLETAR_LIMITE):
+    """
+    Registros activos de `tipo` cuyo nombre o documento empiezan por `q`.
+
+    Args:
+        tipo (str): Clave de MODELOS_AUTOCOMPLETABLES
+        q (str): Texto escrito por el usuario
+        limite (int): Máximo de resultados
+
+    Returns:
+        list: [{'id', 'texto'}] ordenados por nombre; texto es "nombre - documento"
+    """
+    modelo, campo_documento = MODELOS_AUTOCOMPLETABLES[tipo]
+    q = ' '.join(q.split())[:AUTOCOMPLETAR_MAX_CARACTERES]
+    if not q:
+        return []
+
+    prefijo = normalizar_nombre(q)
+    clave = f'autocompletar:{tipo}:{limite}:{hashlib.md5(q.upper().encode()).hexdigest()}'
+    resultados = cache.get(clave)
+    if resultados is not None:
+        return resultados
+
+    activos = apps.get_model(modelo).objects.filter(activo=True)
+    por_nombre = (
+        activos.filter(**_rango_prefijo('nombre_busqueda', prefijo))
+        .order_by('nombre_busqueda')
+        .values_list('id', 'nombre', campo_documento)[:limite]
+    )
+    filas = list(por_nombre) if prefijo else []
+    if len(filas) < limite:
+        vistos = {fila[0] for fila in filas}
+        por_documento = (
+            activos.filter(**_rango_prefijo(campo_documento, q))
+            .order_by(campo_documento)
+            .values_list('id', 'nombre', campo_documento)[:limite]
+        )
+        filas += [fila for fila in por_documento if fila[0] not in vistos][:limite - len(filas)]
+
+    resultados = [{'id': id_, 'texto': f'{nombre} - {documento}'} for id_, nombre, documento in filas]
+    cache.set(clave, resultados, settings.AUTOCOMPLETAR_TIMEOUT)
+    return resultados
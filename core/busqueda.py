@@ -0,0 +1,142 @@
+"""
+Búsqueda de texto indexada para los listados de clientes, proveedores, ventas y compras.
+
+- PostgreSQL: `icontains` se resuelve con índices GIN trigram sobre UPPER(campo)
+  (migración core.0007_indices_busqueda), sin cambiar la consulta.
+- SQLite: tablas FTS5 `<tabla>_fts` con tokenizador trigram, sincronizadas por triggers
+  en cada INSERT/UPDATE/DELETE.
+- Textos con forma de id (#123) o de NIT/cédula se buscan además por igualdad exacta,
+  que usa el índice B-tree de la llave primaria o de la columna única.
+"""
+import re
+from functools import reduce
+from operator import or_
+
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+# Columnas indexadas por tabla; deben coincidir con la migración core.0007_indices_busqueda
+CAMPOS_BUSQUEDA = {
+    'clientes_cliente': ('nombre', 'cedula_nit', 'telefono', 'email'),
+    'proveedores_proveedor': ('nombre', 'nit', 'telefono', 'email'),
+}
+
+# El tokenizador trigram de FTS5 no encuentra textos de menos de 3 caracteres
+MIN_CARACTERES_FTS = 3
+
+PATRON_ID = re.compile(r'^#?(\d+)$')
+PATRON_DOCUMENTO = re.compile(r'^\d[\d.\-]*$')
+
+
+def id_buscado(q):
+    """Devuelve el entero de un texto como '123' o '#123'; None si no tiene esa forma."""
+    coincidencia = PATRON_ID.match(q.strip())
+    return int(coincidencia.group(1)) if coincidencia else None
+
+
+def es_documento(q):
+    """True si el texto tiene forma de cédula/NIT (dígitos, puntos y guiones)."""
+    return bool(PATRON_DOCUMENTO.match(q.strip()))
+
+
+def _usa_fts(modelo):
+    return connections[router.db_for_read(modelo)].vendor == 'sqlite'
+
+
+def filtro_texto(modelo, q, campos=None, prefijo=''):
+    """
+    Construye un Q que busca `q` (sin distinguir mayúsculas) en las columnas indexadas
+    de `modelo`, usando el índice disponible en el motor actual.
+
+    Args:
+        modelo (Model): Cliente o Proveedor (una tabla de CAMPOS_BUSQUEDA)
+        q (str): Texto buscado
+        campos (tuple, optional): Subconjunto de columnas; por defecto todas
+        prefijo (str, optional): Ruta de la relación al buscar desde otro modelo,
+            p. ej. 'cliente__' para filtrar ventas por su cliente
+
+    Returns:
+        Q: Condición para pasar a filter()
+    """
+    tabla = modelo._meta.db_table
+    campos = campos or CAMPOS_BUSQUEDA[tabla]
+    q = q.strip()
+
+    if _usa_fts(modelo) and len(q) >= MIN_CARACTERES_FTS:
+        frase = '"' + q.replace('"', '""') + '"'
+        consulta = f'{{{" ".join(campos)}}} : {frase}'
+        return Q(**{f'{prefijo}pk__in': RawSQL(
+            f'SELECT rowid FROM {tabla}_fts WHERE {tabla}_fts MATCH %s',
+            (consulta,)
+        )})
+
+    return reduce(or_, [Q(**{f'{prefijo}{campo}__icontains': q}) for campo in campos])
+
+
+def filtro_documento(modelo, q, campo):
+    """
+    Busca `q` en los campos de texto y, si tiene forma de cédula/NIT, también por
+    igualdad exacta en `campo` (índice único).
+    """
+    condicion = filtro_texto(modelo, q)
+    if es_documento(q):
+        condicion |= Q(**{campo: q.strip()})
+    return condicion
+
+
+def _sql_sqlite(tabla, campos):
+    columnas = ', '.join(campos)
+    nuevos = ', '.join(f'new.{campo}' for campo in campos)
+    viejos = ', '.join(f'old.{campo}' for campo in campos)
+    fts = f'{tabla}_fts'
+    return [
+        f'DROP TABLE IF EXISTS {fts}',
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({columnas}, content='{tabla}', content_rowid='id', tokenize='trigram')",
+        f'DROP TRIGGER IF EXISTS {fts}_ai',
+        f'DROP TRIGGER IF EXISTS {fts}_ad',
+        f'DROP TRIGGER IF EXISTS {fts}_au',
+        f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {tabla} BEGIN '
+        f'INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END',
+        f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {tabla} BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); END",
+        f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {tabla} BEGIN '
+        f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); "
+        f'INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END',
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _sql_postgresql(tabla, campos):
+    return ['CREATE EXTENSION IF NOT EXISTS pg_trgm'] + [
+        f'CREATE INDEX IF NOT EXISTS {tabla}_{campo}_trgm ON {tabla} USING gin (UPPER({campo}) gin_trgm_ops)'
+        for campo in campos
+    ]
+
+
+def instalar_indices_busqueda(connection):
+    """
+    Crea (o recrea) los índices de búsqueda de CAMPOS_BUSQUEDA en la conexión dada.
+    Es idempotente: en SQLite reconstruye las tablas FTS5 y sus triggers desde los datos
+    actuales, por lo que también sirve para repararlos si una migración recreó la tabla.
+    """
+    generar = {'sqlite': _sql_sqlite, 'postgresql': _sql_postgresql}.get(connection.vendor)
+    if generar is None:
+        return
+    with connection.cursor() as cursor:
+        for tabla, campos in CAMPOS_BUSQUEDA.items():
+            for sentencia in generar(tabla, campos):
+                cursor.execute(sentencia)
+
+
+def eliminar_indices_busqueda(connection):
+    """Elimina los índices creados por instalar_indices_busqueda."""
+    with connection.cursor() as cursor:
+        for tabla, campos in CAMPOS_BUSQUEDA.items():
+            if connection.vendor == 'sqlite':
+                for sufijo in ('ai', 'ad', 'au'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {tabla}_fts_{sufijo}')
+                cursor.execute(f'DROP TABLE IF EXISTS {tabla}_fts')
+            elif connection.vendor == 'postgresql':
+                for campo in campos:
+                    cursor.execute(f'DROP INDEX IF EXISTS {tabla}_{campo}_trgm')
@@ -0,0 +1,115 @@
+"""
+Ejecución en paralelo de consultas ORM independientes para las vistas asíncronas.
+
+Cada consulta corre en un hilo de un pool propio del proceso (CONSULTAS_PARALELAS_HILOS),
+con su propia conexión a la base de datos, así que la latencia de una vista que lanza
+varias consultas independientes se acerca a la de la más lenta en lugar de a la suma.
+Funciona igual bajo WSGI (gunicorn) y ASGI (uvicorn); ver DEPLOY_RENDER.md.
+
+Las consultas en paralelo no comparten la transacción de la petición: usar solo para
+lecturas. Con CONSULTAS_PARALELAS = False se ejecutan una tras otra en el hilo de la
+petición (útil con SQLite en memoria, que no comparte datos entre conexiones).
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db import close_old_connections
+
+from .instrumentacion import medidor_actual, medir_conexiones
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    """Pool de hilos compartido por el proceso; sus conexiones se reutilizan según CONN_MAX_AGE."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(
+                max_workers=settings.CONSULTAS_PARALELAS_HILOS,
+                thread_name_prefix='consultas',
+            )
+        return _pool
+
+
+def _en_hilo(funcion):
+    """
+    Envuelve `funcion` para ejecutarla en un hilo del pool: cierra las conexiones
+    obsoletas antes y después (como al inicio y fin de una petición) y mide sus
+    consultas con el medidor SQL de la petición, si lo hay.
+    """
+    def ejecutar():
+        close_old_connections()
+        medidor = medidor_actual.get()
+        try:
+            with medir_conexiones(medidor) if medidor else nullcontext():
+                return funcion()
+        finally:
+            close_old_connections()
+    return ejecutar
+
+
+async def consultar_en_paralelo(**consultas):
+    """
+    Ejecuta en paralelo funciones síncronas que consultan la base de datos.
+
+    Args:
+        **consultas: nombre -> callable sin argumentos (p. ej. lambda: list(qs[:10]))
+
+    Returns:
+        dict: nombre -> resultado de cada callable
+    """
+    if not settings.CONSULTAS_PARALELAS:
+        return await sync_to_async(
+            lambda: {nombre: funcion() for nombre, funcion in consultas.items()}
+        )()
+
+    pool = _get_pool()
+    resultados = await asyncio.gather(*(
+        sync_to_async(_en_hilo(funcion), thread_sensitive=False, executor=pool)()
+        for funcion in consultas.values()
+    ))
+    return dict(zip(consultas, resultados))
+
+
+class AsyncLoginRequiredMixin(LoginRequiredMixin):
+    """
+    LoginRequiredMixin para vistas con handlers `async def`. La sesión y el usuario
+    se cargan desde la base de datos, así que se consultan fuera del event loop.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not self.view_is_async:
+            return super().dispatch(request, *args, **kwargs)
+        return self._dispatch_async(request, *args, **kwargs)
+
+    async def _dispatch_async(self, request, *args, **kwargs):
+        autenticado = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not autenticado:
+            return self.handle_no_permission()
+        # Se salta LoginRequiredMixin.dispatch: la autenticación ya se comprobó
+        return await super(LoginRequiredMixin, self).dispatch(request, *args, **kwargs)
+
+
+class ListadoAsincronoMixin:
+    """
+    ListView asíncrona: resuelve en paralelo las consultas independientes de la página
+    (el total y las filas, ver KeysetPaginationMixin.consultas_precargadas) y luego arma
+    el contexto como una ListView normal. Debe ir después de KeysetPaginationMixin.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        self.object_list = await sync_to_async(self.get_queryset)()
+        page_size = self.get_paginate_by(self.object_list)
+        if page_size:
+            self.precargado = await consultar_en_paralelo(
+                **self.consultas_precargadas(self.object_list, page_size)
+            )
+        context = await sync_to_async(self.get_context_data)()
+        return self.render_to_response(context)
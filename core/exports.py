@@ -0,0 +1,326 @@
+"""
+Utilidades para exportar listados grandes sin cargarlos completos en memoria.
+"""
+import csv
+import hashlib
+import json
+import tempfile
+import threading
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import compress_sequence
+from openpyxl import Workbook
+from openpyxl.utils import get_column_letter
+
+from .models import TrabajoExportacion
+
+# Filas leídas por viaje al servidor (cursor del lado del servidor en PostgreSQL)
+EXPORT_CHUNK_SIZE = 2000
+
+# Tamaño de los bloques con que se envía el archivo temporal al cliente
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Especificación de una columna exportada:
+# - encabezado: texto de la primera fila
+# - campo: campo (o lookup) pedido a values_list
+# - formatear: función opcional aplicada al valor
+# - ancho: ancho opcional de la columna en Excel
+ColumnaExport = namedtuple('ColumnaExport', ['encabezado', 'campo', 'formatear', 'ancho'], defaults=[None, None])
+
+
+class _Buffer:
+    """Acumula lo escrito por csv.writer para emitir un lote completo de filas de una vez."""
+
+    def __init__(self):
+        self.partes = []
+
+    def write(self, value):
+        self.partes.append(value)
+
+    def vaciar(self):
+        contenido = ''.join(self.partes)
+        self.partes = []
+        return contenido
+
+
+def lotes(iterable, tamano=EXPORT_CHUNK_SIZE):
+    """Agrupa un iterable en listas de hasta `tamano` elementos."""
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+def formatear_fecha_local(formato='%Y-%m-%d %H:%M'):
+    """
+    Devuelve una función que formatea datetimes en la zona horaria local.
+    La zona se resuelve una sola vez y se reutiliza para todas las filas.
+    """
+    zona = timezone.get_current_timezone()
+
+    def formatear(valor):
+        return valor.astimezone(zona).strftime(formato) if valor else ''
+
+    return formatear
+
+
+def _generar_csv(encabezados, filas):
+    """Genera el CSV por lotes: un fragmento de texto por cada EXPORT_CHUNK_SIZE filas."""
+    buffer = _Buffer()
+    writer = csv.writer(buffer)
+    writer.writerow(encabezados)
+    yield buffer.vaciar()
+    for lote in lotes(filas):
+        writer.writerows(lote)
+        yield buffer.vaciar()
+
+
+def streaming_csv_response(request, filename, encabezados, filas):
+    """
+    Crea una respuesta CSV en streaming: la memoria no crece con el número de filas y
+    el primer byte sale de inmediato. Si el cliente acepta gzip, se comprime al vuelo.
+
+    Args:
+        request (HttpRequest): Petición actual (para negociar gzip)
+        filename (str): Nombre del archivo descargado
+        encabezados (list): Fila de encabezados
+        filas (iterable): Filas ya formateadas (listas o tuplas)
+
+    Returns:
+        StreamingHttpResponse: Respuesta lista para devolver desde la vista
+    """
+    contenido = (parte.encode('utf-8') for parte in _generar_csv(encabezados, filas))
+
+    acepta_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+    if acepta_gzip:
+        contenido = compress_sequence(contenido)
+
+    response = StreamingHttpResponse(contenido, content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    if acepta_gzip:
+        response['Content-Encoding'] = 'gzip'
+        response['Vary'] = 'Accept-Encoding'
+    return response
+
+
+def filas_queryset(queryset, columnas):
+    """
+    Recorre el queryset con un cursor por lotes (values_list, sin instanciar modelos)
+    y aplica el formateador de cada columna.
+
+    Args:
+        queryset (QuerySet): Datos a exportar (ya filtrados y ordenados)
+        columnas (list): Lista de ColumnaExport
+
+    Yields:
+        list: Valores de cada fila
+    """
+    formateadores = [columna.formatear for columna in columnas]
+    valores = queryset.values_list(*[columna.campo for columna in columnas])
+    for fila in valores.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield [
+            formatear(valor) if formatear else valor
+            for formatear, valor in zip(formateadores, fila)
+        ]
+
+
+def xlsx_response(queryset, columnas, filename, titulo_hoja):
+    """
+    Exporta un queryset a XLSX con openpyxl en modo write-only: las filas se escriben
+    directamente a un archivo temporal en disco (memoria acotada) y ese archivo se
+    envía al cliente por bloques.
+
+    Args:
+        queryset (QuerySet): Datos a exportar (ya filtrados y ordenados)
+        columnas (list): Lista de ColumnaExport
+        filename (str): Nombre del archivo descargado
+        titulo_hoja (str): Título de la hoja
+
+    Returns:
+        FileResponse: Respuesta con el archivo, incluyendo Content-Length
+    """
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(titulo_hoja)
+    for indice, columna in enumerate(columnas, start=1):
+        if columna.ancho:
+            ws.column_dimensions[get_column_letter(indice)].width = columna.ancho
+
+    ws.append([columna.encabezado for columna in columnas])
+    for fila in filas_queryset(queryset, columnas):
+        ws.append(fila)
+
+    # FileResponse cierra (y con ello elimina) el temporal al terminar de enviarlo
+    archivo = tempfile.TemporaryFile()
+    wb.save(archivo)
+    archivo.seek(0)
+
+    response = FileResponse(archivo, as_attachment=True, filename=filename, content_type=XLSX_CONTENT_TYPE)
+    response.block_size = EXPORT_BLOCK_SIZE
+    return response
+
+
+# Función que genera cada tipo de exportación en segundo plano.
+# Recibe los parámetros de filtro y el archivo donde escribir, y devuelve el nombre de archivo.
+RENDERIZADORES = {
+    'ventas_pdf': 'transacciones.views.render_ventas_pdf',
+    'compras_pdf': 'transacciones.views.render_compras_pdf',
+}
+
+# Parámetros de filtro que se guardan con cada trabajo
+PARAMETROS_EXPORTACION = ('q', 'start_date', 'end_date')
+
+
+def encolar_exportacion(usuario, tipo, params):
+    """
+    Crea un trabajo de exportación pendiente, o devuelve el que el mismo usuario ya
+    tenga pendiente (o en proceso, si su worker sigue activo) con el mismo tipo y filtros.
+
+    Args:
+        usuario (CustomUser): Usuario que solicita la exportación
+        tipo (str): Clave de RENDERIZADORES
+        params (dict | QueryDict): Filtros de la petición
+
+    Returns:
+        TrabajoExportacion: Trabajo nuevo o existente
+    """
+    parametros = {clave: params.get(clave) for clave in PARAMETROS_EXPORTACION if params.get(clave)}
+    huella = hashlib.sha256(
+        json.dumps([tipo, parametros], sort_keys=True).encode('utf-8')
+    ).hexdigest()
+
+    existente = TrabajoExportacion.objects.filter(en_curso(), usuario=usuario, huella=huella).first()
+    if existente:
+        return existente
+
+    try:
+        with transaction.atomic():
+            return TrabajoExportacion.objects.create(
+                usuario=usuario,
+                tipo=tipo,
+                parametros=parametros,
+                huella=huella,
+            )
+    except IntegrityError:
+        # Otra petición creó el mismo trabajo pendiente entre la consulta y el INSERT
+        # (restricción trabajo_pendiente_unico)
+        return TrabajoExportacion.objects.filter(usuario=usuario, huella=huella).order_by('-creado').first()
+
+
+def limite_reclamacion():
+    """Momento antes del cual un trabajo 'procesando' sin renovar se da por abandonado."""
+    return timezone.now() - timedelta(seconds=settings.TRABAJOS_LEASE_SEGUNDOS)
+
+
+def en_curso():
+    """Trabajos pendientes o en proceso por un worker activo (los abandonados no cuentan)."""
+    return Q(estado='pendiente') | Q(estado='procesando', reclamado__gte=limite_reclamacion())
+
+
+def reclamar_siguiente(modelo):
+    """
+    Reclama el trabajo más antiguo de `modelo` (TrabajoExportacion o
+    ImportacionTransacciones) que esté pendiente, o en proceso pero abandonado por un
+    worker que se detuvo (reclamado hace más de TRABAJOS_LEASE_SEGUNDOS), y lo marca
+    como 'procesando'. Seguro con varios workers: en PostgreSQL salta filas bloqueadas
+    y en cualquier motor el cambio es condicional al estado y la reclamación leídos.
+
+    Returns:
+        Model | None: Trabajo reclamado, o None si no hay ninguno disponible
+    """
+    abandonado = Q(reclamado__lt=limite_reclamacion()) | Q(reclamado__isnull=True)
+    with transaction.atomic():
+        trabajo = (
+            modelo.objects.select_for_update(skip_locked=True)
+            .filter(Q(estado='pendiente') | Q(abandonado, estado='procesando'))
+            .order_by('creado')
+            .first()
+        )
+        if trabajo is None:
+            return None
+        ahora = timezone.now()
+        reclamado = modelo.objects.filter(
+            pk=trabajo.pk, estado=trabajo.estado, reclamado=trabajo.reclamado
+        ).update(estado='procesando', reclamado=ahora)
+    if not reclamado:
+        return None
+    trabajo.estado = 'procesando'
+    trabajo.reclamado = ahora
+    return trabajo
+
+
+def renovar_reclamacion(trabajo):
+    """Extiende la reclamación de un trabajo en proceso (los workers la renuevan al avanzar)."""
+    trabajo.reclamado = timezone.now()
+    type(trabajo).objects.filter(pk=trabajo.pk).update(reclamado=trabajo.reclamado)
+
+
+@contextmanager
+def renovando_reclamacion(trabajo, intervalo=None):
+    """
+    Renueva la reclamación de `trabajo` desde un hilo aparte (cada tercio de
+    TRABAJOS_LEASE_SEGUNDOS por defecto) mientras dure el bloque, para pasos largos
+    que no tienen puntos de avance donde renovarla, como renderizar un PDF.
+    """
+    intervalo = intervalo or settings.TRABAJOS_LEASE_SEGUNDOS / 3
+    detener = threading.Event()
+
+    def latir():
+        try:
+            while not detener.wait(intervalo):
+                renovar_reclamacion(trabajo)
+        finally:
+            connection.close()
+
+    hilo = threading.Thread(target=latir, daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        detener.set()
+        hilo.join()
+
+
+def tomar_siguiente_trabajo():
+    """
+    Reclama la exportación pendiente (o abandonada) más antigua; ver reclamar_siguiente.
+
+    Returns:
+        TrabajoExportacion | None: Trabajo reclamado, o None si no hay pendientes
+    """
+    return reclamar_siguiente(TrabajoExportacion)
+
+
+def procesar_trabajo(trabajo):
+    """
+    Genera el archivo de un trabajo reclamado y lo guarda en MEDIA_ROOT. El archivo se
+    escribe primero en un temporal en disco, y la reclamación se renueva mientras se
+    genera. Los errores quedan registrados en el trabajo en lugar de propagarse.
+    """
+    try:
+        renderizar = import_string(RENDERIZADORES[trabajo.tipo])
+        with tempfile.TemporaryFile() as archivo:
+            with renovando_reclamacion(trabajo):
+                filename = renderizar(trabajo.parametros, archivo)
+            archivo.seek(0)
+            trabajo.archivo.save(f'{trabajo.pk}/{filename}', File(archivo), save=False)
+        trabajo.estado = 'listo'
+    except Exception as error:
+        trabajo.estado = 'error'
+        trabajo.error = str(error)
+    trabajo.terminado = timezone.now()
+    trabajo.save(update_fields=['archivo', 'estado', 'error', 'terminado'])
+    return trabajo
@@ -3,6 +3,7 @@ Formularios para la app core.
 """
 from django import forms
 from django.contrib.auth.forms import AuthenticationForm
+from django.core.validators import FileExtensionValidator
 from captcha.fields import CaptchaField
 
 
@@ -36,3 +37,18 @@ class LoginFormWithCaptcha(AuthenticationForm):
             'class': 'form-control',
             'placeholder': 'Ingrese el código'
         })
+
+
+class SincronizacionForm(forms.Form):
+    """Formulario para subir una hoja de cálculo de clientes o proveedores."""
+    archivo = forms.FileField(
+        label='Archivo CSV o Excel (.xlsx)',
+        validators=[FileExtensionValidator(['csv', 'xlsx'])],
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+    solo_validar = forms.BooleanField(
+        label='Solo validar',
+        required=False,
+        help_text='Muestra lo que se crearía o actualizaría sin guardar nada.',
+        widget=forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+    )
@@ -0,0 +1,231 @@
+"""
+Instrumentación SQL por petición.
+
+El middleware envuelve cada conexión con `execute_wrapper` para medir cuántas consultas
+ejecuta una petición, cuánto tiempo pasan en la base de datos y cuántas repiten un SQL
+ya ejecutado (típico de N+1). Con esos datos:
+
+- añade el encabezado `Server-Timing` cuando el usuario es staff;
+- registra en el logger `core.sql` las peticiones que superan SQL_LENTO_MS o
+  SQL_CONSULTAS_MAX, con sus consultas más costosas (y su EXPLAIN si DEBUG);
+- acumula un resumen por vista y por hora (MetricaSQLVista, visible en el admin),
+  que se escribe en la base de datos cada SQL_RESUMEN_INTERVALO segundos.
+
+Las consultas que una vista lanza en otros hilos (core.concurrencia) se miden con el
+medidor de la petición, publicado en la variable de contexto `medidor_actual`.
+"""
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+logger = logging.getLogger('core.sql')
+
+# Consultas listadas en el log de una petición lenta
+CONSULTAS_EN_LOG = 5
+
+# Medidor de la petición en curso; los hilos de core.concurrencia heredan el contexto
+medidor_actual = ContextVar('medidor_sql', default=None)
+
+
+class MedidorSQL:
+    """Execute wrapper que acumula el número, la duración y la repetición de las consultas."""
+
+    def __init__(self):
+        # Las vistas asíncronas ejecutan consultas desde varios hilos a la vez
+        self.lock = threading.Lock()
+        self.consultas = 0
+        self.tiempo = 0.0
+        # {sql: [ejecuciones, segundos, params de la ejecución más lenta, segundos de esa ejecución, alias]}
+        self.por_sql = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duracion = time.perf_counter() - inicio
+            with self.lock:
+                self.consultas += 1
+                self.tiempo += duracion
+                datos = self.por_sql.get(sql)
+                if datos is None:
+                    self.por_sql[sql] = [1, duracion, params, duracion, context['connection'].alias]
+                else:
+                    datos[0] += 1
+                    datos[1] += duracion
+                    if duracion > datos[3]:
+                        datos[2], datos[3] = params, duracion
+
+    @property
+    def repetidas(self):
+        return sum(datos[0] - 1 for datos in self.por_sql.values())
+
+    def mas_costosas(self, cantidad=CONSULTAS_EN_LOG):
+        """Devuelve las `cantidad` sentencias con más tiempo acumulado."""
+        return sorted(self.por_sql.items(), key=lambda item: item[1][1], reverse=True)[:cantidad]
+
+
+@contextmanager
+def medir_conexiones(medidor):
+    """Aplica `medidor` a todas las conexiones del hilo actual mientras dure el bloque."""
+    with ExitStack() as pila:
+        for connection in connections.all():
+            pila.enter_context(connection.execute_wrapper(medidor))
+        yield
+
+
+def _explicar(sql, params, alias):
+    """EXPLAIN de una consulta SELECT registrada; None si no aplica o falla."""
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return '\n'.join(' '.join(str(valor) for valor in fila) for fila in cursor.fetchall())
+    except Exception as error:
+        return f'(EXPLAIN no disponible: {error})'
+
+
+class _ResumenVistas:
+    """
+    Acumula las métricas por (vista, hora) en memoria del proceso y las vuelca a
+    MetricaSQLVista con UPDATE ... F() cada SQL_RESUMEN_INTERVALO segundos.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pendientes = {}
+        self.ultimo_volcado = time.monotonic()
+
+    def registrar(self, vista, medidor, tiempo_total):
+        hora = timezone.now().replace(minute=0, second=0, microsecond=0)
+        tiempo_db_ms = medidor.tiempo * 1000
+        with self.lock:
+            datos = self.pendientes.setdefault((vista, hora), {
+                'peticiones': 0, 'consultas': 0, 'repetidas': 0, 'tiempo_db_ms': 0.0,
+                'tiempo_total_ms': 0.0, 'max_tiempo_db_ms': 0.0, 'max_consultas': 0,
+            })
+            datos['peticiones'] += 1
+            datos['consultas'] += medidor.consultas
+            datos['repetidas'] += medidor.repetidas
+            datos['tiempo_db_ms'] += tiempo_db_ms
+            datos['tiempo_total_ms'] += tiempo_total * 1000
+            datos['max_tiempo_db_ms'] = max(datos['max_tiempo_db_ms'], tiempo_db_ms)
+            datos['max_consultas'] = max(datos['max_consultas'], medidor.consultas)
+
+            if time.monotonic() - self.ultimo_volcado < settings.SQL_RESUMEN_INTERVALO:
+                return
+            pendientes, self.pendientes = self.pendientes, {}
+            self.ultimo_volcado = time.monotonic()
+
+        try:
+            self._volcar(pendientes)
+        except Exception:
+            logger.exception('No se pudo guardar el resumen SQL por vista')
+
+    def _volcar(self, pendientes):
+        from .models import MetricaSQLVista
+
+        for (vista, hora), datos in pendientes.items():
+            actualizadas = MetricaSQLVista.objects.filter(vista=vista, hora=hora).update(
+                peticiones=F('peticiones') + datos['peticiones'],
+                consultas=F('consultas') + datos['consultas'],
+                repetidas=F('repetidas') + datos['repetidas'],
+                tiempo_db_ms=F('tiempo_db_ms') + datos['tiempo_db_ms'],
+                tiempo_total_ms=F('tiempo_total_ms') + datos['tiempo_total_ms'],
+                max_tiempo_db_ms=Greatest('max_tiempo_db_ms', datos['max_tiempo_db_ms']),
+                max_consultas=Greatest('max_consultas', datos['max_consultas']),
+            )
+            if not actualizadas:
+                _, creada = MetricaSQLVista.objects.get_or_create(vista=vista, hora=hora, defaults=datos)
+                if not creada:
+                    # Otro proceso creó la fila entre el UPDATE y el INSERT
+                    self._volcar({(vista, hora): datos})
+
+        limite = timezone.now() - timedelta(days=settings.SQL_RESUMEN_DIAS)
+        MetricaSQLVista.objects.filter(hora__lt=limite).delete()
+
+
+resumen_vistas = _ResumenVistas()
+
+
+class InstrumentacionSQLMiddleware:
+    """
+    Mide el SQL de cada petición. Debe ir después de AuthenticationMiddleware para
+    poder decidir si se envía Server-Timing (solo staff).
+    Se desactiva con SQL_INSTRUMENTACION = False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SQL_INSTRUMENTACION:
+            return self.get_response(request)
+
+        medidor = MedidorSQL()
+        inicio = time.perf_counter()
+        token = medidor_actual.set(medidor)
+        try:
+            with medir_conexiones(medidor):
+                response = self.get_response(request)
+        finally:
+            medidor_actual.reset(token)
+
+        if response.streaming:
+            # Las exportaciones en streaming consultan mientras se envía el cuerpo
+            response.streaming_content = self._medir_streaming(
+                request, response.streaming_content, medidor, inicio
+            )
+        else:
+            self._finalizar(request, medidor, time.perf_counter() - inicio)
+
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_staff:
+            response['Server-Timing'] = (
+                f'db;dur={medidor.tiempo * 1000:.1f};desc="{medidor.consultas} consultas, '
+                f'{medidor.repetidas} repetidas", '
+                f'total;dur={(time.perf_counter() - inicio) * 1000:.1f}'
+            )
+        return response
+
+    def _medir_streaming(self, request, contenido, medidor, inicio):
+        try:
+            with medir_conexiones(medidor):
+                yield from contenido
+        finally:
+            self._finalizar(request, medidor, time.perf_counter() - inicio)
+
+    def _finalizar(self, request, medidor, tiempo_total):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_vista'
+
+        tiempo_db_ms = medidor.tiempo * 1000
+        if tiempo_db_ms >= settings.SQL_LENTO_MS or medidor.consultas >= settings.SQL_CONSULTAS_MAX:
+            self._registrar_lenta(request, vista, medidor, tiempo_total)
+
+        resumen_vistas.registrar(vista, medidor, tiempo_total)
+
+    def _registrar_lenta(self, request, vista, medidor, tiempo_total):
+        lineas = [
+            f'{request.method} {request.path} ({vista}): {medidor.consultas} consultas, '
+            f'{medidor.repetidas} repetidas, {medidor.tiempo * 1000:.1f} ms en BD, '
+            f'{tiempo_total * 1000:.1f} ms en total'
+        ]
+        for sql, (ejecuciones, duracion, params, _, alias) in medidor.mas_costosas():
+            lineas.append(f'  {duracion * 1000:.1f} ms x{ejecuciones}: {sql}')
+            if settings.DEBUG:
+                plan = _explicar(sql, params, alias)
+                if plan:
+                    lineas.append('    ' + plan.replace('\n', '\n    '))
+        logger.warning('\n'.join(lineas))
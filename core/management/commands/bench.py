@@ -0,0 +1,233 @@
+"""
+Comando para medir los endpoints principales con el cliente de pruebas de Django.
+
+Cada endpoint se ejecuta --repeticiones veces (tras --calentamiento ejecuciones sin
+medir) y se reportan latencias p50/p95, número de consultas SQL y memoria pico
+(una ejecución adicional con tracemalloc). Las consultas de las vistas se ejecutan
+en serie (CONSULTAS_PARALELAS = False) para contarlas todas. El resultado es JSON,
+para comparar ejecuciones antes y después de un cambio. Las mediciones de creación escriben en
+la base de datos: usar sobre datos generados con `seed_bench`.
+
+Uso:
+    python manage.py bench
+    python manage.py bench --repeticiones 50 --salida antes.json
+    python manage.py bench --solo dashboard ventas_lista --cache-frio
+"""
+import json
+import platform
+import statistics
+import time
+import tracemalloc
+from decimal import Decimal
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente
+from inventario.models import TipoHuevo
+from inventario.utils import registrar_movimientos, movimientos_de_lineas
+from proveedores.models import Proveedor
+from transacciones.models import Venta, Compra
+
+
+def _percentil(valores, percentil):
+    """Percentil por interpolación lineal de una lista no vacía."""
+    ordenados = sorted(valores)
+    posicion = (len(ordenados) - 1) * percentil / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (posicion - inferior)
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia (p50/p95), consultas SQL y memoria pico de los endpoints principales y las reporta en JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeticiones', type=int, default=20, help='Ejecuciones medidas por endpoint (por defecto 20).')
+        parser.add_argument('--calentamiento', type=int, default=2, help='Ejecuciones previas sin medir (por defecto 2).')
+        parser.add_argument('--usuario', default='bench', help='Usuario con el que se autentican las peticiones.')
+        parser.add_argument('--solo', nargs='+', help='Nombres de los endpoints a medir (por defecto todos).')
+        parser.add_argument('--sin-escrituras', action='store_true', help='Omite los endpoints que crean ventas y compras.')
+        parser.add_argument('--cache-frio', action='store_true', help='Vacía la caché antes de cada petición.')
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la salida estándar).')
+
+    def handle(self, *args, **options):
+        if options['repeticiones'] < 1 or options['calentamiento'] < 0:
+            raise CommandError('--repeticiones debe ser mayor que cero y --calentamiento no puede ser negativo.')
+
+        usuario = get_user_model().objects.filter(username=options['usuario']).first()
+        if usuario is None:
+            raise CommandError(f"No existe el usuario '{options['usuario']}'. Ejecute seed_bench o use --usuario.")
+
+        # El cliente de pruebas usa el host 'testserver'
+        if 'testserver' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        self.client = Client()
+        self.client.force_login(usuario)
+        self.cache_frio = options['cache_frio']
+        # Los hilos que pre-generan facturas competirían por CPU con las mediciones
+        settings.FACTURAS_PRERENDER = False
+        # CaptureQueriesContext solo ve la conexión de este hilo: las consultas que
+        # core.concurrencia lanza en su pool no se contarían
+        settings.CONSULTAS_PARALELAS = False
+
+        endpoints = self._endpoints(options['sin_escrituras'])
+        if options['solo']:
+            desconocidos = set(options['solo']) - {nombre for nombre, *_ in endpoints}
+            if desconocidos:
+                raise CommandError(f"Endpoints desconocidos: {', '.join(sorted(desconocidos))}")
+            endpoints = [endpoint for endpoint in endpoints if endpoint[0] in options['solo']]
+
+        resultados = []
+        for nombre, metodo, url, datos in endpoints:
+            self.stderr.write(f'Midiendo {nombre}...')
+            resultados.append(self._medir(nombre, metodo, url, datos, options['repeticiones'], options['calentamiento']))
+
+        reporte = {
+            'fecha': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'django': django.get_version(),
+            'python': platform.python_version(),
+            'repeticiones': options['repeticiones'],
+            'cache_frio': self.cache_frio,
+            'datos': {
+                'clientes': Cliente.objects.count(),
+                'proveedores': Proveedor.objects.count(),
+                'ventas': Venta.objects.count(),
+                'compras': Compra.objects.count(),
+            },
+            'resultados': resultados,
+        }
+        salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida)
+            self.stderr.write(self.style.SUCCESS(f"Resultados guardados en {options['salida']}"))
+        else:
+            self.stdout.write(salida)
+
+    def _endpoints(self, sin_escrituras):
+        """Lista de (nombre, método, url, datos POST) a medir según los datos existentes."""
+        venta = Venta.objects.order_by('-pk').first()
+        compra = Compra.objects.order_by('-pk').first()
+        cliente = Cliente.objects.order_by('-pk').first()
+        proveedor = Proveedor.objects.order_by('-pk').first()
+        total_ventas = Venta.objects.count()
+
+        endpoints = [
+            ('dashboard', 'get', reverse('core:dashboard'), None),
+            ('ventas_lista', 'get', reverse('transacciones:ventas_list'), None),
+            ('ventas_lista_profunda', 'get', f"{reverse('transacciones:ventas_list')}?page={max(total_ventas // 10 // 2, 1)}", None),
+            ('ventas_busqueda', 'get', f"{reverse('transacciones:ventas_list')}?q=pérez", None),
+            ('compras_lista', 'get', reverse('transacciones:compras_list'), None),
+            ('clientes_lista', 'get', reverse('clientes:list'), None),
+            ('proveedores_lista', 'get', reverse('proveedores:list'), None),
+            ('inventario', 'get', reverse('inventario:list'), None),
+            ('ventas_csv', 'get', reverse('transacciones:ventas_export_csv'), None),
+            ('ventas_xlsx', 'get', reverse('transacciones:ventas_export_xlsx'), None),
+            ('compras_csv', 'get', reverse('transacciones:compras_export_csv'), None),
+        ]
+        if venta:
+            endpoints += [
+                ('venta_detalle', 'get', reverse('transacciones:venta_detail', args=[venta.pk]), None),
+                ('venta_factura', 'get', reverse('transacciones:venta_pdf', args=[venta.pk]), None),
+            ]
+        if compra:
+            endpoints.append(('compra_detalle', 'get', reverse('transacciones:compra_detail', args=[compra.pk]), None))
+        if cliente:
+            endpoints.append(('cliente_detalle', 'get', reverse('clientes:detail', args=[cliente.pk]), None))
+            endpoints += [
+                ('clientes_mapa', 'get', f"{reverse('clientes:mapa_datos')}?zoom=11&sur=4.4&oeste=-74.3&norte=4.8&este=-73.9", None),
+                ('clientes_cercanos', 'get', f"{reverse('clientes:cercanos')}?lat=4.6&lng=-74.1&n=20", None),
+            ]
+
+        tipo = TipoHuevo.objects.order_by('pk').first()
+        if sin_escrituras or tipo is None:
+            return endpoints
+
+        if cliente:
+            endpoints.append(('venta_crear', 'post', reverse('transacciones:venta_create'), {
+                'cliente': cliente.pk,
+                **self._formset(tipo, Decimal('15000')),
+            }))
+        if proveedor:
+            endpoints.append(('compra_crear', 'post', reverse('transacciones:compra_create'), {
+                'proveedor': proveedor.pk,
+                'fecha_hora': timezone.localtime().strftime('%Y-%m-%dT%H:%M'),
+                'medio_pago': 'efectivo',
+                **self._formset(tipo, Decimal('1')),
+            }))
+        return endpoints
+
+    def _formset(self, tipo, precio):
+        return {
+            'detalles-TOTAL_FORMS': '1',
+            'detalles-INITIAL_FORMS': '0',
+            'detalles-MIN_NUM_FORMS': '1',
+            'detalles-MAX_NUM_FORMS': '1000',
+            'detalles-0-tipo_huevo': tipo.pk,
+            'detalles-0-cantidad_cubetas': '1',
+            'detalles-0-precio_unitario_cubeta': str(precio),
+        }
+
+    def _preparar(self, nombre, datos):
+        """Preparación de cada petición; se ejecuta fuera del tiempo y de las consultas medidas."""
+        if self.cache_frio:
+            cache.clear()
+        if nombre == 'venta_crear':
+            # Asegura stock para que la venta medida no falle por inventario
+            registrar_movimientos(movimientos_de_lineas([(None, datos['detalles-0-tipo_huevo'], 1)], 'ajuste'))
+
+    def _peticion(self, metodo, url, datos):
+        response = getattr(self.client, metodo)(url, datos) if datos else getattr(self.client, metodo)(url)
+        if response.streaming:
+            for _ in response.streaming_content:
+                pass
+        response.close()
+        return response
+
+    def _medir(self, nombre, metodo, url, datos, repeticiones, calentamiento):
+        for _ in range(calentamiento):
+            self._preparar(nombre, datos)
+            self._peticion(metodo, url, datos)
+
+        tiempos, consultas, estados = [], [], set()
+        for _ in range(repeticiones):
+            self._preparar(nombre, datos)
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = self._peticion(metodo, url, datos)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+            estados.add(response.status_code)
+
+        # Memoria pico en una ejecución aparte: tracemalloc distorsiona las latencias
+        self._preparar(nombre, datos)
+        tracemalloc.start()
+        try:
+            self._peticion(metodo, url, datos)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'nombre': nombre,
+            'metodo': metodo.upper(),
+            'url': url,
+            'estados': sorted(estados),
+            'p50_ms': round(_percentil(tiempos, 50), 2),
+            'p95_ms': round(_percentil(tiempos, 95), 2),
+            'min_ms': round(min(tiempos), 2),
+            'max_ms': round(max(tiempos), 2),
+            'media_ms': round(statistics.mean(tiempos), 2),
+            'consultas': max(consultas),
+            'memoria_pico_kb': round(pico / 1024, 1),
+        }
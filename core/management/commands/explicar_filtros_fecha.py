@@ -0,0 +1,51 @@
+"""
+Compara el plan de ejecución y el tiempo de los filtros por fecha antiguos
+(`fecha_hora__date__gte/lte`) con los límites semiabiertos de filtro_rango_fechas.
+
+Uso:
+    python manage.py explicar_filtros_fecha
+    python manage.py explicar_filtros_fecha --desde 2025-01-01 --hasta 2025-01-31 --repeticiones 50
+"""
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import TransaccionCaja
+from core.utils import filtro_rango_fechas
+from transacciones.models import Venta, Compra
+
+
+class Command(BaseCommand):
+    help = 'Muestra EXPLAIN y tiempos de los filtros por fecha con y sin índices utilizables.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial (por defecto, hace 30 días).')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final (por defecto, hoy).')
+        parser.add_argument('--repeticiones', type=int, default=20, help='Ejecuciones por consulta para promediar (por defecto 20).')
+
+    def handle(self, *args, **options):
+        hasta = options['hasta'] or timezone.localdate()
+        desde = options['desde'] or hasta - timedelta(days=29)
+        repeticiones = max(options['repeticiones'], 1)
+
+        casos = [
+            ('Venta', Venta.objects.all()),
+            ('Compra', Compra.objects.all()),
+            ('TransaccionCaja (ingresos)', TransaccionCaja.objects.filter(tipo='ingreso')),
+        ]
+        for nombre, base in casos:
+            anterior = base.filter(fecha_hora__date__gte=desde, fecha_hora__date__lte=hasta)
+            nuevo = base.filter(**filtro_rango_fechas('fecha_hora', desde, hasta))
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f'\n== {nombre}: {desde} a {hasta} =='))
+            for etiqueta, qs in (('fecha_hora__date (anterior)', anterior), ('rango semiabierto (nuevo)', nuevo)):
+                consulta = qs.order_by('-fecha_hora').values_list('id', flat=True)
+                inicio = time.perf_counter()
+                for _ in range(repeticiones):
+                    filas = len(list(consulta))
+                promedio_ms = (time.perf_counter() - inicio) * 1000 / repeticiones
+
+                self.stdout.write(self.style.SUCCESS(f'-- {etiqueta}: {filas} filas, {promedio_ms:.2f} ms promedio'))
+                self.stdout.write(consulta.explain())
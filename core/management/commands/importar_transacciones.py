@@ -0,0 +1,80 @@
+"""
+Comando para importar ventas o compras históricas desde un archivo CSV o XLSX.
+
+El formato del archivo se describe en transacciones/importacion.py. Los documentos se
+guardan por lotes; un documento con errores se rechaza completo y sus filas se escriben
+en el reporte (--errores) para corregirlas y volver a importarlas.
+
+Las compras importadas no validan el saldo en caja (SaldoInsuficiente) como las creadas
+desde la web: un histórico puede dejar la caja en negativo mientras se carga.
+
+Uso:
+    python manage.py importar_transacciones ventas.xlsx --tipo ventas --usuario admin
+    python manage.py importar_transacciones compras.csv --tipo compras --errores errores.csv
+    python manage.py importar_transacciones ventas.csv --tipo ventas --usuario admin --validar
+    python manage.py importar_transacciones ventas.csv --tipo ventas --usuario admin --sin-stock
+"""
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from transacciones.importacion import Importador, leer_filas, IMPORTACION_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        'Importa ventas o compras históricas desde un archivo CSV o XLSX por lotes. '
+        'Las compras importadas no validan el saldo en caja.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx.')
+        parser.add_argument('--tipo', choices=['ventas', 'compras'], required=True, help='Tipo de documentos del archivo.')
+        parser.add_argument('--usuario', help='Vendedor de las ventas sin columna vendedor.')
+        parser.add_argument('--sin-stock', action='store_true', help='No modifica el inventario (si el stock actual ya refleja el histórico).')
+        parser.add_argument('--validar', action='store_true', help='Solo valida el archivo; no guarda nada.')
+        parser.add_argument('--lote', type=int, default=IMPORTACION_LOTE, help=f'Documentos por transacción (por defecto {IMPORTACION_LOTE}).')
+        parser.add_argument('--errores', help='Archivo CSV donde escribir las filas rechazadas.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+
+        usuario = None
+        if options['usuario']:
+            usuario = get_user_model().objects.filter(username=options['usuario']).first()
+            if usuario is None:
+                raise CommandError(f"No existe el usuario '{options['usuario']}'.")
+
+        reporte = open(options['errores'], 'w', encoding='utf-8-sig', newline='') if options['errores'] else None
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                importador = Importador(
+                    options['tipo'], usuario,
+                    aplicar_stock=not options['sin_stock'],
+                    solo_validar=options['validar'],
+                    reporte=reporte,
+                    lote=options['lote'],
+                )
+                resumen = importador.ejecutar(leer_filas(archivo, options['archivo'], importador.obligatorias))
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if reporte is not None:
+                reporte.close()
+
+        for fila, motivo in importador.errores:
+            self.stdout.write(self.style.WARNING(f'Fila {fila}: {motivo}'))
+        if resumen['filas_con_error'] > len(importador.errores):
+            self.stdout.write(f"... y {resumen['filas_con_error'] - len(importador.errores)} filas más con error.")
+
+        accion = 'válidos' if options['validar'] else 'importados'
+        estilo = self.style.SUCCESS if not resumen['filas_con_error'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"{resumen['documentos']} documentos ({resumen['lineas']} líneas) {accion} y "
+            f"{resumen['filas_con_error']} filas con error en {time.perf_counter() - inicio:.1f} s."
+        ))
+        if resumen['filas_con_error'] and options['errores']:
+            self.stdout.write(f"Reporte de errores: {options['errores']}")
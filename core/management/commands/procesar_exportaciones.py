@@ -0,0 +1,78 @@
+"""
+Worker que genera las exportaciones pesadas y procesa las importaciones de ventas y
+compras subidas desde la web, fuera de las peticiones HTTP.
+Usa la base de datos como cola; no necesita un broker externo. Un trabajo que quedó
+'procesando' porque su worker se detuvo se retoma pasados TRABAJOS_LEASE_SEGUNDOS; las
+importaciones siguen desde el último lote guardado.
+
+Uso:
+    python manage.py procesar_exportaciones
+    python manage.py procesar_exportaciones --una-vez
+    python manage.py procesar_exportaciones --intervalo 5 --purgar-dias 7
+"""
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from django.utils import timezone
+
+from core.exports import tomar_siguiente_trabajo, procesar_trabajo
+from core.models import TrabajoExportacion
+from transacciones.importacion import tomar_siguiente_importacion, procesar_importacion
+from transacciones.models import ImportacionTransacciones
+
+
+class Command(BaseCommand):
+    help = 'Procesa los trabajos de exportación (PDF de ventas y compras) y las importaciones pendientes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='Procesa los pendientes y termina.')
+        parser.add_argument('--intervalo', type=float, default=2, help='Segundos de espera cuando no hay trabajos (por defecto 2).')
+        parser.add_argument('--purgar-dias', type=int, default=7, help='Elimina trabajos (y archivos de importaciones) terminados hace más de N días (por defecto 7; 0 desactiva).')
+
+    def handle(self, *args, **options):
+        self._purgar(options['purgar_dias'])
+
+        while True:
+            close_old_connections()
+            trabajo = tomar_siguiente_trabajo()
+            if trabajo is not None:
+                procesar_trabajo(trabajo)
+                estilo = self.style.SUCCESS if trabajo.estado == 'listo' else self.style.ERROR
+                self.stdout.write(estilo(f'{trabajo}'))
+                continue
+
+            importacion = tomar_siguiente_importacion()
+            if importacion is not None:
+                procesar_importacion(importacion)
+                estilo = self.style.SUCCESS if importacion.estado == 'listo' else self.style.ERROR
+                self.stdout.write(estilo(
+                    f'{importacion}: {importacion.documentos_creados} documentos, '
+                    f'{importacion.filas_con_error} filas con error'
+                ))
+                continue
+
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _purgar(self, dias):
+        """Elimina trabajos terminados antiguos junto con sus archivos, y los archivos de importaciones antiguas."""
+        if dias <= 0:
+            return
+        limite = timezone.now() - timedelta(days=dias)
+        antiguos = TrabajoExportacion.objects.filter(estado__in=['listo', 'error'], terminado__lt=limite)
+        for trabajo in antiguos.iterator():
+            if trabajo.archivo:
+                trabajo.archivo.delete(save=False)
+            trabajo.delete()
+
+        # De las importaciones se conserva el registro; solo se borran los archivos
+        importaciones = ImportacionTransacciones.objects.filter(
+            estado__in=['listo', 'error'], terminado__lt=limite
+        ).exclude(archivo='', reporte='')
+        for importacion in importaciones.iterator():
+            importacion.archivo.delete(save=False)
+            importacion.reporte.delete(save=False)
+            importacion.save(update_fields=['archivo', 'reporte'])
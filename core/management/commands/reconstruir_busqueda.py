@@ -0,0 +1,23 @@
+"""
+Comando para crear o reparar los índices de búsqueda de clientes y proveedores.
+
+En SQLite reconstruye las tablas FTS5 y sus triggers (necesario si una migración
+recreó la tabla de clientes o proveedores); en PostgreSQL crea los índices trigram
+que falten.
+
+Uso:
+    python manage.py reconstruir_busqueda
+"""
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from core.busqueda import instalar_indices_busqueda
+
+
+class Command(BaseCommand):
+    help = 'Crea o reconstruye los índices de búsqueda de texto (FTS5 en SQLite, trigram en PostgreSQL).'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            instalar_indices_busqueda(connection)
+        self.stdout.write(self.style.SUCCESS(f'Índices de búsqueda listos ({connection.vendor}).'))
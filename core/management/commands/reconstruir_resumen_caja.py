@@ -0,0 +1,64 @@
+"""
+Comando para reconstruir los resúmenes diarios de caja desde el libro de transacciones.
+
+Uso:
+    python manage.py reconstruir_resumen_caja
+    python manage.py reconstruir_resumen_caja --desde 2025-01-01 --hasta 2025-12-31 --dias-por-lote 31
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from core.models import TransaccionCaja, CajaResumenDiario
+from core.utils import resumir_transacciones_por_dia, invalidar_cache_caja, filtro_rango_fechas
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye CajaResumenDiario para un rango de fechas, procesando por lotes de días.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', type=date.fromisoformat, help='Fecha inicial (YYYY-MM-DD). Por defecto, la primera transacción.')
+        parser.add_argument('--hasta', type=date.fromisoformat, help='Fecha final (YYYY-MM-DD). Por defecto, la última transacción.')
+        parser.add_argument('--dias-por-lote', type=int, default=31, help='Días procesados por transacción (por defecto 31).')
+
+    def handle(self, *args, **options):
+        dias_por_lote = options['dias_por_lote']
+        if dias_por_lote < 1:
+            raise CommandError('--dias-por-lote debe ser mayor que cero.')
+
+        limites = TransaccionCaja.objects.aggregate(primera=Min('fecha_hora'), ultima=Max('fecha_hora'))
+        desde = options['desde'] or (timezone.localdate(limites['primera']) if limites['primera'] else None)
+        hasta = options['hasta'] or (timezone.localdate(limites['ultima']) if limites['ultima'] else None)
+        if desde is None or hasta is None:
+            self.stdout.write('No hay transacciones de caja para resumir.')
+            return
+        if desde > hasta:
+            raise CommandError('--desde no puede ser posterior a --hasta.')
+
+        total_dias = 0
+        inicio = desde
+        while inicio <= hasta:
+            fin = min(inicio + timedelta(days=dias_por_lote - 1), hasta)
+            total_dias += self._reconstruir_lote(inicio, fin)
+            self.stdout.write(f'{inicio} a {fin}: reconstruido.')
+            inicio = fin + timedelta(days=1)
+        invalidar_cache_caja()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Resumen diario reconstruido del {desde} al {hasta} ({total_dias} días con movimientos).'
+        ))
+
+    def _reconstruir_lote(self, inicio, fin):
+        """Reemplaza los resúmenes de [inicio, fin] con los totales del libro. Devuelve los días creados."""
+        transacciones = TransaccionCaja.objects.filter(**filtro_rango_fechas('fecha_hora', inicio, fin))
+        with transaction.atomic():
+            por_dia = resumir_transacciones_por_dia(transacciones)
+            CajaResumenDiario.objects.filter(fecha__gte=inicio, fecha__lte=fin).delete()
+            CajaResumenDiario.objects.bulk_create(
+                [CajaResumenDiario(fecha=fecha, **totales) for fecha, totales in por_dia.items()],
+                batch_size=1000
+            )
+        return len(por_dia)
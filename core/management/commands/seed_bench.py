@@ -0,0 +1,200 @@
+"""
+Comando para generar datos sintéticos a escala y medir el rendimiento con `bench`.
+
+Inserta clientes, proveedores, ventas, compras (con sus detalles) y los movimientos
+de caja correspondientes usando bulk_create por lotes, con fechas repartidas en los
+últimos --dias días. Al final recalcula el saldo y los resúmenes diarios de caja.
+No usar en una base de datos de producción.
+
+Uso:
+    python manage.py seed_bench
+    python manage.py seed_bench --clientes 20000 --proveedores 500 --ventas 500000 --compras 100000
+"""
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import Cliente
+from core.models import TransaccionCaja
+from core.utils import recalcular_saldo, invalidar_cache_caja, sin_auto_now_add
+from inventario.models import TipoHuevo
+from proveedores.models import Proveedor
+from transacciones.listados import invalidar_listados
+from transacciones.models import Venta, DetalleVenta, Compra, DetalleCompra
+
+NOMBRES = ['Ana', 'Luis', 'Carlos', 'María', 'Jorge', 'Lucía', 'Pedro', 'Sofía', 'Andrés', 'Camila']
+APELLIDOS = ['Gómez', 'Rodríguez', 'López', 'Martínez', 'García', 'Pérez', 'Sánchez', 'Ramírez', 'Torres', 'Díaz']
+EMPRESAS = ['Granja', 'Avícola', 'Distribuidora', 'Huevos', 'Agropecuaria']
+
+PRECIOS_BASE = {'A': Decimal('12000'), 'AA': Decimal('14000'), 'AAA': Decimal('16000')}
+
+
+class Command(BaseCommand):
+    help = 'Genera datos sintéticos (clientes, proveedores, ventas, compras y caja) para pruebas de rendimiento.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clientes', type=int, default=1000, help='Clientes a crear (por defecto 1000).')
+        parser.add_argument('--proveedores', type=int, default=100, help='Proveedores a crear (por defecto 100).')
+        parser.add_argument('--ventas', type=int, default=10000, help='Ventas a crear (por defecto 10000).')
+        parser.add_argument('--compras', type=int, default=2000, help='Compras a crear (por defecto 2000).')
+        parser.add_argument('--max-lineas', type=int, default=3, help='Máximo de líneas por venta/compra (por defecto 3).')
+        parser.add_argument('--dias', type=int, default=365, help='Días hacia atrás en que se reparten las fechas (por defecto 365).')
+        parser.add_argument('--lote', type=int, default=5000, help='Filas por bulk_create (por defecto 5000).')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla aleatoria para datos reproducibles.')
+        parser.add_argument('--usuario', default='bench', help='Usuario vendedor de las ventas (se crea si no existe).')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1 or options['max_lineas'] < 1 or options['dias'] < 1:
+            raise CommandError('--lote, --max-lineas y --dias deben ser mayores que cero.')
+        if options['ventas'] and not (options['clientes'] or Cliente.objects.exists()):
+            raise CommandError('Se necesitan clientes para generar ventas.')
+        if options['compras'] and not (options['proveedores'] or Proveedor.objects.exists()):
+            raise CommandError('Se necesitan proveedores para generar compras.')
+
+        self.rng = random.Random(options['semilla'])
+        self.lote = options['lote']
+        self.max_lineas = options['max_lineas']
+        self.ahora = timezone.now()
+        self.segundos = options['dias'] * 24 * 3600
+        # Sufijo único por ejecución para no chocar con documentos (cédula/NIT) existentes
+        self.sufijo = format(int(time.time()), 'x')[-6:]
+
+        inicio = time.perf_counter()
+        self.tipos = self._tipos_huevo()
+        self.vendedor = self._vendedor(options['usuario'])
+
+        clientes = self._crear_clientes(options['clientes'])
+        proveedores = self._crear_proveedores(options['proveedores'])
+        clientes = clientes or list(Cliente.objects.values_list('pk', flat=True))
+        proveedores = proveedores or list(Proveedor.objects.values_list('pk', flat=True))
+
+        ventas = self._crear_documentos(options['ventas'], clientes, es_venta=True)
+        compras = self._crear_documentos(options['compras'], proveedores, es_venta=False)
+
+        self.stdout.write('Recalculando saldo y resúmenes diarios de caja...')
+        recalcular_saldo()
+        call_command('reconstruir_resumen_caja', stdout=self.stdout)
+        invalidar_cache_caja()
+        invalidar_listados()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Listo en {time.perf_counter() - inicio:.1f} s: {len(clientes)} clientes, '
+            f'{len(proveedores)} proveedores, {ventas} ventas y {compras} compras.'
+        ))
+
+    def _fecha(self):
+        return self.ahora - timedelta(seconds=self.rng.randrange(self.segundos))
+
+    def _tipos_huevo(self):
+        tipos = []
+        for tipo, precio in PRECIOS_BASE.items():
+            tipo_huevo, _ = TipoHuevo.objects.get_or_create(tipo=tipo, defaults={'precio_cubeta': precio})
+            tipos.append(tipo_huevo)
+        return tipos
+
+    def _vendedor(self, username):
+        usuario, creado = get_user_model().objects.get_or_create(username=username)
+        if creado:
+            usuario.set_unusable_password()
+            usuario.save(update_fields=['password'])
+        return usuario
+
+    def _nombre(self):
+        return f'{self.rng.choice(NOMBRES)} {self.rng.choice(APELLIDOS)}'
+
+    def _crear_clientes(self, cantidad):
+        ids = []
+        for desde in range(0, cantidad, self.lote):
+            clientes = [
+                Cliente(
+                    nombre=self._nombre(),
+                    cedula_nit=f'BC{self.sufijo}{i}',
+                    direccion=f'Calle {self.rng.randint(1, 200)} # {self.rng.randint(1, 99)}-{self.rng.randint(1, 99)}',
+                    telefono=f'3{self.rng.randrange(10 ** 9):09d}',
+                    email=f'cliente{self.sufijo}{i}@bench.local',
+                    latitud=4.6 + self.rng.uniform(-0.2, 0.2),
+                    longitud=-74.1 + self.rng.uniform(-0.2, 0.2),
+                )
+                for i in range(desde, min(desde + self.lote, cantidad))
+            ]
+            ids.extend(cliente.pk for cliente in Cliente.objects.bulk_create(clientes))
+        if cantidad:
+            self.stdout.write(f'{cantidad} clientes creados.')
+        return ids
+
+    def _crear_proveedores(self, cantidad):
+        ids = []
+        for desde in range(0, cantidad, self.lote):
+            proveedores = [
+                Proveedor(
+                    nombre=f'{self.rng.choice(EMPRESAS)} {self.rng.choice(APELLIDOS)}',
+                    nit=f'BP{self.sufijo}{i}',
+                    direccion=f'Km {self.rng.randint(1, 50)} vía {self.rng.choice(APELLIDOS)}',
+                    telefono=f'6{self.rng.randrange(10 ** 9):09d}',
+                    email=f'proveedor{self.sufijo}{i}@bench.local',
+                    rut='documentos/proveedores/rut/bench.pdf',
+                    camara_comercio='documentos/proveedores/camara_comercio/bench.pdf',
+                )
+                for i in range(desde, min(desde + self.lote, cantidad))
+            ]
+            ids.extend(proveedor.pk for proveedor in Proveedor.objects.bulk_create(proveedores))
+        if cantidad:
+            self.stdout.write(f'{cantidad} proveedores creados.')
+        return ids
+
+    def _lineas(self, es_venta):
+        lineas = []
+        for tipo in self.rng.sample(self.tipos, min(self.rng.randint(1, self.max_lineas), len(self.tipos))):
+            precio = PRECIOS_BASE[tipo.tipo] * Decimal(self.rng.choice(['0.9', '1', '1.1'] if es_venta else ['0.7', '0.8']))
+            lineas.append((tipo.pk, self.rng.randint(1, 20), precio.quantize(Decimal('0.01'))))
+        return lineas
+
+    def _crear_documentos(self, cantidad, terceros, es_venta):
+        """Crea ventas o compras por lotes: documentos, detalles y movimientos de caja."""
+        modelo, detalle_modelo = (Venta, DetalleVenta) if es_venta else (Compra, DetalleCompra)
+        creados = 0
+        for desde in range(0, cantidad, self.lote):
+            tamano = min(self.lote, cantidad - desde)
+            documentos, lineas_por_documento = [], []
+            for _ in range(tamano):
+                lineas = self._lineas(es_venta)
+                total = sum(cantidad_cubetas * precio for _, cantidad_cubetas, precio in lineas)
+                if es_venta:
+                    documento = Venta(cliente_id=self.rng.choice(terceros), usuario_vendedor=self.vendedor,
+                                      fecha_hora=self._fecha(), total=total)
+                else:
+                    documento = Compra(proveedor_id=self.rng.choice(terceros), fecha_hora=self._fecha(),
+                                       medio_pago=self.rng.choice(['efectivo', 'transferencia']), total=total)
+                documentos.append(documento)
+                lineas_por_documento.append(lineas)
+
+            with transaction.atomic(), sin_auto_now_add(Venta), sin_auto_now_add(TransaccionCaja):
+                modelo.objects.bulk_create(documentos)
+                campo_fk = 'venta_id' if es_venta else 'compra_id'
+                detalle_modelo.objects.bulk_create([
+                    detalle_modelo(**{campo_fk: documento.pk}, tipo_huevo_id=tipo_id,
+                                   cantidad_cubetas=cantidad_cubetas, precio_unitario_cubeta=precio)
+                    for documento, lineas in zip(documentos, lineas_por_documento)
+                    for tipo_id, cantidad_cubetas, precio in lineas
+                ], batch_size=self.lote)
+                TransaccionCaja.objects.bulk_create([
+                    TransaccionCaja(
+                        tipo='ingreso' if es_venta else 'egreso',
+                        monto=documento.total,
+                        fecha_hora=documento.fecha_hora,
+                        descripcion=f"{'Venta' if es_venta else 'Compra'} #{documento.pk}",
+                        **{campo_fk: documento.pk},
+                    )
+                    for documento in documentos
+                ], batch_size=self.lote)
+
+            creados += tamano
+            self.stdout.write(f"{creados}/{cantidad} {'ventas' if es_venta else 'compras'}...")
+        return creados
@@ -0,0 +1,65 @@
+"""
+Comando para crear o actualizar clientes o proveedores en lote desde un archivo CSV o XLSX.
+
+Cada fila se identifica por cedula_nit (clientes) o nit (proveedores): si el registro
+existe se actualizan las columnas incluidas en el archivo, si no se crea. Las celdas
+vacías no borran valores guardados. Ver core/sincronizacion.py.
+
+Uso:
+    python manage.py sincronizar_terceros clientes.xlsx --tipo clientes
+    python manage.py sincronizar_terceros proveedores.csv --tipo proveedores --validar
+    python manage.py sincronizar_terceros clientes.csv --tipo clientes --errores errores.csv
+"""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archivos import leer_filas
+from core.sincronizacion import Sincronizador, MODELOS_SINCRONIZABLES, SINCRONIZACION_LOTE
+
+
+class Command(BaseCommand):
+    help = 'Crea o actualiza clientes o proveedores en lote desde un archivo CSV o XLSX.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo .csv o .xlsx.')
+        parser.add_argument('--tipo', choices=list(MODELOS_SINCRONIZABLES), required=True, help='Registros del archivo.')
+        parser.add_argument('--validar', action='store_true', help='Solo muestra lo que cambiaría; no guarda nada.')
+        parser.add_argument('--lote', type=int, default=SINCRONIZACION_LOTE, help=f'Filas por lote (por defecto {SINCRONIZACION_LOTE}).')
+        parser.add_argument('--errores', help='Archivo CSV donde escribir las filas rechazadas.')
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError('--lote debe ser mayor que cero.')
+
+        reporte = open(options['errores'], 'w', encoding='utf-8-sig', newline='') if options['errores'] else None
+        inicio = time.perf_counter()
+        try:
+            with open(options['archivo'], 'rb') as archivo:
+                sincronizador = Sincronizador(
+                    options['tipo'],
+                    solo_validar=options['validar'],
+                    reporte=reporte,
+                    lote=options['lote'],
+                )
+                resumen = sincronizador.ejecutar(leer_filas(archivo, options['archivo'], sincronizador.obligatorias))
+        except (OSError, ValueError) as error:
+            raise CommandError(str(error))
+        finally:
+            if reporte is not None:
+                reporte.close()
+
+        for fila, motivo in sincronizador.errores:
+            self.stdout.write(self.style.WARNING(f'Fila {fila}: {motivo}'))
+        if resumen['filas_con_error'] > len(sincronizador.errores):
+            self.stdout.write(f"... y {resumen['filas_con_error'] - len(sincronizador.errores)} filas más con error.")
+
+        prefijo = 'Validación (sin guardar): ' if options['validar'] else ''
+        estilo = self.style.SUCCESS if not resumen['filas_con_error'] else self.style.WARNING
+        self.stdout.write(estilo(
+            f"{prefijo}{resumen['creados']} nuevos, {resumen['actualizados']} actualizados, "
+            f"{resumen['sin_cambios']} sin cambios y {resumen['filas_con_error']} filas con error "
+            f"en {time.perf_counter() - inicio:.1f} s."
+        ))
+        if resumen['filas_con_error'] and options['errores']:
+            self.stdout.write(f"Reporte de errores: {options['errores']}")
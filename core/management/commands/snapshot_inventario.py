@@ -0,0 +1,48 @@
+"""
+Comando para registrar snapshots del libro de movimientos de inventario
+(ver inventario/libro.py). Pensado para ejecutarse periódicamente (p. ej. una vez al
+día con cron): así el stock en cualquier fecha solo suma los movimientos desde el
+snapshot anterior.
+
+Uso:
+    python manage.py snapshot_inventario
+    python manage.py snapshot_inventario --verificar
+    python manage.py snapshot_inventario --stock-en 2025-06-30 --sin-snapshot
+"""
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.utils import inicio_del_dia
+from inventario.libro import diferencias_libro, stock_segun_libro, tomar_snapshot
+from inventario.models import TipoHuevo
+
+
+class Command(BaseCommand):
+    help = 'Registra un snapshot del stock según el libro de movimientos de inventario.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sin-snapshot', action='store_true', help='No registra un snapshot nuevo.')
+        parser.add_argument('--verificar', action='store_true', help='Compara el stock de cada tipo con el libro; termina con error si no coinciden.')
+        parser.add_argument('--stock-en', type=date.fromisoformat, help='Muestra el stock según el libro al final de una fecha (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        if not options['sin_snapshot']:
+            creados = tomar_snapshot()
+            self.stdout.write(self.style.SUCCESS(f'{creados} snapshots registrados.'))
+
+        if options['stock_en']:
+            fin_del_dia = inicio_del_dia(options['stock_en'] + timedelta(days=1)) - timedelta(microseconds=1)
+            tipos = dict(TipoHuevo.objects.values_list('pk', 'tipo'))
+            for pk, cubetas in sorted(stock_segun_libro(fin_del_dia).items()):
+                self.stdout.write(f'{tipos[pk]}: {cubetas} cubetas al {options["stock_en"]}')
+
+        if options['verificar']:
+            diferencias = diferencias_libro()
+            for tipo, cubetas in diferencias.items():
+                self.stderr.write(self.style.ERROR(
+                    f'{tipo.tipo}: stock {tipo.stock_cubetas}, libro {cubetas} (diferencia {tipo.stock_cubetas - cubetas})'
+                ))
+            if diferencias:
+                raise CommandError('El stock no coincide con el libro de movimientos.')
+            self.stdout.write(self.style.SUCCESS('El stock coincide con el libro de movimientos.'))
@@ -0,0 +1,282 @@
+"""
+Comando para someter a carga concurrente las escrituras de ventas y compras y verificar
+la integridad del stock y de la caja al terminar.
+
+Lanza --hilos hilos (cada uno con su propia conexión a la base de datos) que crean ventas
+y compras con la misma lógica que VentaCreateView/CompraCreateView (crear_venta/crear_compra)
+y eliminan algunas de las creadas, lo que dispara las señales de transacciones/signals.py.
+Al final reporta en JSON el rendimiento, los reintentos por bloqueo, los interbloqueos y
+las violaciones de invariantes:
+
+- stock: para cada tipo de huevo, la variación del stock debe ser igual a la variación de
+  (cubetas compradas - cubetas vendidas), y el stock nunca negativo;
+- libro de inventario: el stock de cada tipo igual al que resulta del libro de movimientos;
+- caja: SaldoCaja.saldo == ingresos - egresos del libro, y la suma de CajaResumenDiario
+  igual a la del libro.
+
+Funciona con SQLite y con PostgreSQL (DATABASE_URL). Escribe datos: usar sobre una base de
+datos de prueba con clientes y proveedores (ver `seed_bench`).
+
+Uso:
+    python manage.py stress_escrituras
+    python manage.py stress_escrituras --hilos 16 --operaciones 200 --proporcion-eliminar 0.2
+"""
+import json
+import random
+import threading
+import time
+from collections import Counter
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.db.utils import DatabaseError
+from django.utils import timezone
+
+from clientes.models import Cliente
+from core.models import TransaccionCaja, SaldoCaja, CajaResumenDiario
+from core.utils import SaldoInsuficiente
+from inventario.libro import diferencias_libro
+from inventario.models import TipoHuevo
+from inventario.utils import StockInsuficiente
+from proveedores.models import Proveedor
+from transacciones.models import Venta, Compra, DetalleVenta, DetalleCompra
+from transacciones.utils import crear_venta, crear_compra
+
+# Reintentos de una operación que falló por bloqueo o interbloqueo
+MAX_REINTENTOS = 5
+
+
+def _es_interbloqueo(error):
+    """True si el error es un interbloqueo o un fallo de serialización de PostgreSQL."""
+    causa = error.__cause__
+    codigo = getattr(causa, 'sqlstate', None) or getattr(causa, 'pgcode', None)
+    return codigo in ('40P01', '40001')
+
+
+def _es_bloqueo(error):
+    """True si el error se debe a un bloqueo (SQLite 'database is locked' o timeout de lock)."""
+    mensaje = str(error).lower()
+    return isinstance(error, OperationalError) and ('locked' in mensaje or 'lock timeout' in mensaje)
+
+
+def _cubetas_por_tipo(modelo):
+    return dict(
+        modelo.objects.order_by().values_list('tipo_huevo_id').annotate(total=Sum('cantidad_cubetas'))
+    )
+
+
+def _foto_stock():
+    """Stock actual y cubetas compradas/vendidas por tipo, para comparar antes y después."""
+    return {
+        'stock': dict(TipoHuevo.objects.values_list('pk', 'stock_cubetas')),
+        'compradas': _cubetas_por_tipo(DetalleCompra),
+        'vendidas': _cubetas_por_tipo(DetalleVenta),
+    }
+
+
+def _deadlocks_postgresql():
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()')
+        return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = 'Prueba de carga concurrente de ventas/compras/eliminaciones que verifica los invariantes de stock y caja.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hilos', type=int, default=8, help='Hilos concurrentes (por defecto 8).')
+        parser.add_argument('--operaciones', type=int, default=100, help='Operaciones por hilo (por defecto 100).')
+        parser.add_argument('--proporcion-compras', type=float, default=0.3, help='Fracción de operaciones que son compras (por defecto 0.3).')
+        parser.add_argument('--proporcion-eliminar', type=float, default=0.1, help='Fracción de operaciones que eliminan una venta o compra creada (por defecto 0.1).')
+        parser.add_argument('--max-cubetas', type=int, default=5, help='Máximo de cubetas por línea (por defecto 5).')
+        parser.add_argument('--usuario', default='bench', help='Usuario vendedor de las ventas (se crea si no existe).')
+        parser.add_argument('--semilla', type=int, default=None, help='Semilla aleatoria.')
+        parser.add_argument('--salida', help='Archivo donde guardar el JSON (por defecto, la salida estándar).')
+
+    def handle(self, *args, **options):
+        if options['hilos'] < 1 or options['operaciones'] < 1:
+            raise CommandError('--hilos y --operaciones deben ser mayores que cero.')
+
+        self.tipos = list(TipoHuevo.objects.order_by('pk'))
+        self.clientes = list(Cliente.objects.values_list('pk', flat=True)[:1000])
+        self.proveedores = list(Proveedor.objects.values_list('pk', flat=True)[:1000])
+        if not (self.tipos and self.clientes and self.proveedores):
+            raise CommandError('Se necesitan tipos de huevo, clientes y proveedores (ejecute seed_bench).')
+
+        self.vendedor, _ = get_user_model().objects.get_or_create(username=options['usuario'])
+        self.opciones = options
+        self.semilla = options['semilla'] if options['semilla'] is not None else random.randrange(2 ** 32)
+        self.lock = threading.Lock()
+        self.creadas = {'venta': [], 'compra': []}
+        self.conteo = Counter()
+        self.errores = Counter()
+        self.latencias = []
+        self.espera_bloqueos = 0.0
+
+        antes = _foto_stock()
+        deadlocks_antes = _deadlocks_postgresql()
+
+        inicio = time.perf_counter()
+        hilos = [threading.Thread(target=self._trabajador, args=(indice,)) for indice in range(options['hilos'])]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        duracion = time.perf_counter() - inicio
+
+        deadlocks_despues = _deadlocks_postgresql()
+        reporte = {
+            'fecha': timezone.now().isoformat(),
+            'motor': connection.vendor,
+            'hilos': options['hilos'],
+            'operaciones_por_hilo': options['operaciones'],
+            'semilla': self.semilla,
+            'duracion_s': round(duracion, 2),
+            'operaciones': dict(self.conteo),
+            'ventas_por_segundo': round(self.conteo['venta'] / duracion, 1) if duracion else 0,
+            'operaciones_por_segundo': round(sum(
+                self.conteo[clave] for clave in ('venta', 'compra', 'eliminar_venta', 'eliminar_compra')
+            ) / duracion, 1) if duracion else 0,
+            'latencia_p50_ms': self._percentil(50),
+            'latencia_p95_ms': self._percentil(95),
+            'reintentos_bloqueo': self.errores['bloqueo'],
+            'espera_bloqueos_s': round(self.espera_bloqueos, 2),
+            'interbloqueos': self.errores['interbloqueo'],
+            'interbloqueos_postgresql': (
+                deadlocks_despues - deadlocks_antes if deadlocks_antes is not None else None
+            ),
+            'violaciones': self._verificar(antes),
+        }
+
+        salida = json.dumps(reporte, indent=2, ensure_ascii=False, default=str)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida)
+        else:
+            self.stdout.write(salida)
+
+        if reporte['violaciones']:
+            raise CommandError(f"{len(reporte['violaciones'])} violaciones de invariantes (ver reporte).")
+        self.stderr.write(self.style.SUCCESS('Invariantes de stock y caja verificados.'))
+
+    def _percentil(self, percentil):
+        if not self.latencias:
+            return None
+        ordenadas = sorted(self.latencias)
+        return round(ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * percentil / 100))], 2)
+
+    def _lineas(self, rng, precio):
+        return [
+            {
+                'tipo_huevo': tipo,
+                'cantidad_cubetas': rng.randint(1, self.opciones['max_cubetas']),
+                'precio_unitario_cubeta': precio,
+            }
+            for tipo in rng.sample(self.tipos, rng.randint(1, len(self.tipos)))
+        ]
+
+    def _operacion(self, rng):
+        """Elige y ejecuta una operación; devuelve su nombre."""
+        azar = rng.random()
+        if azar < self.opciones['proporcion_eliminar']:
+            tipo = rng.choice(['venta', 'compra'])
+            with self.lock:
+                pk = self.creadas[tipo].pop(rng.randrange(len(self.creadas[tipo]))) if self.creadas[tipo] else None
+            if pk is not None:
+                modelo = Venta if tipo == 'venta' else Compra
+                objeto = modelo.objects.filter(pk=pk).first()
+                if objeto is not None:
+                    objeto.delete()
+                return f'eliminar_{tipo}'
+            # Aún no hay nada creado que eliminar: se registra una venta en su lugar
+
+        if azar < self.opciones['proporcion_eliminar'] + self.opciones['proporcion_compras']:
+            compra = Compra(
+                proveedor_id=rng.choice(self.proveedores),
+                fecha_hora=timezone.now(),
+                medio_pago='efectivo',
+            )
+            crear_compra(compra, self._lineas(rng, Decimal('100')))
+            with self.lock:
+                self.creadas['compra'].append(compra.pk)
+            return 'compra'
+
+        venta = Venta(cliente_id=rng.choice(self.clientes), usuario_vendedor=self.vendedor)
+        crear_venta(venta, self._lineas(rng, Decimal('150')))
+        with self.lock:
+            self.creadas['venta'].append(venta.pk)
+        return 'venta'
+
+    def _trabajador(self, indice):
+        rng = random.Random(self.semilla + indice)
+        try:
+            for _ in range(self.opciones['operaciones']):
+                for intento in range(MAX_REINTENTOS + 1):
+                    inicio = time.perf_counter()
+                    try:
+                        resultado = self._operacion(rng)
+                    except StockInsuficiente:
+                        resultado = 'rechazada_stock'
+                    except SaldoInsuficiente:
+                        resultado = 'rechazada_saldo'
+                    except DatabaseError as error:
+                        espera = time.perf_counter() - inicio
+                        clave = 'interbloqueo' if _es_interbloqueo(error) else (
+                            'bloqueo' if _es_bloqueo(error) else None
+                        )
+                        if clave is None:
+                            raise
+                        with self.lock:
+                            self.errores[clave] += 1
+                            self.espera_bloqueos += espera
+                        if intento == MAX_REINTENTOS:
+                            resultado = 'fallida'
+                            break
+                        time.sleep(rng.uniform(0, 0.01 * (2 ** intento)))
+                        continue
+                    latencia = (time.perf_counter() - inicio) * 1000
+                    with self.lock:
+                        self.latencias.append(latencia)
+                    break
+                with self.lock:
+                    self.conteo[resultado] += 1
+        finally:
+            connection.close()
+
+    def _verificar(self, antes):
+        """Compara el estado final con los invariantes; devuelve la lista de violaciones."""
+        violaciones = []
+        despues = _foto_stock()
+        for tipo in self.tipos:
+            variacion_stock = despues['stock'].get(tipo.pk, 0) - antes['stock'].get(tipo.pk, 0)
+            variacion_esperada = (
+                (despues['compradas'].get(tipo.pk, 0) - antes['compradas'].get(tipo.pk, 0))
+                - (despues['vendidas'].get(tipo.pk, 0) - antes['vendidas'].get(tipo.pk, 0))
+            )
+            if variacion_stock != variacion_esperada:
+                violaciones.append(
+                    f'Stock {tipo.tipo}: varió {variacion_stock}, compras - ventas variaron {variacion_esperada}'
+                )
+            if despues['stock'].get(tipo.pk, 0) < 0:
+                violaciones.append(f'Stock {tipo.tipo} negativo: {despues["stock"][tipo.pk]}')
+
+        for tipo, cubetas in diferencias_libro().items():
+            violaciones.append(f'Stock {tipo.tipo}: {tipo.stock_cubetas} en inventario, {cubetas} según el libro')
+
+        ingresos = TransaccionCaja.objects.filter(tipo='ingreso').aggregate(total=Sum('monto'))['total'] or 0
+        egresos = TransaccionCaja.objects.filter(tipo='egreso').aggregate(total=Sum('monto'))['total'] or 0
+        saldo = SaldoCaja.objects.values_list('saldo', flat=True).first()
+        if saldo is not None and saldo != ingresos - egresos:
+            violaciones.append(f'Saldo {saldo} distinto de ingresos - egresos {ingresos - egresos}')
+
+        resumen = CajaResumenDiario.objects.aggregate(ingresos=Sum('ingresos'), egresos=Sum('egresos'))
+        if (resumen['ingresos'] or 0) != ingresos or (resumen['egresos'] or 0) != egresos:
+            violaciones.append(
+                f"Resumen diario ({resumen['ingresos']} / {resumen['egresos']}) distinto del libro ({ingresos} / {egresos})"
+            )
+        return violaciones
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:34
+
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def calcular_saldo_inicial(apps, schema_editor):
+    """Crea la fila de saldo a partir de las transacciones existentes."""
+    TransaccionCaja = apps.get_model('core', 'TransaccionCaja')
+    SaldoCaja = apps.get_model('core', 'SaldoCaja')
+
+    ingresos = TransaccionCaja.objects.filter(tipo='ingreso').aggregate(total=Sum('monto'))['total'] or 0
+    egresos = TransaccionCaja.objects.filter(tipo='egreso').aggregate(total=Sum('monto'))['total'] or 0
+    SaldoCaja.objects.update_or_create(pk=1, defaults={'saldo': ingresos - egresos})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoCaja',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saldo', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Saldo de Caja',
+                'verbose_name_plural': 'Saldo de Caja',
+            },
+        ),
+        migrations.RunPython(calcular_saldo_inicial, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:35
+
+from django.db import migrations, models
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+
+
+def poblar_resumen_diario(apps, schema_editor):
+    """Genera los resúmenes diarios a partir de las transacciones existentes."""
+    TransaccionCaja = apps.get_model('core', 'TransaccionCaja')
+    CajaResumenDiario = apps.get_model('core', 'CajaResumenDiario')
+
+    resumen = {}
+    filas = (
+        TransaccionCaja.objects.order_by()
+        .annotate(dia=TruncDate('fecha_hora'))
+        .values('dia', 'tipo')
+        .annotate(total=Sum('monto'))
+    )
+    for fila in filas:
+        dia = resumen.setdefault(fila['dia'], {'ingresos': 0, 'egresos': 0})
+        dia['ingresos' if fila['tipo'] == 'ingreso' else 'egresos'] += fila['total']
+
+    CajaResumenDiario.objects.bulk_create(
+        [CajaResumenDiario(fecha=fecha, **totales) for fecha, totales in resumen.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0003_saldocaja'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CajaResumenDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('ingresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('egresos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'Resumen Diario de Caja',
+                'verbose_name_plural': 'Resúmenes Diarios de Caja',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.RunPython(poblar_resumen_diario, migrations.RunPython.noop),
+    ]
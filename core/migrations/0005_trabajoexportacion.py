@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:40
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0004_cajaresumendiario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoExportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ventas_pdf', 'Ventas (PDF)'), ('compras_pdf', 'Compras (PDF)')], max_length=20)),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('huella', models.CharField(max_length=64)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('archivo', models.FileField(blank=True, upload_to='exportaciones/')),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='exportaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Exportación',
+                'verbose_name_plural': 'Trabajos de Exportación',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='core_trabaj_estado_24fc75_idx'), models.Index(fields=['usuario', 'huella'], name='core_trabaj_usuario_a93682_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0005_trabajoexportacion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='transaccioncaja',
+            index=models.Index(fields=['fecha_hora'], name='caja_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaccioncaja',
+            index=models.Index(fields=['tipo', 'fecha_hora'], name='caja_tipo_fecha_hora_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:10
+
+from django.db import migrations
+
+from core.busqueda import eliminar_indices_busqueda, instalar_indices_busqueda
+
+
+def instalar(apps, schema_editor):
+    instalar_indices_busqueda(schema_editor.connection)
+
+
+def eliminar(apps, schema_editor):
+    eliminar_indices_busqueda(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_indices_fecha_hora'),
+        ('clientes', '0001_initial'),
+        ('proveedores', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(instalar, eliminar),
+    ]
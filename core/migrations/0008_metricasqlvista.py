@@ -0,0 +1,37 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaSQLVista',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vista', models.CharField(max_length=150)),
+                ('hora', models.DateTimeField(help_text='Inicio de la hora resumida')),
+                ('peticiones', models.PositiveIntegerField(default=0)),
+                ('consultas', models.PositiveIntegerField(default=0)),
+                ('repetidas', models.PositiveIntegerField(default=0, help_text='Consultas con el mismo SQL ya ejecutado en la petición')),
+                ('tiempo_db_ms', models.FloatField(default=0)),
+                ('tiempo_total_ms', models.FloatField(default=0)),
+                ('max_tiempo_db_ms', models.FloatField(default=0)),
+                ('max_consultas', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Métrica SQL por Vista',
+                'verbose_name_plural': 'Métricas SQL por Vista',
+                'ordering': ['-hora', 'vista'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='metricasqlvista',
+            constraint=models.UniqueConstraint(fields=('vista', 'hora'), name='metrica_sql_vista_hora_unica'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_metricasqlvista'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoexportacion',
+            name='reclamado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
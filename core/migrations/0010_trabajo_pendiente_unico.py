@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:53
+
+from django.db import migrations, models
+
+
+def descartar_pendientes_duplicados(apps, schema_editor):
+    """Deja solo el pendiente más antiguo de cada (usuario, huella); los demás pasan a error."""
+    TrabajoExportacion = apps.get_model('core', 'TrabajoExportacion')
+    vistos = set()
+    duplicados = []
+    for trabajo in TrabajoExportacion.objects.filter(estado='pendiente').order_by('creado', 'id').only('usuario_id', 'huella'):
+        if (trabajo.usuario_id, trabajo.huella) in vistos:
+            duplicados.append(trabajo.pk)
+        vistos.add((trabajo.usuario_id, trabajo.huella))
+    TrabajoExportacion.objects.filter(pk__in=duplicados).update(estado='error', error='Solicitud duplicada')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_trabajoexportacion_reclamado'),
+    ]
+
+    operations = [
+        migrations.RunPython(descartar_pendientes_duplicados, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trabajoexportacion',
+            constraint=models.UniqueConstraint(condition=models.Q(('estado', 'pendiente')), fields=('usuario', 'huella'), name='trabajo_pendiente_unico'),
+        ),
+    ]
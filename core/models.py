@@ -1,4 +1,5 @@
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
 
 
@@ -47,6 +48,124 @@ class TransaccionCaja(models.Model):
         ordering = ['-fecha_hora']
         verbose_name = 'Transacción de Caja'
         verbose_name_plural = 'Transacciones de Caja'
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='caja_fecha_hora_idx'),
+            models.Index(fields=['tipo', 'fecha_hora'], name='caja_tipo_fecha_hora_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - ${self.monto} - {self.fecha_hora.strftime('%Y-%m-%d %H:%M')}"
+
+
+class SaldoCaja(models.Model):
+    """
+    Saldo acumulado de la caja (fila única).
+    Se mantiene al registrar o eliminar transacciones para no sumar todo el libro en cada lectura.
+    """
+    saldo = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Saldo de Caja'
+        verbose_name_plural = 'Saldo de Caja'
+
+    def __str__(self):
+        return f"Saldo: ${self.saldo}"
+
+
+class CajaResumenDiario(models.Model):
+    """
+    Totales de ingresos y egresos por día (fecha local).
+    Se actualiza al registrar o eliminar transacciones; el dashboard lee de aquí
+    en lugar de agrupar todo el libro de TransaccionCaja.
+    """
+    fecha = models.DateField(unique=True)
+    ingresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    egresos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = 'Resumen Diario de Caja'
+        verbose_name_plural = 'Resúmenes Diarios de Caja'
+
+    def __str__(self):
+        return f"{self.fecha} - Ingresos: ${self.ingresos} - Egresos: ${self.egresos}"
+
+
+class TrabajoExportacion(models.Model):
+    """
+    Exportación pesada (PDF de listados) que se genera fuera de la petición HTTP.
+    El comando `procesar_exportaciones` toma los trabajos pendientes y guarda el archivo.
+    """
+    TIPO_CHOICES = [
+        ('ventas_pdf', 'Ventas (PDF)'),
+        ('compras_pdf', 'Compras (PDF)'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='exportaciones'
+    )
+    tipo = models.CharField(max_length=20, choices=TIPO_CHOICES)
+    parametros = models.JSONField(default=dict, blank=True)
+    # Hash de tipo + parámetros, para no duplicar solicitudes pendientes iguales
+    huella = models.CharField(max_length=64)
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='pendiente')
+    archivo = models.FileField(upload_to='exportaciones/', blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    # Momento en que un worker lo reclamó; pasado TRABAJOS_LEASE_SEGUNDOS otro puede retomarlo
+    reclamado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado']
+        verbose_name = 'Trabajo de Exportación'
+        verbose_name_plural = 'Trabajos de Exportación'
+        indexes = [
+            models.Index(fields=['estado', 'creado']),
+            models.Index(fields=['usuario', 'huella']),
+        ]
+        constraints = [
+            # Un solo trabajo pendiente por usuario y solicitud (ver encolar_exportacion)
+            models.UniqueConstraint(
+                fields=['usuario', 'huella'], condition=models.Q(estado='pendiente'), name='trabajo_pendiente_unico'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.id} - {self.get_estado_display()}"
+
+
+class MetricaSQLVista(models.Model):
+    """
+    Resumen por hora del costo en base de datos de cada vista, acumulado por
+    el middleware de instrumentación SQL (core.instrumentacion).
+    """
+    vista = models.CharField(max_length=150)
+    hora = models.DateTimeField(help_text='Inicio de la hora resumida')
+    peticiones = models.PositiveIntegerField(default=0)
+    consultas = models.PositiveIntegerField(default=0)
+    repetidas = models.PositiveIntegerField(default=0, help_text='Consultas con el mismo SQL ya ejecutado en la petición')
+    tiempo_db_ms = models.FloatField(default=0)
+    tiempo_total_ms = models.FloatField(default=0)
+    max_tiempo_db_ms = models.FloatField(default=0)
+    max_consultas = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-hora', 'vista']
+        verbose_name = 'Métrica SQL por Vista'
+        verbose_name_plural = 'Métricas SQL por Vista'
+        constraints = [
+            models.UniqueConstraint(fields=['vista', 'hora'], name='metrica_sql_vista_hora_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.vista} - {self.hora:%Y-%m-%d %H:00}"
@@ -0,0 +1,202 @@
+"""
+Paginación por cursor (keyset) para listados ordenados por id descendente.
+
+En lugar de OFFSET, cada página se pide con `WHERE id < :ultimo_id` (siguiente) o
+`WHERE id > :primer_id` (anterior), así que el costo de una página es el mismo sin
+importar qué tan atrás navegue el usuario. El total se muestra aproximado/cacheado
+para no ejecutar un COUNT(*) completo en cada clic.
+"""
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class PaginaCursor:
+    """
+    Página de un listado paginado por cursor. Expone la misma interfaz básica que
+    django.core.paginator.Page (has_next, has_previous, object_list) más los cursores.
+
+    Attributes:
+        object_list (list): Registros de la página, en orden -id
+        cursor_anterior (int | None): Valor para ?antes= (id del primer registro)
+        cursor_siguiente (int | None): Valor para ?despues= (id del último registro)
+        total_aproximado (int): Total de registros del filtro (cacheado o estimado)
+    """
+    es_cursor = True
+
+    def __init__(self, object_list, hay_anterior, hay_siguiente, total_aproximado):
+        self.object_list = object_list
+        self.total_aproximado = total_aproximado
+        self.cursor_anterior = object_list[0].pk if object_list and hay_anterior else None
+        self.cursor_siguiente = object_list[-1].pk if object_list and hay_siguiente else None
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def _entero(valor):
+    """Convierte un cursor de la URL en entero; None si falta o no es válido."""
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _estimacion_postgresql(queryset):
+    """Filas estimadas por las estadísticas de PostgreSQL (pg_class.reltuples); None si no aplica."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql' or queryset.query.where:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+            [queryset.model._meta.db_table]
+        )
+        fila = cursor.fetchone()
+    # reltuples es -1 en tablas nunca analizadas
+    if not fila or fila[0] < 0:
+        return None
+    return fila[0]
+
+
+def contar_aproximado(queryset):
+    """
+    Cuenta los registros de un queryset sin repetir el COUNT(*) en cada página.
+    Sin filtros en PostgreSQL usa la estimación del planificador; en los demás casos
+    cachea el conteo exacto por consulta durante PAGINACION_CONTEO_TIMEOUT segundos.
+
+    Args:
+        queryset (QuerySet): Listado ya filtrado
+
+    Returns:
+        int: Total aproximado
+    """
+    estimado = _estimacion_postgresql(queryset)
+    if estimado is not None:
+        return estimado
+
+    sql, params = queryset.order_by().query.sql_with_params()
+    huella = hashlib.md5(f'{sql}|{params!r}'.encode('utf-8')).hexdigest()
+    clave = f'conteo:{queryset.model._meta.label_lower}:{huella}'
+    total = cache.get(clave)
+    if total is None:
+        total = queryset.order_by().count()
+        cache.set(clave, total, settings.PAGINACION_CONTEO_TIMEOUT)
+    return total
+
+
+class ConteoAproximadoPaginator(Paginator):
+    """
+    Paginator numérico cuyo total viene de contar_aproximado: estimado en PostgreSQL sin
+    filtros y cacheado en los demás casos. Lo usan los changelists del admin de tablas grandes.
+    """
+
+    @cached_property
+    def count(self):
+        return contar_aproximado(self.object_list)
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin para ListView que añade paginación por cursor sobre un queryset ordenado por -id.
+
+    Se activa con PAGINACION_CURSOR = True, o por petición al recibir ?despues= / ?antes=
+    (los enlaces de las plantillas en modo cursor). Sin activar, la vista conserva la
+    paginación numérica de Django.
+    """
+    paginacion_cursor = None
+    # Resultados calculados de antemano por una vista asíncrona (ver consultas_precargadas)
+    precargado = {}
+
+    def usar_paginacion_cursor(self):
+        activada = settings.PAGINACION_CURSOR if self.paginacion_cursor is None else self.paginacion_cursor
+        return activada or 'despues' in self.request.GET or 'antes' in self.request.GET
+
+    def contar_total(self, queryset):
+        """Total mostrado en modo cursor; las vistas pueden darlo desde un resumen propio."""
+        return contar_aproximado(queryset)
+
+    def _filas_cursor(self, queryset, page_size):
+        """Filas de la página pedida por ?despues= / ?antes=: (filas, hay_anterior, hay_siguiente)."""
+        despues = _entero(self.request.GET.get('despues'))
+        antes = _entero(self.request.GET.get('antes'))
+        if antes is not None:
+            # Página anterior: los page_size ids inmediatamente mayores, luego en orden -id
+            filas = list(queryset.filter(pk__gt=antes).order_by('pk')[:page_size + 1])
+            if len(filas) > page_size:
+                return filas[:page_size][::-1], True, True
+            # Se llegó al inicio: se muestra la primera página completa
+            despues = None
+        if despues is not None:
+            queryset = queryset.filter(pk__lt=despues)
+        filas = list(queryset.order_by('-pk')[:page_size + 1])
+        return filas[:page_size], despues is not None, len(filas) > page_size
+
+    def consultas_precargadas(self, queryset, page_size):
+        """
+        Consultas de la página actual que no dependen entre sí (nombre -> callable): el
+        total y las filas. Las vistas asíncronas (core.concurrencia.ListadoAsincronoMixin)
+        las ejecutan en paralelo y dejan los resultados en self.precargado, que
+        paginate_queryset usa en lugar de volver a consultar.
+        """
+        if self.usar_paginacion_cursor():
+            return {
+                'total': lambda: self.contar_total(queryset),
+                'filas': lambda: self._filas_cursor(queryset, page_size),
+            }
+
+        consultas = {'total': queryset.count}
+        numero = _entero(self.kwargs.get(self.page_kwarg) or self.request.GET.get(self.page_kwarg) or 1)
+        if numero is not None and numero > 0:
+            # Si el número resulta fuera de rango, el paginador responde 404 y estas filas se descartan
+            inicio = (numero - 1) * page_size
+            consultas['filas'] = lambda: (numero, list(queryset[inicio:inicio + page_size]))
+        return consultas
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        if 'total' in self.precargado:
+            paginator.count = self.precargado['total']
+        return paginator
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.usar_paginacion_cursor():
+            paginator, pagina, filas, hay_otras = super().paginate_queryset(queryset, page_size)
+            numero, precargadas = self.precargado.get('filas', (None, None))
+            if numero == pagina.number:
+                pagina.object_list = filas = precargadas
+            return (paginator, pagina, filas, hay_otras)
+
+        if 'total' in self.precargado:
+            total = self.precargado['total']
+        else:
+            total = self.contar_total(queryset)
+        filas, hay_anterior, hay_siguiente = (
+            self.precargado.get('filas') or self._filas_cursor(queryset, page_size)
+        )
+        pagina = PaginaCursor(filas, hay_anterior, hay_siguiente, total)
+        return (None, pagina, pagina.object_list, pagina.has_other_pages())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        params = self.request.GET.copy()
+        for clave in ('page', 'despues', 'antes'):
+            params.pop(clave, None)
+        context['cursor_querystring'] = params.urlencode()
+        return context
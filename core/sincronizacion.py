@@ -0,0 +1,211 @@
+"""
+Sincronización masiva de clientes y proveedores desde hojas de cálculo (CSV o XLSX).
+
+Cada fila se identifica por el campo único del modelo (Cliente.cedula_nit,
+Proveedor.nit). Las filas se procesan por lotes: una consulta trae los registros
+existentes del lote, la comparación se hace en memoria y los registros nuevos o con
+cambios se escriben en una sola sentencia (INSERT ... ON CONFLICT DO UPDATE con
+bulk_create(update_conflicts=True); bulk_create + bulk_update si el motor no lo admite).
+
+Solo se sincronizan las columnas presentes en el archivo, y una celda vacía no borra el
+valor guardado. Las filas inválidas o repetidas se reportan con el motivo.
+"""
+import csv
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import connections, models, router, transaction
+
+from .archivos import texto_celda
+
+# Modelo, campo único y campos que se pueden sincronizar, por tipo
+MODELOS_SINCRONIZABLES = {
+    'clientes': ('clientes.Cliente', 'cedula_nit', ['nombre', 'direccion', 'telefono', 'email', 'latitud', 'longitud', 'activo']),
+    'proveedores': ('proveedores.Proveedor', 'nit', ['nombre', 'direccion', 'telefono', 'email', 'activo']),
+}
+
+# Filas por lote (una consulta de lectura y una de escritura por lote)
+SINCRONIZACION_LOTE = 2000
+
+# Errores que se conservan en memoria para mostrarlos
+ERRORES_EN_RESUMEN = 20
+
+VALORES_VERDADEROS = {'1', 'si', 'sí', 's', 'true', 'verdadero', 'activo', 'x'}
+VALORES_FALSOS = {'0', 'no', 'n', 'false', 'falso', 'inactivo'}
+
+
+class Sincronizador:
+    """
+    Crea o actualiza los registros de un tipo ('clientes' o 'proveedores') a partir de filas.
+
+    Attributes:
+        creados (int): Registros creados (o que se crearían, con solo_validar)
+        actualizados (int): Registros existentes con algún cambio
+        sin_cambios (int): Registros existentes idénticos a la fila
+        filas_con_error (int): Filas rechazadas
+        errores (list): Primeras ERRORES_EN_RESUMEN filas rechazadas, como (fila, motivo)
+    """
+
+    def __init__(self, tipo, solo_validar=False, reporte=None, lote=SINCRONIZACION_LOTE):
+        """
+        Args:
+            tipo (str): Clave de MODELOS_SINCRONIZABLES
+            solo_validar (bool): Calcular el resultado sin escribir nada
+            reporte (file, optional): Archivo de texto donde escribir las filas rechazadas (CSV)
+            lote (int): Filas por lote
+        """
+        if tipo not in MODELOS_SINCRONIZABLES:
+            raise ValueError(f"Tipo de sincronización desconocido: {tipo}")
+        modelo, self.campo_clave, self.campos = MODELOS_SINCRONIZABLES[tipo]
+        self.modelo = apps.get_model(modelo)
+        self.tipo = tipo
+        self.solo_validar = solo_validar
+        self.lote = lote
+        self.creados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.filas_con_error = 0
+        self.errores = []
+        self.claves_vistas = set()
+        self.reporte = None
+        if reporte is not None:
+            self.reporte = csv.writer(reporte)
+            self.reporte.writerow(['fila', self.campo_clave, *self.campos, 'error'])
+
+    @property
+    def obligatorias(self):
+        return [self.campo_clave, 'nombre']
+
+    def ejecutar(self, filas):
+        """
+        Sincroniza `filas` (ver core.archivos.leer_filas) lote por lote.
+
+        Returns:
+            dict: creados, actualizados, sin_cambios y filas_con_error
+        """
+        lote = []
+        for fila in filas:
+            lote.append(fila)
+            if len(lote) >= self.lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+
+        if (self.creados or self.actualizados) and not self.solo_validar:
+            # Los listados de ventas/compras buscan por nombre del cliente/proveedor
+            from transacciones.listados import invalidar_listados
+            invalidar_listados()
+        return {
+            'creados': self.creados,
+            'actualizados': self.actualizados,
+            'sin_cambios': self.sin_cambios,
+            'filas_con_error': self.filas_con_error,
+        }
+
+    def _valor(self, campo, valor):
+        """Limpia y valida una celda con las reglas del campo del modelo."""
+        field = self.modelo._meta.get_field(campo)
+        if isinstance(field, models.BooleanField):
+            if isinstance(valor, bool):
+                return valor
+            texto = texto_celda(valor).lower()
+            if texto in VALORES_VERDADEROS:
+                return True
+            if texto in VALORES_FALSOS:
+                return False
+            raise ValidationError(f"valor '{valor}' no reconocido (use sí/no)")
+        if isinstance(field, models.FloatField) and isinstance(valor, str):
+            valor = valor.replace(',', '.')
+        elif not isinstance(field, models.FloatField):
+            valor = texto_celda(valor)
+        return field.clean(valor, None)
+
+    def _limpiar(self, datos):
+        """Valores de la fila por campo, omitiendo celdas vacías y columnas ausentes."""
+        limpios = {}
+        for campo in [self.campo_clave, *self.campos]:
+            valor = datos.get(campo)
+            if texto_celda(valor) == '':
+                continue
+            try:
+                limpios[campo] = self._valor(campo, valor)
+            except ValidationError as error:
+                raise ValidationError(f"{campo}: {' '.join(error.messages)}")
+        for campo in self.obligatorias:
+            if campo not in limpios:
+                raise ValidationError(f'falta {campo}')
+        return limpios
+
+    def _rechazar(self, numero, datos, motivo):
+        self.filas_con_error += 1
+        if len(self.errores) < ERRORES_EN_RESUMEN:
+            self.errores.append((numero, motivo))
+        if self.reporte is not None:
+            self.reporte.writerow([
+                numero, *(texto_celda(datos.get(campo)) for campo in [self.campo_clave, *self.campos]), motivo,
+            ])
+
+    def _procesar_lote(self, filas):
+        entrantes = {}
+        for numero, datos in filas:
+            try:
+                limpios = self._limpiar(datos)
+            except ValidationError as error:
+                self._rechazar(numero, datos, ' '.join(error.messages))
+                continue
+            clave = limpios[self.campo_clave]
+            if clave in self.claves_vistas:
+                self._rechazar(numero, datos, f'{self.campo_clave} repetido en el archivo')
+                continue
+            self.claves_vistas.add(clave)
+            entrantes[clave] = limpios
+
+        existentes = {
+            getattr(registro, self.campo_clave): registro
+            for registro in self.modelo.objects.filter(**{f'{self.campo_clave}__in': list(entrantes)})
+            .only('pk', self.campo_clave, *self.campos)
+        }
+
+        nuevos, cambiados = [], []
+        for clave, limpios in entrantes.items():
+            registro = existentes.get(clave)
+            if registro is None:
+                nuevos.append(self.modelo(**limpios))
+                continue
+            cambios = {campo: valor for campo, valor in limpios.items() if getattr(registro, campo) != valor}
+            if not cambios:
+                self.sin_cambios += 1
+                continue
+            for campo, valor in cambios.items():
+                setattr(registro, campo, valor)
+            cambiados.append(registro)
+
+        if not self.solo_validar:
+            self._escribir(nuevos, cambiados)
+        self.creados += len(nuevos)
+        self.actualizados += len(cambiados)
+
+    def _escribir(self, nuevos, cambiados):
+        if not nuevos and not cambiados:
+            return
+        connection = connections[router.db_for_write(self.modelo)]
+        if connection.features.supports_update_conflicts_with_target:
+            # Un solo INSERT ... ON CONFLICT: los existentes (ya combinados con la fila)
+            # se insertan como instancias nuevas y el conflicto sobre la clave única los
+            # actualiza. Se copian solo los campos cargados para no disparar consultas
+            # por los campos diferidos.
+            cambiados = [
+                self.modelo(**{campo: getattr(registro, campo) for campo in [self.campo_clave, *self.campos]})
+                for registro in cambiados
+            ]
+            self.modelo.objects.bulk_create(
+                nuevos + cambiados,
+                update_conflicts=True,
+                unique_fields=[self.campo_clave],
+                update_fields=self.campos,
+            )
+            return
+        with transaction.atomic(using=connection.alias):
+            self.modelo.objects.bulk_create(nuevos)
+            self.modelo.objects.bulk_update(cambiados, self.campos)
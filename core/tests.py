@@ -1,3 +1,389 @@
-from django.test import TestCase
+import json
+import re
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from clientes.models import Cliente
+from inventario.models import TipoHuevo
+from inventario.utils import registrar_movimientos, movimientos_de_lineas
+from proveedores.models import Proveedor
+from transacciones.models import Venta, Compra
+
+from .exports import encolar_exportacion, procesar_trabajo, reclamar_siguiente
+from .instrumentacion import MedidorSQL, resumen_vistas
+from .models import CustomUser, TransaccionCaja, SaldoCaja, CajaResumenDiario, TrabajoExportacion, MetricaSQLVista
+from .utils import (
+    SALDO_CAJA_PK, eliminar_transacciones_caja, filtro_rango_fechas, registrar_transaccion_caja, registrar_transacciones_caja_lote,
+    resumir_transacciones_por_dia,
+)
+
+# Caché en memoria: las versiones de caché no deben pasar de una prueba a otra
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, CONSULTAS_PARALELAS=False)
+class CajaTestCase(TestCase):
+    """Un superusuario con sesión iniciada y capital en caja."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-de-prueba')
+        registrar_transaccion_caja(Decimal('1000000'), 'ingreso', descripcion='Capital inicial')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def saldo(self):
+        return SaldoCaja.objects.get(pk=SALDO_CAJA_PK).saldo
+
+    def total(self, tipo):
+        return TransaccionCaja.objects.filter(tipo=tipo).aggregate(total=Sum('monto'))['total'] or 0
+
+    def resumenes(self):
+        return {
+            fecha: {'ingresos': ingresos, 'egresos': egresos}
+            for fecha, ingresos, egresos in CajaResumenDiario.objects.values_list('fecha', 'ingresos', 'egresos')
+        }
+
+    def assertResumenCoincide(self):
+        """Cada resumen diario suma lo mismo que las transacciones de su día."""
+        self.assertEqual(self.resumenes(), resumir_transacciones_por_dia(TransaccionCaja.objects.all()))
+
+    def assertSaldoCoincide(self):
+        self.assertEqual(self.saldo(), self.total('ingreso') - self.total('egreso'))
+
+    def agregar_desde_admin(self, tipo, monto, descripcion='Movimiento manual'):
+        respuesta = self.client.post('/admin/core/transaccioncaja/add/', {
+            'tipo': tipo, 'monto': monto, 'descripcion': descripcion, 'venta': '', 'compra': '',
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        return TransaccionCaja.objects.latest('id')
+
+    def editar_desde_admin(self, transaccion, **datos):
+        respuesta = self.client.post(f'/admin/core/transaccioncaja/{transaccion.pk}/change/', {
+            'descripcion': transaccion.descripcion, 'venta': '', 'compra': '', **datos,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+
+
+class TransaccionCajaAdminTests(CajaTestCase):
+
+    def test_agregar_desde_el_admin_actualiza_el_saldo(self):
+        self.agregar_desde_admin('ingreso', '25000')
+        self.agregar_desde_admin('egreso', '40000')
+
+        self.assertEqual(self.saldo(), Decimal('985000'))
+        self.assertSaldoCoincide()
+
+    def test_editar_desde_el_admin_no_cambia_tipo_ni_monto(self):
+        transaccion = self.agregar_desde_admin('egreso', '40000')
+        self.editar_desde_admin(transaccion, tipo='ingreso', monto='90000', descripcion='Pago de transporte')
+
+        transaccion.refresh_from_db()
+        self.assertEqual((transaccion.tipo, transaccion.monto), ('egreso', Decimal('40000')))
+        self.assertEqual(transaccion.descripcion, 'Pago de transporte')
+        self.assertEqual(self.saldo(), Decimal('960000'))
+        self.assertSaldoCoincide()
+
+
+class CajaResumenDiarioTests(CajaTestCase):
+
+    def test_registrar_eliminar_y_editar_mantienen_el_resumen(self):
+        hoy = timezone.localdate()
+        venta = registrar_transaccion_caja(Decimal('30000'), 'ingreso', descripcion='Venta de mostrador')
+        registrar_transaccion_caja(Decimal('12000'), 'egreso', descripcion='Bolsas')
+        self.assertEqual(self.resumenes()[hoy], {'ingresos': Decimal('1030000'), 'egresos': Decimal('12000')})
+
+        eliminar_transacciones_caja(TransaccionCaja.objects.filter(pk=venta.pk))
+        self.assertEqual(self.resumenes()[hoy], {'ingresos': Decimal('1000000'), 'egresos': Decimal('12000')})
+
+        transaccion = self.agregar_desde_admin('egreso', '8000')
+        self.editar_desde_admin(transaccion, descripcion='Transporte')
+        self.assertEqual(self.resumenes()[hoy], {'ingresos': Decimal('1000000'), 'egresos': Decimal('20000')})
+        self.assertResumenCoincide()
+        self.assertSaldoCoincide()
+
+    def test_reconstruir_resumen_desde_el_libro(self):
+        inicio = timezone.make_aware(datetime(2025, 1, 30, 10))
+        registrar_transacciones_caja_lote([
+            TransaccionCaja(tipo=tipo, monto=Decimal(monto), fecha_hora=inicio + timedelta(days=dias), descripcion='Histórica')
+            for tipo, monto, dias in [('ingreso', '5000', 0), ('egreso', '2000', 0), ('ingreso', '7000', 2), ('egreso', '1500', 5)]
+        ])
+        self.assertResumenCoincide()
+
+        # Desajustes: un día con totales erróneos y otro sin fila
+        CajaResumenDiario.objects.filter(fecha='2025-01-30').update(ingresos=1, egresos=1)
+        CajaResumenDiario.objects.filter(fecha='2025-02-01').delete()
+        salida = StringIO()
+        call_command('reconstruir_resumen_caja', '--dias-por-lote', '2', stdout=salida)
+
+        self.assertResumenCoincide()
+        self.assertIn('días con movimientos', salida.getvalue())
+
+    def test_reconstruir_rechaza_rango_invertido(self):
+        with self.assertRaises(CommandError):
+            call_command('reconstruir_resumen_caja', '--desde', '2025-02-01', '--hasta', '2025-01-01', stdout=StringIO())
+
+
+class FiltroRangoFechasTests(CajaTestCase):
+    """Límites semiabiertos en hora local: [inicio de start_date, inicio del día siguiente a end_date)."""
+
+    def test_limites_del_rango(self):
+        zona = timezone.get_current_timezone()
+        momentos = {
+            'antes': datetime(2025, 3, 9, 23, 59, 59, 999999, tzinfo=zona),
+            'inicio': datetime(2025, 3, 10, 0, 0, tzinfo=zona),
+            'fin': datetime(2025, 3, 12, 23, 59, 59, 999999, tzinfo=zona),
+            'despues': datetime(2025, 3, 13, 0, 0, tzinfo=zona),
+        }
+        registrar_transacciones_caja_lote([
+            TransaccionCaja(tipo='ingreso', monto=Decimal('1000'), fecha_hora=fecha_hora, descripcion=nombre)
+            for nombre, fecha_hora in momentos.items()
+        ])
+
+        def descripciones(*fechas):
+            return set(TransaccionCaja.objects.filter(
+                descripcion__in=momentos, **filtro_rango_fechas('fecha_hora', *fechas)
+            ).values_list('descripcion', flat=True))
+
+        self.assertEqual(descripciones('2025-03-10', '2025-03-12'), {'inicio', 'fin'})
+        self.assertEqual(descripciones(date(2025, 3, 10), None), {'inicio', 'fin', 'despues'})
+        self.assertEqual(descripciones(None, '2025-03-09'), {'antes'})
+        self.assertEqual(descripciones('2025-03-13', '2025-03-13'), {'despues'})
+        # Fechas vacías o inválidas no filtran
+        self.assertEqual(filtro_rango_fechas('fecha_hora', '', '13/03/2025'), {})
+
+    def test_no_aplica_funciones_sobre_la_columna(self):
+        consulta = str(TransaccionCaja.objects.filter(**filtro_rango_fechas('fecha_hora', '2025-03-10', '2025-03-12')).query)
+        self.assertNotIn('cast', consulta.lower())
+        self.assertIn('"core_transaccioncaja"."fecha_hora" >=', consulta)
+        self.assertIn('"core_transaccioncaja"."fecha_hora" <', consulta)
+
+
+class DashboardTests(CajaTestCase):
+    """Dashboard asíncrono con las consultas en serie (CONSULTAS_PARALELAS = False)."""
+
+    def movimientos(self, cantidad):
+        for numero in range(cantidad):
+            registrar_transaccion_caja(Decimal('1000'), 'ingreso', descripcion=f'Venta {numero}')
+            registrar_transaccion_caja(Decimal('400'), 'egreso', descripcion=f'Gasto {numero}')
+
+    def test_contexto_del_dashboard(self):
+        self.movimientos(12)
+        respuesta = self.client.get('/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        contexto = respuesta.context
+        self.assertEqual(contexto['saldo_actual'], Decimal('1007200'))
+        self.assertEqual(contexto['total_ingresos'], Decimal('1012000'))
+        self.assertEqual(contexto['total_egresos'], Decimal('4800'))
+        self.assertEqual(contexto['total_neto'], Decimal('1007200'))
+        self.assertEqual(len(contexto['ingresos_recientes']), 10)
+        self.assertEqual({transaccion.tipo for transaccion in contexto['egresos_recientes']}, {'egreso'})
+        self.assertEqual(contexto['chart_ingresos'][-1], 1012000.0)
+
+    def test_consultas_del_dashboard_no_dependen_de_los_movimientos(self):
+        self.movimientos(1)
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get('/?range=7d')
+        self.movimientos(15)
+        with self.assertNumQueries(len(pocas)):
+            self.client.get('/?range=30d')
+
+    def test_dashboard_cacheado_no_recalcula(self):
+        with CaptureQueriesContext(connection) as primera:
+            self.client.get('/')
+        with CaptureQueriesContext(connection) as segunda:
+            self.client.get('/')
+        self.assertLess(len(segunda), len(primera))
+
+
+@override_settings(SQL_INSTRUMENTACION=True)
+class InstrumentacionSQLTests(CajaTestCase):
+    """Middleware core.instrumentacion.InstrumentacionSQLMiddleware."""
+
+    url = '/admin/core/transaccioncaja/'
+
+    def test_server_timing_solo_para_staff(self):
+        respuesta = self.client.get(self.url)
+        coincidencia = re.fullmatch(
+            r'db;dur=[\d.]+;desc="(\d+) consultas, (\d+) repetidas", total;dur=[\d.]+', respuesta['Server-Timing']
+        )
+        self.assertIsNotNone(coincidencia, respuesta['Server-Timing'])
+        self.assertGreater(int(coincidencia.group(1)), 0)
+
+        vendedor = CustomUser.objects.create_user('vendedor', password='clave-de-prueba')
+        self.client.force_login(vendedor)
+        self.assertNotIn('Server-Timing', self.client.get(self.url))
+
+        with self.settings(SQL_INSTRUMENTACION=False):
+            self.client.force_login(self.admin)
+            self.assertNotIn('Server-Timing', self.client.get(self.url))
+
+    def test_peticion_lenta_se_registra_y_se_resume_por_vista(self):
+        # Descarta lo acumulado por peticiones de otras pruebas
+        resumen_vistas.pendientes.clear()
+        with self.settings(SQL_LENTO_MS=0, SQL_RESUMEN_INTERVALO=0), self.assertLogs('core.sql', 'WARNING') as logs:
+            self.client.get(self.url)
+            self.client.get(self.url)
+
+        self.assertIn(f'GET {self.url} (admin:core_transaccioncaja_changelist)', logs.output[0])
+        metrica = MetricaSQLVista.objects.get(vista='admin:core_transaccioncaja_changelist')
+        self.assertEqual(metrica.peticiones, 2)
+        self.assertGreater(metrica.max_consultas, 0)
+        self.assertLessEqual(metrica.max_consultas, metrica.consultas)
+
+    def test_medidor_cuenta_las_consultas_repetidas(self):
+        medidor = MedidorSQL()
+        with connection.execute_wrapper(medidor):
+            for _ in range(3):
+                TransaccionCaja.objects.filter(tipo='ingreso').count()
+            TransaccionCaja.objects.filter(tipo='egreso').exists()
+
+        self.assertEqual((medidor.consultas, medidor.repetidas), (4, 2))
+        self.assertEqual(sorted(datos[0] for datos in medidor.por_sql.values()), [1, 3])
+        self.assertEqual(len(medidor.mas_costosas(1)), 1)
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class StressEscriturasTests(TransactionTestCase):
+    """Comando stress_escrituras: los hilos escriben con conexiones propias, sin la transacción de TestCase."""
+
+    def setUp(self):
+        cache.clear()
+        Cliente.objects.create(nombre='Tienda', cedula_nit='1010', direccion='Calle 1', telefono='1', email='t@ejemplo.com')
+        Proveedor.objects.create(nombre='Granja', nit='9001', direccion='Vereda 2', telefono='2', email='g@ejemplo.com')
+        tipos = [TipoHuevo.objects.create(tipo=tipo, precio_cubeta=Decimal('100')) for tipo in ('A', 'AA')]
+        registrar_movimientos(movimientos_de_lineas([(None, tipo.pk, 30) for tipo in tipos], 'ajuste'))
+        registrar_transaccion_caja(Decimal('100000'), 'ingreso', descripcion='Capital inicial')
+
+    def estresar(self, *argumentos):
+        salida = StringIO()
+        call_command('stress_escrituras', '--semilla', '7', *argumentos, stdout=salida, stderr=StringIO())
+        return json.loads(salida.getvalue())
+
+    def test_reporte_e_invariantes(self):
+        reporte = self.estresar('--hilos', '2', '--operaciones', '15', '--proporcion-eliminar', '0.3')
+
+        self.assertEqual(reporte['violaciones'], [])
+        self.assertEqual(sum(reporte['operaciones'].values()), 30)
+        creadas = reporte['operaciones'].get('venta', 0) + reporte['operaciones'].get('compra', 0)
+        eliminadas = reporte['operaciones'].get('eliminar_venta', 0) + reporte['operaciones'].get('eliminar_compra', 0)
+        self.assertEqual(Venta.objects.count() + Compra.objects.count(), creadas - eliminadas)
+        self.assertGreaterEqual(TipoHuevo.objects.order_by('stock_cubetas').first().stock_cubetas, 0)
+
+    def test_violacion_de_invariantes_termina_con_error(self):
+        tipo = TipoHuevo.objects.first()
+        with mock.patch('core.management.commands.stress_escrituras.diferencias_libro', return_value={tipo: 999}):
+            with self.assertRaisesMessage(CommandError, '1 violaciones de invariantes'):
+                self.estresar('--hilos', '1', '--operaciones', '2')
+
+    def test_requiere_datos_y_argumentos_validos(self):
+        with self.assertRaises(CommandError):
+            self.estresar('--hilos', '0')
+        Cliente.objects.all().delete()
+        with self.assertRaisesMessage(CommandError, 'seed_bench'):
+            self.estresar()
+
+
+def renderizar_prueba(parametros, destino):
+    """Renderizador de exportaciones para las pruebas (ver RENDERIZADORES)."""
+    if parametros.get('q') == 'falla':
+        raise ValueError('Plantilla rota')
+    time.sleep(parametros.get('espera', 0))
+    destino.write(b'%PDF ' + parametros.get('q', '').encode())
+    return 'prueba.pdf'
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, TRABAJOS_LEASE_SEGUNDOS=900)
+class ExportacionesTests(TestCase):
+    """Cola de exportaciones en la base de datos: encolar, reclamar y procesar."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user('vendedor', password='clave-de-prueba')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        configuracion = self.settings(MEDIA_ROOT=media.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        renderizadores = mock.patch.dict('core.exports.RENDERIZADORES', {'ventas_pdf': 'core.tests.renderizar_prueba'})
+        renderizadores.start()
+        self.addCleanup(renderizadores.stop)
+
+    def test_encolar_reutiliza_la_solicitud_en_curso(self):
+        primero = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana', 'start_date': '', 'otro': 'x'})
+        self.assertEqual(primero.parametros, {'q': 'ana'})
+        self.assertEqual(encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana'}), primero)
+        self.assertNotEqual(encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'luis'}), primero)
+        self.assertNotEqual(encolar_exportacion(self.usuario, 'compras_pdf', {'q': 'ana'}), primero)
+
+        TrabajoExportacion.objects.filter(pk=primero.pk).update(estado='listo')
+        self.assertNotEqual(encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana'}), primero)
+
+    def test_un_solo_pendiente_por_solicitud(self):
+        primero = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana'})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrabajoExportacion.objects.create(usuario=self.usuario, tipo='ventas_pdf', huella=primero.huella)
+
+        # Otra petición lo creó justo después de la consulta de encolar_exportacion
+        with mock.patch('core.exports.en_curso', return_value=Q(pk__in=[])):
+            self.assertEqual(encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana'}), primero)
+
+    def test_reclamar_pendientes_y_abandonados(self):
+        antiguo = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'uno'})
+        nuevo = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'dos'})
+
+        self.assertEqual(reclamar_siguiente(TrabajoExportacion), antiguo)
+        self.assertEqual(reclamar_siguiente(TrabajoExportacion), nuevo)
+        # Los dos están en proceso con un worker activo
+        self.assertIsNone(reclamar_siguiente(TrabajoExportacion))
+        self.assertEqual(encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'uno'}), antiguo)
+
+        TrabajoExportacion.objects.filter(pk=antiguo.pk).update(reclamado=timezone.now() - timedelta(seconds=901))
+        retomado = reclamar_siguiente(TrabajoExportacion)
+        self.assertEqual(retomado, antiguo)
+        self.assertEqual(retomado.estado, 'procesando')
+        self.assertGreater(retomado.reclamado, timezone.now() - timedelta(seconds=5))
+
+    def test_worker_guarda_el_archivo_o_el_error(self):
+        bien = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'ana'})
+        mal = encolar_exportacion(self.usuario, 'ventas_pdf', {'q': 'falla'})
+        call_command('procesar_exportaciones', '--una-vez', '--purgar-dias', '0', stdout=StringIO())
+
+        bien.refresh_from_db()
+        self.assertEqual(bien.estado, 'listo')
+        self.assertTrue(bien.archivo.name.endswith('prueba.pdf'))
+        with bien.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), b'%PDF ana')
+        mal.refresh_from_db()
+        self.assertEqual((mal.estado, mal.error), ('error', 'Plantilla rota'))
+        self.assertIsNotNone(mal.terminado)
+
+    def test_la_reclamacion_se_renueva_mientras_se_renderiza(self):
+        trabajo = TrabajoExportacion.objects.create(
+            usuario=self.usuario, tipo='ventas_pdf', parametros={'q': 'ana', 'espera': 0.5}, huella='lenta'
+        )
+        trabajo = reclamar_siguiente(TrabajoExportacion)
+        with self.settings(TRABAJOS_LEASE_SEGUNDOS=0.3), mock.patch('core.exports.renovar_reclamacion') as renovar:
+            procesar_trabajo(trabajo)
+
+        self.assertEqual(trabajo.estado, 'listo')
+        self.assertGreaterEqual(renovar.call_count, 2)
+        renovar.assert_called_with(trabajo)
@@ -3,7 +3,10 @@ URLs para la app core (autenticación y dashboard).
 """
 from django.urls import path
 from django.contrib.auth import views as auth_views
-from .views import CustomLoginView, CustomLogoutView, DashboardView, CustomPasswordResetView
+from .views import (
+    CustomLoginView, CustomLogoutView, DashboardView, CustomPasswordResetView,
+    ExportacionDetailView, ExportacionDownloadView
+)
 
 app_name = 'core'
 
@@ -11,6 +14,10 @@ urlpatterns = [
     # Dashboard
     path('', DashboardView.as_view(), name='dashboard'),
     
+    # Exportaciones en segundo plano
+    path('exportaciones/<int:pk>/', ExportacionDetailView.as_view(), name='exportacion_detail'),
+    path('exportaciones/<int:pk>/descargar/', ExportacionDownloadView.as_view(), name='exportacion_descargar'),
+    
     # Autenticación
     path('login/', CustomLoginView.as_view(), name='login'),
     path('logout/', CustomLogoutView.as_view(), name='logout'),
@@ -1,21 +1,236 @@
 """
 Funciones de utilidad para el manejo de la caja.
 """
-from django.db.models import Sum
-from .models import TransaccionCaja
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import TransaccionCaja, SaldoCaja, CajaResumenDiario
+
+# La caja tiene una única fila de saldo
+SALDO_CAJA_PK = 1
+
+# Versión del libro de caja; cambia con cada escritura confirmada
+CAJA_VERSION_KEY = 'caja:version'
+
+
+def inicio_del_dia(fecha):
+    """Devuelve la medianoche local de `fecha` como datetime con zona horaria."""
+    return timezone.make_aware(datetime.combine(fecha, dt_time.min))
+
+
+def como_fecha(valor):
+    """Convierte un date o un texto YYYY-MM-DD en date; None si está vacío o no es válido."""
+    if not valor:
+        return None
+    if isinstance(valor, date):
+        return valor
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        return None
+
+
+def filtro_rango_fechas(campo, start_date=None, end_date=None):
+    """
+    Construye los lookups para filtrar un DateTimeField por fechas locales usando
+    límites semiabiertos [inicio de start_date, inicio del día siguiente a end_date).
+    A diferencia de `campo__date__gte`, no aplica funciones sobre la columna, así
+    que la base de datos puede usar los índices sobre `campo`.
+
+    Args:
+        campo (str): Nombre del DateTimeField (p. ej. 'fecha_hora')
+        start_date (date | str, optional): Fecha inicial inclusiva
+        end_date (date | str, optional): Fecha final inclusiva
+
+    Returns:
+        dict: Lookups para pasar a filter(**...); vacío si no hay fechas válidas
+    """
+    lookups = {}
+    start_date = como_fecha(start_date)
+    end_date = como_fecha(end_date)
+    if start_date:
+        lookups[f'{campo}__gte'] = inicio_del_dia(start_date)
+    if end_date:
+        lookups[f'{campo}__lt'] = inicio_del_dia(end_date + timedelta(days=1))
+    return lookups
+
+
+class SaldoInsuficiente(Exception):
+    """
+    Se lanza cuando un egreso supera el saldo disponible en caja.
+
+    Attributes:
+        saldo (Decimal): Saldo disponible
+        monto (Decimal): Monto solicitado
+    """
+
+    def __init__(self, saldo, monto):
+        self.saldo = saldo
+        self.monto = monto
+        super().__init__(f"Saldo insuficiente: disponible {saldo}, solicitado {monto}")
+
+
+def get_version_cache(clave):
+    """
+    Devuelve la versión actual guardada en `clave`, usada para construir claves de caché.
+    Cambiar la versión invalida de una vez todo lo cacheado con la anterior.
+
+    Returns:
+        int: Versión actual
+    """
+    version = cache.get(clave)
+    if version is None:
+        cache.add(clave, time.time_ns(), timeout=None)
+        version = cache.get(clave)
+    return version
+
+
+def invalidar_version_cache(clave):
+    """
+    Asigna una versión nueva a `clave` cuando la transacción actual se confirme
+    (inmediatamente si no hay transacción abierta).
+    """
+    transaction.on_commit(lambda: cache.set(clave, time.time_ns(), timeout=None))
+
+
+def get_version_caja():
+    """
+    Devuelve la versión actual del libro de caja, usada para construir claves de caché.
+
+    Returns:
+        int: Versión actual
+    """
+    return get_version_cache(CAJA_VERSION_KEY)
+
+
+def invalidar_cache_caja():
+    """
+    Invalida las cachés derivadas del libro de caja cuando la transacción actual
+    se confirme (inmediatamente si no hay transacción abierta).
+    """
+    invalidar_version_cache(CAJA_VERSION_KEY)
+
+
+def _aplicar_delta_saldo(delta):
+    """
+    Suma `delta` al saldo con una sola sentencia UPDATE (F()), sin leer la fila antes.
+    Si la fila aún no existe, la reconstruye desde el libro de transacciones.
+    """
+    actualizadas = SaldoCaja.objects.filter(pk=SALDO_CAJA_PK).update(
+        saldo=F('saldo') + delta,
+        actualizado=timezone.now()
+    )
+    if not actualizadas:
+        # El libro ya incluye el movimiento que originó el delta
+        recalcular_saldo()
+
+
+def _aplicar_delta_resumen(fecha, ingresos=0, egresos=0):
+    """
+    Suma los deltas de ingresos/egresos al resumen diario de `fecha`, creando la fila si no existe.
+    """
+    actualizadas = CajaResumenDiario.objects.filter(fecha=fecha).update(
+        ingresos=F('ingresos') + ingresos,
+        egresos=F('egresos') + egresos
+    )
+    if actualizadas:
+        return
+
+    _, creado = CajaResumenDiario.objects.get_or_create(
+        fecha=fecha,
+        defaults={'ingresos': ingresos, 'egresos': egresos}
+    )
+    if not creado:
+        # Otra transacción creó la fila entre el UPDATE y el INSERT
+        CajaResumenDiario.objects.filter(fecha=fecha).update(
+            ingresos=F('ingresos') + ingresos,
+            egresos=F('egresos') + egresos
+        )
+
+
+def _aplicar_deltas_resumen(por_dia):
+    """
+    Suma deltas a los resúmenes de varios días con un solo UPDATE (CASE por fecha); los
+    días que aún no tienen fila se crean con _aplicar_delta_resumen.
+
+    Args:
+        por_dia (dict): {fecha: {'ingresos': delta, 'egresos': delta}}
+    """
+    por_dia = {fecha: totales for fecha, totales in por_dia.items() if totales['ingresos'] or totales['egresos']}
+    if not por_dia:
+        return
+
+    def delta(campo):
+        return Case(
+            *[When(fecha=fecha, then=F(campo) + Value(totales[campo])) for fecha, totales in por_dia.items()],
+            default=F(campo),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+
+    actualizadas = CajaResumenDiario.objects.filter(fecha__in=por_dia).update(
+        ingresos=delta('ingresos'),
+        egresos=delta('egresos'),
+    )
+    if actualizadas < len(por_dia):
+        existentes = set(CajaResumenDiario.objects.filter(fecha__in=por_dia).values_list('fecha', flat=True))
+        for fecha, totales in por_dia.items():
+            if fecha not in existentes:
+                _aplicar_delta_resumen(fecha, **totales)
+
+
+def resumir_transacciones_por_dia(queryset):
+    """
+    Agrupa las transacciones del queryset por fecha local en una sola consulta.
+
+    Args:
+        queryset (QuerySet): Transacciones de caja a resumir
+
+    Returns:
+        dict: {fecha: {'ingresos': Decimal, 'egresos': Decimal}}
+    """
+    resumen = {}
+    filas = (
+        queryset.order_by()
+        .annotate(dia=TruncDate('fecha_hora'))
+        .values('dia', 'tipo')
+        .annotate(total=Sum('monto'))
+    )
+    for fila in filas:
+        dia = resumen.setdefault(fila['dia'], {'ingresos': 0, 'egresos': 0})
+        dia['ingresos' if fila['tipo'] == 'ingreso' else 'egresos'] += fila['total']
+    return resumen
+
+
+@contextmanager
+def sin_auto_now_add(modelo, campo='fecha_hora'):
+    """Permite asignar fechas históricas a un campo auto_now_add (p. ej. durante un bulk_create)."""
+    field = modelo._meta.get_field(campo)
+    original = field.auto_now_add
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = original
 
 
 def registrar_transaccion_caja(monto, tipo, venta_id=None, compra_id=None, descripcion=''):
     """
-    Registra una transacción en la caja.
-    
+    Registra una transacción en la caja y actualiza el saldo acumulado y el resumen diario.
+
     Args:
         monto (Decimal): Monto de la transacción
         tipo (str): 'ingreso' o 'egreso'
         venta_id (int, optional): ID de la venta relacionada
         compra_id (int, optional): ID de la compra relacionada
         descripcion (str, optional): Descripción adicional de la transacción
-    
+
     Returns:
         TransaccionCaja: La transacción creada
     """
@@ -26,22 +241,126 @@ def registrar_transaccion_caja(monto, tipo, venta_id=None, compra_id=None, descr
         compra_id=compra_id,
         descripcion=descripcion or f"{'Venta' if venta_id else 'Compra'} #{venta_id or compra_id}"
     )
+    aplicar_transaccion_caja(transaccion)
     return transaccion
 
 
-def get_saldo_actual():
+def aplicar_transaccion_caja(transaccion):
+    """
+    Suma una transacción ya guardada al saldo acumulado y a su resumen diario, e
+    invalida las cachés de caja. Sirve para las transacciones creadas sin
+    registrar_transaccion_caja (p. ej. desde el admin).
+
+    Args:
+        transaccion (TransaccionCaja): Transacción recién creada
+    """
+    monto = transaccion.monto
+    _aplicar_delta_saldo(monto if transaccion.tipo == 'ingreso' else -monto)
+    _aplicar_delta_resumen(
+        timezone.localdate(transaccion.fecha_hora),
+        **{'ingresos' if transaccion.tipo == 'ingreso' else 'egresos': monto}
+    )
+    invalidar_cache_caja()
+
+
+def registrar_transacciones_caja_lote(transacciones, batch_size=None):
     """
-    Calcula el saldo actual en caja.
-    
+    Inserta varias transacciones de caja con bulk_create y aplica su efecto al saldo
+    acumulado y a los resúmenes diarios una sola vez (un UPDATE de resúmenes y uno de saldo).
+    Debe llamarse dentro de transaction.atomic().
+
+    Args:
+        transacciones (list): TransaccionCaja sin guardar, con fecha_hora asignada
+        batch_size (int, optional): Filas por INSERT
+
     Returns:
-        Decimal: Saldo actual (ingresos - egresos)
+        list: Las transacciones creadas
+    """
+    with sin_auto_now_add(TransaccionCaja):
+        creadas = TransaccionCaja.objects.bulk_create(transacciones, batch_size=batch_size)
+
+    por_dia = defaultdict(lambda: {'ingresos': 0, 'egresos': 0})
+    delta = 0
+    for transaccion in creadas:
+        if transaccion.tipo == 'ingreso':
+            por_dia[timezone.localdate(transaccion.fecha_hora)]['ingresos'] += transaccion.monto
+            delta += transaccion.monto
+        else:
+            por_dia[timezone.localdate(transaccion.fecha_hora)]['egresos'] += transaccion.monto
+            delta -= transaccion.monto
+
+    _aplicar_deltas_resumen(por_dia)
+    if delta:
+        _aplicar_delta_saldo(delta)
+    if creadas:
+        invalidar_cache_caja()
+    return creadas
+
+
+def eliminar_transacciones_caja(queryset):
+    """
+    Elimina las transacciones del queryset y descuenta su efecto del saldo acumulado
+    y de los resúmenes diarios.
+
+    Args:
+        queryset (QuerySet): Transacciones de caja a eliminar
+
+    Returns:
+        int: Número de transacciones eliminadas
+    """
+    por_dia = resumir_transacciones_por_dia(queryset)
+    eliminadas, _ = queryset.delete()
+
+    _aplicar_deltas_resumen({
+        fecha: {'ingresos': -totales['ingresos'], 'egresos': -totales['egresos']}
+        for fecha, totales in por_dia.items()
+    })
+    delta = sum(totales['ingresos'] - totales['egresos'] for totales in por_dia.values())
+    if delta:
+        _aplicar_delta_saldo(-delta)
+    if eliminadas:
+        invalidar_cache_caja()
+    return eliminadas
+
+
+def recalcular_saldo():
+    """
+    Reconstruye el saldo acumulado sumando todo el libro de transacciones.
+    Solo se usa para crear la fila inicial o corregir desajustes.
+
+    Returns:
+        Decimal: Saldo recalculado (ingresos - egresos)
     """
     ingresos = TransaccionCaja.objects.filter(tipo='ingreso').aggregate(
         total=Sum('monto')
     )['total'] or 0
-    
+
     egresos = TransaccionCaja.objects.filter(tipo='egreso').aggregate(
         total=Sum('monto')
     )['total'] or 0
-    
-    return ingresos - egresos
+
+    saldo = ingresos - egresos
+    SaldoCaja.objects.update_or_create(pk=SALDO_CAJA_PK, defaults={'saldo': saldo})
+    invalidar_cache_caja()
+    return saldo
+
+
+def get_saldo_actual(bloquear=False):
+    """
+    Obtiene el saldo actual en caja leyendo la fila de saldo acumulado.
+
+    Args:
+        bloquear (bool, optional): Si es True, bloquea la fila (SELECT ... FOR UPDATE)
+            hasta el fin de la transacción. Debe llamarse dentro de transaction.atomic().
+
+    Returns:
+        Decimal: Saldo actual (ingresos - egresos)
+    """
+    qs = SaldoCaja.objects.filter(pk=SALDO_CAJA_PK)
+    if bloquear:
+        qs = qs.select_for_update()
+
+    saldo = qs.values_list('saldo', flat=True).first()
+    if saldo is None:
+        return recalcular_saldo()
+    return saldo
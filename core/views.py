@@ -1,17 +1,25 @@
+import os
 from datetime import date, timedelta
 
-from django.shortcuts import render
+from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.views import LoginView, LogoutView, PasswordResetView
-from django.views.generic import TemplateView
+from django.views.generic import TemplateView, DetailView, FormView, View
+from django.http import FileResponse, Http404, JsonResponse
+from django.urls import reverse
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.utils import timezone
+from django.core.cache import cache
 from django.db.models import Sum
-from django.db.models.functions import TruncDate
-from .models import TransaccionCaja
-from .utils import get_saldo_actual
-from .forms import LoginFormWithCaptcha
+from asgiref.sync import sync_to_async
+from .models import TransaccionCaja, CajaResumenDiario, TrabajoExportacion
+from .utils import get_saldo_actual, get_version_caja, filtro_rango_fechas
+from .forms import LoginFormWithCaptcha, SincronizacionForm
+from .concurrencia import AsyncLoginRequiredMixin, consultar_en_paralelo
+from .archivos import leer_filas
+from .sincronizacion import Sincronizador
+from .autocompletar import buscar_por_prefijo
 
 
 class CustomLoginView(LoginView):
@@ -26,65 +34,94 @@ class CustomLogoutView(LogoutView):
     next_page = 'core:login'
 
 
-class DashboardView(LoginRequiredMixin, TemplateView):
+# Tiempo máximo de vida del contexto cacheado del dashboard; la invalidación
+# real ocurre al cambiar la versión del libro de caja.
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+
+class DashboardView(AsyncLoginRequiredMixin, TemplateView):
     """
     Vista del Dashboard principal que muestra:
     - Saldo actual en caja
     - Últimas 10 transacciones de ingreso
     - Últimas 10 transacciones de egreso
+    - Totales y gráfico calculados desde CajaResumenDiario
+    Los datos se cachean por rango y versión del libro de caja; al recalcularlos,
+    las consultas (independientes entre sí) se ejecutan en paralelo.
     """
     template_name = 'core/dashboard.html'
     login_url = 'core:login'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
+    async def get(self, request, *args, **kwargs):
+        context = self.get_context_data(**kwargs)
 
         # Obtener rango de fechas (por GET: start_date/end_date o range= today/7d/30d/month)
         start_date, end_date, rango_label = self._get_date_range()
 
-        # Obtener saldo actual (independiente del filtro)
-        context['saldo_actual'] = get_saldo_actual()
+        # Los datos solo cambian con escrituras en caja (nueva versión) o al cambiar el día
+        version = await sync_to_async(get_version_caja)()
+        cache_key = f"dashboard:{version}:{timezone.localdate().isoformat()}:{start_date}:{end_date}"
+        datos = await cache.aget(cache_key)
+        if datos is None:
+            datos = await self._calcular_datos(start_date, end_date)
+            await cache.aset(cache_key, datos, DASHBOARD_CACHE_TIMEOUT)
+        context.update(datos)
 
+        # Filtros en contexto
+        context['start_date'] = start_date.isoformat() if start_date else ''
+        context['end_date'] = end_date.isoformat() if end_date else ''
+        context['rango_label'] = rango_label
+        context['rango'] = self.request.GET.get('range', '')
+
+        return self.render_to_response(context)
+
+    async def _calcular_datos(self, start_date, end_date):
+        """Calcula saldo, movimientos recientes, totales y series del gráfico."""
         # Query base filtrada por fechas si aplica
-        base_qs = TransaccionCaja.objects.all()
+        base_qs = TransaccionCaja.objects.filter(**filtro_rango_fechas('fecha_hora', start_date, end_date))
+
+        # Totales desde el resumen diario (una fila por día, no por transacción)
+        resumen_qs = CajaResumenDiario.objects.all()
         if start_date:
-            base_qs = base_qs.filter(fecha_hora__date__gte=start_date)
+            resumen_qs = resumen_qs.filter(fecha__gte=start_date)
         if end_date:
-            base_qs = base_qs.filter(fecha_hora__date__lte=end_date)
-
-        # Últimas 10 transacciones por tipo, respetando filtro
-        context['ingresos_recientes'] = base_qs.filter(tipo='ingreso')[:10]
-        context['egresos_recientes'] = base_qs.filter(tipo='egreso')[:10]
-
-        # Totales
-        context['total_ingresos'] = base_qs.filter(tipo='ingreso').aggregate(total=Sum('monto'))['total'] or 0
-        context['total_egresos'] = base_qs.filter(tipo='egreso').aggregate(total=Sum('monto'))['total'] or 0
-        context['total_neto'] = context['total_ingresos'] - context['total_egresos']
+            resumen_qs = resumen_qs.filter(fecha__lte=end_date)
 
         # Serie para gráfico (últimos 30 días)
         chart_start = timezone.localdate() - timedelta(days=29)
-        chart_qs = TransaccionCaja.objects.filter(fecha_hora__date__gte=chart_start)
-        chart_ingresos = chart_qs.filter(tipo='ingreso').annotate(d=TruncDate('fecha_hora')).values('d').annotate(total=Sum('monto')).order_by('d')
-        chart_egresos = chart_qs.filter(tipo='egreso').annotate(d=TruncDate('fecha_hora')).values('d').annotate(total=Sum('monto')).order_by('d')
+        chart_qs = CajaResumenDiario.objects.filter(fecha__gte=chart_start).values_list('fecha', 'ingresos', 'egresos')
 
-        def series_to_map(qs):
-            return {item['d'].isoformat(): float(item['total']) for item in qs}
+        resultados = await consultar_en_paralelo(
+            # Saldo actual (independiente del filtro)
+            saldo_actual=get_saldo_actual,
+            # Últimas 10 transacciones por tipo, respetando filtro
+            ingresos_recientes=lambda: list(base_qs.filter(tipo='ingreso')[:10]),
+            egresos_recientes=lambda: list(base_qs.filter(tipo='egreso')[:10]),
+            totales=lambda: resumen_qs.aggregate(ingresos=Sum('ingresos'), egresos=Sum('egresos')),
+            chart_rows=lambda: list(chart_qs),
+        )
 
-        ingresos_map = series_to_map(chart_ingresos)
-        egresos_map = series_to_map(chart_egresos)
+        datos = {
+            'saldo_actual': resultados['saldo_actual'],
+            'ingresos_recientes': resultados['ingresos_recientes'],
+            'egresos_recientes': resultados['egresos_recientes'],
+        }
+        datos['total_ingresos'] = resultados['totales']['ingresos'] or 0
+        datos['total_egresos'] = resultados['totales']['egresos'] or 0
+        datos['total_neto'] = datos['total_ingresos'] - datos['total_egresos']
 
-        labels = [ (chart_start + timedelta(days=i)).isoformat() for i in range(30) ]
-        context['chart_labels'] = labels
-        context['chart_ingresos'] = [ingresos_map.get(day, 0) for day in labels]
-        context['chart_egresos'] = [egresos_map.get(day, 0) for day in labels]
+        ingresos_map = {}
+        egresos_map = {}
+        for fecha, ingresos, egresos in resultados['chart_rows']:
+            ingresos_map[fecha.isoformat()] = float(ingresos)
+            egresos_map[fecha.isoformat()] = float(egresos)
 
-        # Filtros en contexto
-        context['start_date'] = start_date.isoformat() if start_date else ''
-        context['end_date'] = end_date.isoformat() if end_date else ''
-        context['rango_label'] = rango_label
-        context['rango'] = self.request.GET.get('range', '')
+        labels = [ (chart_start + timedelta(days=i)).isoformat() for i in range(30) ]
+        datos['chart_labels'] = labels
+        datos['chart_ingresos'] = [ingresos_map.get(day, 0) for day in labels]
+        datos['chart_egresos'] = [egresos_map.get(day, 0) for day in labels]
 
-        return context
+        return datos
 
     def _get_date_range(self):
         """Devuelve (start_date, end_date, label) según GET params."""
@@ -135,6 +172,99 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return start_date, end_date, label
 
 
+class ExportacionDetailView(LoginRequiredMixin, DetailView):
+    """
+    Estado de un trabajo de exportación del usuario.
+    Con ?format=json devuelve el estado para que la página lo consulte periódicamente.
+    """
+    model = TrabajoExportacion
+    template_name = 'core/exportacion_detail.html'
+    context_object_name = 'trabajo'
+    login_url = 'core:login'
+
+    def get_queryset(self):
+        return TrabajoExportacion.objects.filter(usuario=self.request.user)
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') == 'json':
+            trabajo = self.object
+            return JsonResponse({
+                'estado': trabajo.estado,
+                'estado_display': trabajo.get_estado_display(),
+                'error': trabajo.error,
+                'url_descarga': (
+                    reverse('core:exportacion_descargar', args=[trabajo.pk])
+                    if trabajo.estado == 'listo' else None
+                ),
+            })
+        return super().render_to_response(context, **response_kwargs)
+
+
+class ExportacionDownloadView(LoginRequiredMixin, View):
+    """Descarga el archivo de un trabajo de exportación terminado."""
+    login_url = 'core:login'
+
+    def get(self, request, pk):
+        trabajo = get_object_or_404(TrabajoExportacion, pk=pk, usuario=request.user, estado='listo')
+        if not trabajo.archivo:
+            raise Http404('El archivo de la exportación no está disponible.')
+        return FileResponse(
+            trabajo.archivo.open('rb'),
+            as_attachment=True,
+            filename=os.path.basename(trabajo.archivo.name)
+        )
+
+
+class SincronizacionView(LoginRequiredMixin, FormView):
+    """
+    Sube una hoja de cálculo de clientes o proveedores y la sincroniza en la misma
+    petición (ver core/sincronizacion.py). Las subclases definen `tipo`,
+    `url_listado` y `titulo`.
+    """
+    form_class = SincronizacionForm
+    template_name = 'core/sincronizacion_form.html'
+    login_url = 'core:login'
+    tipo = None
+    url_listado = None
+    titulo = None
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        sincronizador = Sincronizador(self.tipo)
+        context['titulo'] = self.titulo
+        context['url_listado'] = self.url_listado
+        context['campo_clave'] = sincronizador.campo_clave
+        context['campos'] = sincronizador.campos
+        return context
+
+    def form_valid(self, form):
+        archivo = form.cleaned_data['archivo']
+        sincronizador = Sincronizador(self.tipo, solo_validar=form.cleaned_data['solo_validar'])
+        try:
+            resumen = sincronizador.ejecutar(leer_filas(archivo, archivo.name, sincronizador.obligatorias))
+        except ValueError as error:
+            form.add_error('archivo', str(error))
+            return self.form_invalid(form)
+        return self.render_to_response(self.get_context_data(
+            form=self.form_class(),
+            resumen=resumen,
+            errores=sincronizador.errores,
+            solo_validar=sincronizador.solo_validar,
+        ))
+
+
+class AutocompletarView(LoginRequiredMixin, View):
+    """
+    Clientes o proveedores activos cuyo nombre o documento empiezan por ?q=, en JSON
+    (ver core/autocompletar.py). Las subclases definen `tipo`.
+    """
+    login_url = 'core:login'
+    tipo = None
+
+    def get(self, request):
+        return JsonResponse({'resultados': buscar_por_prefijo(self.tipo, request.GET.get('q', ''))})
+
+
 class CustomPasswordResetView(PasswordResetView):
     """
     Vista personalizada para recuperación de contraseña que envía emails en formato HTML.
@@ -0,0 +1,55 @@
+"""
+Widgets de formulario compartidos por las apps.
+"""
+from django import forms
+from django.utils.html import format_html
+
+
+class AutocompletarWidget(forms.Widget):
+    """
+    Selector de cliente/proveedor que no carga la tabla en el formulario: un campo de
+    texto consulta `url` (ver core.views.AutocompletarView) mientras se escribe y el
+    id elegido se guarda en un input oculto, que es lo único que se envía.
+
+    Solo se consulta la base de datos para mostrar el nombre del registro ya elegido
+    (al editar o al volver a mostrar un formulario con errores). Los `attrs` se aplican
+    al campo de texto visible. Requiere `{{ form.media }}` en la plantilla.
+    """
+
+    class Media:
+        js = ['js/autocompletar.js']
+
+    def __init__(self, url, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+
+    def id_for_label(self, id_):
+        return f'{id_}_texto' if id_ else id_
+
+    def _texto_seleccionado(self, value):
+        # ModelChoiceField asigna su queryset al widget como `choices` (sin evaluarlo)
+        queryset = getattr(getattr(self, 'choices', None), 'queryset', None)
+        if value in (None, '') or queryset is None:
+            return ''
+        try:
+            registro = queryset.filter(pk=value).first()
+        except (TypeError, ValueError):
+            return ''
+        return str(registro) if registro is not None else ''
+
+    def render(self, name, value, attrs=None, renderer=None):
+        attrs = self.build_attrs(self.attrs, attrs)
+        id_ = attrs.pop('id', None)
+        attrs.pop('required', None)
+        # Sin name: el texto visible no se envía con el formulario
+        texto = forms.TextInput(attrs).render(
+            '',
+            self._texto_seleccionado(value),
+            {'id': self.id_for_label(id_), 'autocomplete': 'off', 'data-autocompletar-texto': ''},
+        )
+        oculto = forms.HiddenInput().render(name, value, {'id': id_, 'data-autocompletar-valor': ''} if id_ else {})
+        return format_html(
+            '<div class="autocompletar position-relative" data-autocompletar="{}">{}{}'
+            '<div class="dropdown-menu w-100" data-autocompletar-lista></div></div>',
+            str(self.url), oculto, texto,
+        )
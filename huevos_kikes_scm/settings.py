@@ -66,6 +66,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.instrumentacion.InstrumentacionSQLMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -101,7 +102,8 @@ if os.environ.get('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.config(
             default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
+            # Bajo ASGI (uvicorn) usar DB_CONN_MAX_AGE=0: ver DEPLOY_RENDER.md
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
             conn_health_checks=True,
             ssl_require=False,  # Render maneja SSL automáticamente
         )
@@ -118,6 +120,56 @@ else:
     }
 
 
+# Cache
+# Compartida entre los workers de gunicorn para que la invalidación por versión
+# (dashboard, resúmenes) sea visible en todos los procesos.
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', str(BASE_DIR / '.cache')),
+    }
+}
+
+# Segundos que se reutilizan los resultados del autocompletado de clientes/proveedores
+AUTOCOMPLETAR_TIMEOUT = int(os.environ.get('AUTOCOMPLETAR_TIMEOUT', '30'))
+
+
+# Facturas PDF de ventas cacheadas en disco (fuera de MEDIA_ROOT: no son públicas)
+FACTURAS_CACHE_DIR = os.environ.get('FACTURAS_CACHE_DIR', str(BASE_DIR / 'facturas_cache'))
+# Generar la factura en segundo plano justo después de crear la venta
+FACTURAS_PRERENDER = os.environ.get('FACTURAS_PRERENDER', 'True') == 'True'
+
+
+# Paginación por cursor (WHERE id < ...) en ventas, compras, clientes y proveedores.
+# Desactivada por defecto: los listados usan la paginación numérica de Django.
+PAGINACION_CURSOR = os.environ.get('PAGINACION_CURSOR', 'False') == 'True'
+# Segundos que se reutiliza el total mostrado en modo cursor
+PAGINACION_CONTEO_TIMEOUT = int(os.environ.get('PAGINACION_CONTEO_TIMEOUT', '300'))
+
+
+# Instrumentación SQL por petición (core.instrumentacion)
+SQL_INSTRUMENTACION = os.environ.get('SQL_INSTRUMENTACION', 'True') == 'True'
+# Umbrales para registrar una petición en el log 'core.sql'
+SQL_LENTO_MS = float(os.environ.get('SQL_LENTO_MS', '500'))
+SQL_CONSULTAS_MAX = int(os.environ.get('SQL_CONSULTAS_MAX', '50'))
+# Cada cuántos segundos se guarda el resumen por vista, y cuántos días se conserva
+SQL_RESUMEN_INTERVALO = int(os.environ.get('SQL_RESUMEN_INTERVALO', '60'))
+SQL_RESUMEN_DIAS = int(os.environ.get('SQL_RESUMEN_DIAS', '7'))
+
+
+# Consultas independientes del dashboard y los listados en paralelo (core.concurrencia).
+# Cada hilo abre su propia conexión: la base de datos debe admitir
+# (workers x CONSULTAS_PARALELAS_HILOS) conexiones adicionales. Desactivado por defecto;
+# el perfil ASGI de Docker (SERVIDOR_WEB=asgi) lo activa.
+CONSULTAS_PARALELAS = os.environ.get('CONSULTAS_PARALELAS', 'False') == 'True'
+CONSULTAS_PARALELAS_HILOS = int(os.environ.get('CONSULTAS_PARALELAS_HILOS', '8'))
+
+
+# Segundos tras los cuales un trabajo de exportación o importación 'procesando' se da por
+# abandonado (worker detenido) y otro worker puede reclamarlo
+TRABAJOS_LEASE_SEGUNDOS = int(os.environ.get('TRABAJOS_LEASE_SEGUNDOS', '900'))
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
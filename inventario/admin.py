@@ -1,5 +1,8 @@
-from django.contrib import admin
-from .models import TipoHuevo
+from django.contrib import admin, messages
+from django.db import transaction
+from core.admin import FechaHoraFilter, ListadoGrandeAdmin
+from .models import TipoHuevo, MovimientoInventario, SnapshotInventario
+from .utils import registrar_movimientos, reservar_stock, movimientos_de_lineas, StockInsuficiente
 
 
 @admin.register(TipoHuevo)
@@ -8,3 +11,72 @@ class TipoHuevoAdmin(admin.ModelAdmin):
     list_display = ['tipo', 'precio_cubeta', 'stock_cubetas']
     list_editable = ['precio_cubeta', 'stock_cubetas']
 
+    def save_model(self, request, obj, form, change):
+        """
+        Un cambio de stock se aplica como ajuste en el libro de movimientos (la
+        diferencia con el valor mostrado en el formulario), sin pisar las ventas o
+        compras registradas mientras tanto. Los ajustes a la baja pasan por
+        reservar_stock: si una venta concurrente dejó menos stock del que se quiere
+        descontar, no se guarda ningún cambio y se muestra un error.
+        """
+        anterior = (form.initial.get('stock_cubetas') or 0) if change else 0
+        ajuste = obj.stock_cubetas - anterior
+        try:
+            with transaction.atomic():
+                if change:
+                    campos = [campo for campo in form.changed_data if campo != 'stock_cubetas']
+                    if campos:
+                        obj.save(update_fields=campos)
+                else:
+                    obj.stock_cubetas = 0
+                    obj.save()
+                movimientos = movimientos_de_lineas([(None, obj.pk, ajuste)], 'ajuste')
+                if ajuste < 0:
+                    reservar_stock(movimientos)
+                elif ajuste:
+                    registrar_movimientos(movimientos)
+        except StockInsuficiente as error:
+            request._ajuste_rechazado = True
+            for tipo, cantidad in error.faltantes:
+                self.message_user(
+                    request,
+                    f'No se guardaron los cambios de {tipo.tipo}: no se pueden descontar {cantidad} cubetas, '
+                    f'el stock actual es {tipo.stock_cubetas}.',
+                    messages.ERROR,
+                )
+        obj.refresh_from_db(fields=['stock_cubetas'])
+
+    def message_user(self, request, message, level=messages.INFO, *args, **kwargs):
+        # Tras un ajuste rechazado no se muestra el mensaje de cambio guardado
+        if getattr(request, '_ajuste_rechazado', False) and level == messages.SUCCESS:
+            return
+        super().message_user(request, message, level, *args, **kwargs)
+
+
+class SoloLecturaAdmin(ListadoGrandeAdmin):
+    """El libro de inventario solo se consulta: las filas las escribe inventario.utils."""
+    list_select_related = ['tipo_huevo']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(MovimientoInventario)
+class MovimientoInventarioAdmin(SoloLecturaAdmin):
+    """Admin (solo lectura) del libro de movimientos de inventario."""
+    list_display = ['id', 'fecha_hora', 'tipo_huevo', 'motivo', 'cantidad', 'documento']
+    list_filter = ['motivo', 'tipo_huevo', FechaHoraFilter]
+    search_fields = ['=documento']
+
+
+@admin.register(SnapshotInventario)
+class SnapshotInventarioAdmin(SoloLecturaAdmin):
+    """Admin (solo lectura) de los snapshots del libro de inventario."""
+    list_display = ['fecha_hora', 'tipo_huevo', 'stock_cubetas', 'hasta_movimiento']
+    list_filter = ['tipo_huevo', FechaHoraFilter]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class InventarioConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventario'
+
+    def ready(self):
+        """Importar señales cuando la app esté lista."""
+        import inventario.signals
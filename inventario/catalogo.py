@@ -0,0 +1,70 @@
+"""
+Catálogo de tipos de huevo (tipo, precio y stock) compartido por formularios,
+inventario e importaciones.
+
+TipoHuevo tiene unas pocas filas que se leen en cada formulario de venta o compra
+(una vez por línea del formset), en el inventario y en las importaciones. El catálogo
+se carga una vez por versión y se reutiliza: en memoria del proceso y en la caché de
+Django para los demás workers. Cualquier cambio de precio o de stock (señales de
+TipoHuevo, _aplicar_deltas_stock) asigna una versión nueva al confirmarse.
+
+El stock del catálogo es informativo (se muestra en los formularios): reservar_stock
+vuelve a leer y bloquear las filas antes de descontar.
+"""
+import copy
+
+from django.core.cache import cache
+
+from core.utils import get_version_cache, invalidar_version_cache
+from .models import TipoHuevo
+
+# Versión del catálogo; cambia con cada cambio de precio o stock
+CATALOGO_VERSION_KEY = 'inventario:catalogo:version'
+
+# Tiempo máximo de vida del catálogo en la caché compartida; la invalidación real es por versión
+CATALOGO_TIMEOUT = 60 * 60
+
+# (versión, {pk: TipoHuevo}) del último catálogo cargado en este proceso
+_catalogo = (None, {})
+
+
+def obtener_catalogo():
+    """
+    Tipos de huevo por id, en el orden del modelo.
+
+    Las instancias se comparten entre peticiones y no deben modificarse (ver
+    tipo_del_catalogo para obtener una copia).
+
+    Returns:
+        dict: {pk: TipoHuevo}
+    """
+    global _catalogo
+    version = get_version_cache(CATALOGO_VERSION_KEY)
+    version_local, tipos = _catalogo
+    if version_local == version:
+        return tipos
+
+    clave = f'inventario:catalogo:{version}'
+    tipos = cache.get(clave)
+    if tipos is None:
+        tipos = {tipo.pk: tipo for tipo in TipoHuevo.objects.all()}
+        cache.set(clave, tipos, CATALOGO_TIMEOUT)
+    _catalogo = (version, tipos)
+    return tipos
+
+
+def tipo_del_catalogo(pk):
+    """
+    Copia del TipoHuevo `pk` del catálogo, que puede asignarse a una línea de venta o
+    compra sin alterar el catálogo compartido.
+
+    Returns:
+        TipoHuevo: La copia, o None si el id no está en el catálogo
+    """
+    tipo = obtener_catalogo().get(pk)
+    return copy.copy(tipo) if tipo is not None else None
+
+
+def invalidar_catalogo():
+    """Invalida el catálogo en todos los procesos cuando la transacción actual se confirme."""
+    invalidar_version_cache(CATALOGO_VERSION_KEY)
@@ -0,0 +1,57 @@
+"""
+Campos de formulario para elegir tipos de huevo desde el catálogo cacheado.
+"""
+from django import forms
+from django.forms.models import ModelChoiceIterator
+
+from .catalogo import obtener_catalogo, tipo_del_catalogo
+from .models import TipoHuevo
+
+
+class CatalogoChoiceIterator(ModelChoiceIterator):
+    """Opciones tomadas del catálogo en lugar de evaluar el queryset del campo."""
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for tipo in obtener_catalogo().values():
+            yield self.choice(tipo)
+
+    def __len__(self):
+        return len(obtener_catalogo()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(obtener_catalogo())
+
+
+class TipoHuevoSelect(forms.Select):
+    """Select de tipos de huevo; cada opción lleva su precio por cubeta en data-precio."""
+
+    def create_option(self, name, value, label, selected, index, subindex=None, attrs=None):
+        option = super().create_option(name, value, label, selected, index, subindex, attrs)
+        tipo = getattr(value, 'instance', None)
+        if tipo is not None:
+            option['attrs']['data-precio'] = tipo.precio_cubeta
+        return option
+
+
+class TipoHuevoChoiceField(forms.ModelChoiceField):
+    """
+    Campo de TipoHuevo que lista y valida con el catálogo (ver catalogo.py): los
+    formularios de un formset no consultan la tabla, ni para las opciones ni para el
+    valor elegido. Un id que aún no está en el catálogo se busca en el queryset.
+    """
+    iterator = CatalogoChoiceIterator
+    widget = TipoHuevoSelect
+
+    def __init__(self, queryset=None, **kwargs):
+        super().__init__(TipoHuevo.objects.all() if queryset is None else queryset, **kwargs)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            tipo = tipo_del_catalogo(int(value))
+        except (TypeError, ValueError):
+            tipo = None
+        return tipo if tipo is not None else super().to_python(value)
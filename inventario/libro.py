@@ -0,0 +1,111 @@
+"""
+Consultas sobre el libro de movimientos de inventario (MovimientoInventario).
+
+- Un snapshot (SnapshotInventario) guarda el stock de un tipo de huevo según el libro
+  hasta un movimiento. El stock en una fecha es el último snapshot anterior a ella más
+  los movimientos posteriores al snapshot y anteriores a la fecha: dos consultas que
+  solo recorren los movimientos desde el snapshot (índice tipo_huevo, id).
+- tomar_snapshot (comando snapshot_inventario, p. ej. diario desde cron) agrega un
+  snapshot para cada tipo con movimientos nuevos, así el tramo a sumar queda acotado.
+- TipoHuevo.stock_cubetas y el libro se actualizan en la misma transacción
+  (inventario.utils); diferencias_libro compara ambos.
+"""
+from functools import reduce
+from operator import or_
+
+from django.db import transaction
+from django.db.models import Max, OuterRef, Q, Subquery, Sum
+
+from .models import TipoHuevo, MovimientoInventario, SnapshotInventario
+
+
+def _ultimos_snapshots(fecha=None):
+    """
+    Último snapshot de cada tipo de huevo (hasta `fecha`, si se indica), en una consulta.
+
+    Returns:
+        dict: {tipo_huevo_id: (stock_cubetas, hasta_movimiento)}; (0, 0) si no tiene
+    """
+    snapshots = SnapshotInventario.objects.filter(tipo_huevo=OuterRef('pk'))
+    if fecha is not None:
+        snapshots = snapshots.filter(fecha_hora__lte=fecha)
+    snapshots = snapshots.order_by('-fecha_hora', '-id')
+    filas = TipoHuevo.objects.order_by().annotate(
+        stock=Subquery(snapshots.values('stock_cubetas')[:1]),
+        hasta=Subquery(snapshots.values('hasta_movimiento')[:1]),
+    ).values_list('pk', 'stock', 'hasta')
+    return {pk: (stock or 0, hasta or 0) for pk, stock, hasta in filas}
+
+
+def _movimientos_desde(snapshots):
+    """Movimientos posteriores al snapshot de cada tipo."""
+    return MovimientoInventario.objects.filter(reduce(or_, [
+        Q(tipo_huevo_id=pk, id__gt=hasta) for pk, (_, hasta) in snapshots.items()
+    ])).order_by()
+
+
+def stock_segun_libro(fecha=None):
+    """
+    Stock de cada tipo de huevo según el libro de movimientos.
+
+    Args:
+        fecha (datetime, optional): Momento consultado; por defecto, ahora
+
+    Returns:
+        dict: {tipo_huevo_id: cubetas}
+    """
+    snapshots = _ultimos_snapshots(fecha)
+    if not snapshots:
+        return {}
+    movimientos = _movimientos_desde(snapshots)
+    if fecha is not None:
+        movimientos = movimientos.filter(fecha_hora__lte=fecha)
+    deltas = dict(
+        movimientos.values('tipo_huevo_id')
+        .annotate(total=Sum('cantidad'))
+        .values_list('tipo_huevo_id', 'total')
+    )
+    return {pk: stock + (deltas.get(pk) or 0) for pk, (stock, _) in snapshots.items()}
+
+
+def tomar_snapshot():
+    """
+    Agrega un snapshot para cada tipo de huevo con movimientos desde su último snapshot.
+
+    Bloquea las filas de TipoHuevo mientras lee: cada movimiento se inserta en la misma
+    transacción que actualiza esas filas, así que no queda ninguno sin confirmar con un
+    id menor que el último incluido.
+
+    Returns:
+        int: Snapshots creados
+    """
+    with transaction.atomic():
+        list(TipoHuevo.objects.select_for_update().order_by('pk').values_list('pk', flat=True))
+        hasta = MovimientoInventario.objects.aggregate(ultimo=Max('id'))['ultimo']
+        snapshots = _ultimos_snapshots()
+        if hasta is None or not snapshots:
+            return 0
+        nuevos = (
+            _movimientos_desde(snapshots).filter(id__lte=hasta)
+            .values('tipo_huevo_id')
+            .annotate(total=Sum('cantidad'))
+            .values_list('tipo_huevo_id', 'total')
+        )
+        creados = SnapshotInventario.objects.bulk_create([
+            SnapshotInventario(tipo_huevo_id=pk, stock_cubetas=snapshots[pk][0] + total, hasta_movimiento=hasta)
+            for pk, total in nuevos
+        ])
+    return len(creados)
+
+
+def diferencias_libro():
+    """
+    Tipos de huevo cuyo stock (TipoHuevo.stock_cubetas) no coincide con el libro.
+
+    Returns:
+        dict: {TipoHuevo: cubetas según el libro}
+    """
+    with transaction.atomic():
+        tipos = list(TipoHuevo.objects.select_for_update().order_by('pk'))
+        segun_libro = stock_segun_libro()
+    return {tipo: segun_libro.get(tipo.pk, 0) for tipo in tipos if segun_libro.get(tipo.pk, 0) != tipo.stock_cubetas}
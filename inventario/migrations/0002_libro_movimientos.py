@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def snapshot_apertura(apps, schema_editor):
+    """Snapshot inicial con el stock actual: el libro parte de ese saldo."""
+    TipoHuevo = apps.get_model('inventario', 'TipoHuevo')
+    SnapshotInventario = apps.get_model('inventario', 'SnapshotInventario')
+    SnapshotInventario.objects.bulk_create([
+        SnapshotInventario(tipo_huevo_id=pk, stock_cubetas=stock, hasta_movimiento=0)
+        for pk, stock in TipoHuevo.objects.values_list('pk', 'stock_cubetas')
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventario', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SnapshotInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stock_cubetas', models.IntegerField()),
+                ('hasta_movimiento', models.BigIntegerField(default=0)),
+                ('fecha_hora', models.DateTimeField(auto_now_add=True)),
+                ('tipo_huevo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='inventario.tipohuevo', verbose_name='Tipo de Huevo')),
+            ],
+            options={
+                'verbose_name': 'Snapshot de Inventario',
+                'verbose_name_plural': 'Snapshots de Inventario',
+                'ordering': ['-fecha_hora'],
+                'indexes': [models.Index(fields=['tipo_huevo', 'fecha_hora'], name='snapshot_tipo_fecha_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimientoInventario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad', models.IntegerField(help_text='Cubetas: positiva si entra stock, negativa si sale')),
+                ('motivo', models.CharField(choices=[('venta', 'Venta'), ('compra', 'Compra'), ('reversion_venta', 'Reversión de venta'), ('reversion_compra', 'Reversión de compra'), ('ajuste', 'Ajuste')], max_length=20)),
+                ('documento', models.PositiveIntegerField(blank=True, null=True)),
+                ('fecha_hora', models.DateTimeField(auto_now_add=True)),
+                ('tipo_huevo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='movimientos', to='inventario.tipohuevo', verbose_name='Tipo de Huevo')),
+            ],
+            options={
+                'verbose_name': 'Movimiento de Inventario',
+                'verbose_name_plural': 'Movimientos de Inventario',
+                'ordering': ['-id'],
+                'indexes': [models.Index(fields=['tipo_huevo', 'id'], name='movimiento_tipo_id_idx'), models.Index(fields=['fecha_hora'], name='movimiento_fecha_hora_idx'), models.Index(fields=['motivo', 'documento'], name='movimiento_documento_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_apertura, migrations.RunPython.noop),
+    ]
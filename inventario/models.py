@@ -36,3 +36,76 @@ class TipoHuevo(models.Model):
     def __str__(self):
         return f"Huevo {self.tipo} - ${self.precio_cubeta} - Stock: {self.stock_cubetas}"
 
+
+class MovimientoInventario(models.Model):
+    """
+    Libro de movimientos de stock: solo se insertan filas, nunca se modifican.
+    Una fila por línea de venta o compra, por línea revertida al eliminarla y por
+    ajuste manual. TipoHuevo.stock_cubetas es el saldo que se bloquea al vender; el
+    libro explica cada cambio y permite consultar el stock en cualquier fecha
+    (ver inventario/libro.py).
+    """
+    MOTIVO_CHOICES = [
+        ('venta', 'Venta'),
+        ('compra', 'Compra'),
+        ('reversion_venta', 'Reversión de venta'),
+        ('reversion_compra', 'Reversión de compra'),
+        ('ajuste', 'Ajuste'),
+    ]
+    # Motivos que restan stock (la cantidad se guarda negativa)
+    MOTIVOS_SALIDA = {'venta', 'reversion_compra'}
+
+    tipo_huevo = models.ForeignKey(
+        TipoHuevo,
+        on_delete=models.PROTECT,
+        related_name='movimientos',
+        verbose_name='Tipo de Huevo'
+    )
+    cantidad = models.IntegerField(help_text='Cubetas: positiva si entra stock, negativa si sale')
+    motivo = models.CharField(max_length=20, choices=MOTIVO_CHOICES)
+    # Id de la venta o compra según el motivo; no es llave foránea para que el
+    # movimiento se conserve al eliminar el documento
+    documento = models.PositiveIntegerField(null=True, blank=True)
+    fecha_hora = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-id']
+        verbose_name = 'Movimiento de Inventario'
+        verbose_name_plural = 'Movimientos de Inventario'
+        indexes = [
+            models.Index(fields=['tipo_huevo', 'id'], name='movimiento_tipo_id_idx'),
+            models.Index(fields=['fecha_hora'], name='movimiento_fecha_hora_idx'),
+            models.Index(fields=['motivo', 'documento'], name='movimiento_documento_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_motivo_display()} - Huevo {self.tipo_huevo.tipo} - {self.cantidad:+d} cubetas"
+
+
+class SnapshotInventario(models.Model):
+    """
+    Stock de un tipo de huevo según el libro hasta un movimiento (incluido).
+    El stock en una fecha es el último snapshot anterior más los movimientos
+    posteriores a él: nunca se recorre el libro completo.
+    """
+    tipo_huevo = models.ForeignKey(
+        TipoHuevo,
+        on_delete=models.CASCADE,
+        related_name='snapshots',
+        verbose_name='Tipo de Huevo'
+    )
+    stock_cubetas = models.IntegerField()
+    # Último MovimientoInventario.id incluido (0 = antes del primer movimiento)
+    hasta_movimiento = models.BigIntegerField(default=0)
+    fecha_hora = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-fecha_hora']
+        verbose_name = 'Snapshot de Inventario'
+        verbose_name_plural = 'Snapshots de Inventario'
+        indexes = [
+            models.Index(fields=['tipo_huevo', 'fecha_hora'], name='snapshot_tipo_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"Huevo {self.tipo_huevo.tipo} - {self.stock_cubetas} cubetas - {self.fecha_hora:%Y-%m-%d %H:%M}"
@@ -0,0 +1,15 @@
+"""
+Señales de la app de inventario.
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalogo import invalidar_catalogo
+from .models import TipoHuevo
+
+
+@receiver(post_save, sender=TipoHuevo)
+@receiver(post_delete, sender=TipoHuevo)
+def invalidar_catalogo_tipos(sender, **kwargs):
+    """Invalida el catálogo de tipos de huevo al confirmar cambios de precio o stock."""
+    invalidar_catalogo()
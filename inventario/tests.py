@@ -1,3 +1,202 @@
-from django.test import TestCase
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from clientes.models import Cliente
+from core.models import CustomUser
+from core.utils import registrar_transaccion_caja
+from proveedores.models import Proveedor
+from transacciones.models import Venta, Compra
+from transacciones.utils import crear_venta, crear_compra
+from .catalogo import obtener_catalogo, tipo_del_catalogo
+from .libro import diferencias_libro, stock_segun_libro, tomar_snapshot
+from .models import TipoHuevo, MovimientoInventario, SnapshotInventario
+from .utils import reservar_stock, registrar_movimientos, movimientos_de_lineas, StockInsuficiente
+
+# Caché en memoria: las versiones de caché no deben pasar de una prueba a otra
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class ReservarStockTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_a = TipoHuevo.objects.create(tipo='A', precio_cubeta=Decimal('10000'))
+        cls.tipo_aa = TipoHuevo.objects.create(tipo='AA', precio_cubeta=Decimal('12000'))
+        registrar_movimientos(movimientos_de_lineas([(None, cls.tipo_a.pk, 10), (None, cls.tipo_aa.pk, 10)], 'ajuste'))
+
+    def stock(self):
+        return dict(TipoHuevo.objects.values_list('tipo', 'stock_cubetas'))
+
+    def test_reserva_descuenta_todos_los_tipos(self):
+        with transaction.atomic():
+            reservar_stock(movimientos_de_lineas([(1, self.tipo_a.pk, 4), (1, self.tipo_aa.pk, 10)], 'venta'))
+
+        self.assertEqual(self.stock(), {'A': 6, 'AA': 0})
+
+    def test_sobreventa_se_rechaza_sin_cambiar_el_stock(self):
+        movimientos_antes = MovimientoInventario.objects.count()
+        with self.assertRaises(StockInsuficiente) as contexto:
+            with transaction.atomic():
+                # Dos líneas del mismo tipo suman más que el stock aunque cada una quepa
+                reservar_stock(movimientos_de_lineas(
+                    [(1, self.tipo_a.pk, 3), (1, self.tipo_aa.pk, 6), (1, self.tipo_aa.pk, 6)], 'venta'
+                ))
+
+        self.assertEqual([(tipo.pk, cantidad) for tipo, cantidad in contexto.exception.faltantes], [(self.tipo_aa.pk, 12)])
+        self.assertEqual(self.stock(), {'A': 10, 'AA': 10})
+        self.assertEqual(MovimientoInventario.objects.count(), movimientos_antes)
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class LibroInventarioTests(TestCase):
+    """El último snapshot más los movimientos posteriores coincide con TipoHuevo.stock_cubetas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = CustomUser.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-de-prueba')
+        cls.cliente = Cliente.objects.create(
+            nombre='Tienda La Esquina', cedula_nit='1010', direccion='Calle 1', telefono='3000000000', email='cliente@ejemplo.com'
+        )
+        cls.proveedor = Proveedor.objects.create(
+            nombre='Granja El Roble', nit='9001', direccion='Vereda 2', telefono='3100000000', email='granja@ejemplo.com'
+        )
+        cls.tipo_a = TipoHuevo.objects.create(tipo='A', precio_cubeta=Decimal('10000'))
+        cls.tipo_aa = TipoHuevo.objects.create(tipo='AA', precio_cubeta=Decimal('12000'))
+        registrar_transaccion_caja(Decimal('1000000'), 'ingreso', descripcion='Capital inicial')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    def ajustar(self, tipo, stock, precio=None):
+        """Cambia el stock desde el admin de TipoHuevo (TipoHuevoAdmin.save_model)."""
+        tipo.refresh_from_db()
+        respuesta = self.client.post(f'/admin/inventario/tipohuevo/{tipo.pk}/change/', {
+            'tipo': tipo.tipo,
+            'precio_cubeta': precio or tipo.precio_cubeta,
+            'stock_cubetas': stock,
+        })
+        self.assertEqual(respuesta.status_code, 302)
+        return respuesta
+
+    def vender(self, tipo, cantidad):
+        return crear_venta(Venta(cliente=self.cliente, usuario_vendedor=self.admin), [
+            {'tipo_huevo': tipo, 'cantidad_cubetas': cantidad, 'precio_unitario_cubeta': Decimal('10000')}
+        ])
+
+    def comprar(self, tipo, cantidad):
+        return crear_compra(Compra(proveedor=self.proveedor, fecha_hora=timezone.now(), medio_pago='efectivo'), [
+            {'tipo_huevo': tipo, 'cantidad_cubetas': cantidad, 'precio_unitario_cubeta': Decimal('8000')}
+        ])
+
+    def assertLibroCoincide(self):
+        contadores = dict(TipoHuevo.objects.values_list('pk', 'stock_cubetas'))
+        for pk, stock in contadores.items():
+            snapshot = SnapshotInventario.objects.filter(tipo_huevo_id=pk).order_by('-fecha_hora', '-id').first()
+            base, hasta = (snapshot.stock_cubetas, snapshot.hasta_movimiento) if snapshot else (0, 0)
+            posteriores = MovimientoInventario.objects.filter(tipo_huevo_id=pk, id__gt=hasta).aggregate(total=Sum('cantidad'))['total']
+            self.assertEqual(base + (posteriores or 0), stock)
+        self.assertEqual(stock_segun_libro(), contadores)
+        self.assertEqual(diferencias_libro(), {})
+
+    def test_ajuste_venta_compra_y_eliminacion(self):
+        self.ajustar(self.tipo_a, 30)
+        self.ajustar(self.tipo_aa, 12)
+        self.assertEqual(
+            list(MovimientoInventario.objects.filter(motivo='ajuste').order_by('id').values_list('tipo_huevo_id', 'cantidad')),
+            [(self.tipo_a.pk, 30), (self.tipo_aa.pk, 12)],
+        )
+        self.assertLibroCoincide()
+
+        venta = self.vender(self.tipo_a, 7)
+        compra = self.comprar(self.tipo_aa, 5)
+        self.assertLibroCoincide()
+
+        self.assertEqual(tomar_snapshot(), 2)
+        self.vender(self.tipo_aa, 3)
+        self.ajustar(self.tipo_a, 20)
+        self.assertLibroCoincide()
+
+        venta.delete()
+        compra.delete()
+        self.assertLibroCoincide()
+        self.assertEqual(dict(TipoHuevo.objects.values_list('tipo', 'stock_cubetas')), {'A': 27, 'AA': 9})
+
+    def test_ajuste_a_la_baja_sin_stock_suficiente_no_guarda_nada(self):
+        self.ajustar(self.tipo_a, 10)
+        self.client.get('/admin/')  # consume el mensaje de este ajuste
+        movimientos_antes = MovimientoInventario.objects.count()
+
+        def venta_concurrente(movimientos):
+            # Una venta confirmada entre la lectura del formulario y el ajuste deja 2 cubetas
+            TipoHuevo.objects.filter(pk=self.tipo_a.pk).update(stock_cubetas=2)
+            return reservar_stock(movimientos)
+
+        with mock.patch('inventario.admin.reservar_stock', side_effect=venta_concurrente):
+            respuesta = self.ajustar(self.tipo_a, 4, precio=Decimal('11000'))
+
+        self.tipo_a.refresh_from_db()
+        self.assertEqual((self.tipo_a.stock_cubetas, self.tipo_a.precio_cubeta), (10, Decimal('10000')))
+        self.assertEqual(MovimientoInventario.objects.count(), movimientos_antes)
+        mensajes = [str(mensaje) for mensaje in self.client.get(respuesta.url).context['messages']]
+        self.assertEqual(len(mensajes), 1)
+        self.assertIn('no se pueden descontar 6 cubetas, el stock actual es 2', mensajes[0])
+        self.assertLibroCoincide()
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class CatalogoTipoHuevoTests(TestCase):
+    """Catálogo versionado de tipos de huevo (inventario/catalogo.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tipo_a = TipoHuevo.objects.create(tipo='A', precio_cubeta=Decimal('10000'))
+        cls.tipo_aa = TipoHuevo.objects.create(tipo='AA', precio_cubeta=Decimal('12000'))
+
+    def setUp(self):
+        cache.clear()
+        # Publica la versión inicial del catálogo
+        obtener_catalogo()
+
+    def precios(self):
+        return {tipo.tipo: tipo.precio_cubeta for tipo in obtener_catalogo().values()}
+
+    def test_se_carga_una_vez_por_version(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.precios(), {'A': Decimal('10000'), 'AA': Decimal('12000')})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tipo_a.precio_cubeta = Decimal('11000')
+            self.tipo_a.save()
+        with self.assertNumQueries(1):
+            self.assertEqual(self.precios()['A'], Decimal('11000'))
+        with self.assertNumQueries(0):
+            obtener_catalogo()
+
+    def test_cambios_de_stock_y_nuevos_tipos_lo_invalidan_al_confirmarse(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            registrar_movimientos(movimientos_de_lineas([(None, self.tipo_aa.pk, 5)], 'ajuste'))
+        # Sin confirmar, el catálogo sigue con la versión anterior
+        self.assertEqual(obtener_catalogo()[self.tipo_aa.pk].stock_cubetas, 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(obtener_catalogo()[self.tipo_aa.pk].stock_cubetas, 5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo = TipoHuevo.objects.create(tipo='B', precio_cubeta=Decimal('8000'))
+        self.assertIn(nuevo.pk, obtener_catalogo())
+        with self.captureOnCommitCallbacks(execute=True):
+            nuevo.delete()
+        self.assertNotIn(nuevo.pk, obtener_catalogo())
+
+    def test_copia_no_altera_el_catalogo(self):
+        copia = tipo_del_catalogo(self.tipo_a.pk)
+        copia.precio_cubeta = Decimal('1')
+        self.assertEqual(obtener_catalogo()[self.tipo_a.pk].precio_cubeta, Decimal('10000'))
+        self.assertIsNone(tipo_del_catalogo(999999))
@@ -0,0 +1,156 @@
+"""
+Funciones de utilidad para el manejo del stock de huevos.
+
+Todo cambio de stock pasa por reservar_stock o registrar_movimientos, que actualizan
+TipoHuevo.stock_cubetas y agregan al libro (MovimientoInventario) las filas que
+explican el cambio, en la misma transacción.
+"""
+from collections import defaultdict
+from functools import reduce
+from operator import or_
+
+from django.db.models import Case, F, IntegerField, Q, When
+from .models import TipoHuevo, MovimientoInventario
+from .catalogo import invalidar_catalogo
+
+
+class StockInsuficiente(Exception):
+    """
+    Se lanza cuando una reserva pide más cubetas de las disponibles.
+
+    Attributes:
+        faltantes (list): Tuplas (TipoHuevo, cantidad_solicitada) por cada tipo sin stock suficiente
+    """
+
+    def __init__(self, faltantes):
+        self.faltantes = faltantes
+        super().__init__(', '.join(
+            f"{tipo.tipo}: solicitado {cantidad}, disponible {tipo.stock_cubetas}"
+            for tipo, cantidad in faltantes
+        ))
+
+
+def movimientos_de_lineas(lineas, motivo):
+    """
+    Movimientos (sin guardar) para líneas de venta o compra, o para su reversión.
+
+    Args:
+        lineas (iterable): Tuplas (documento_id, tipo_huevo_id, cantidad_cubetas)
+        motivo (str): Motivo de MovimientoInventario; define el signo de la cantidad
+
+    Returns:
+        list: MovimientoInventario sin guardar
+    """
+    signo = -1 if motivo in MovimientoInventario.MOTIVOS_SALIDA else 1
+    return [
+        MovimientoInventario(tipo_huevo_id=tipo_huevo_id, cantidad=signo * cantidad, motivo=motivo, documento=documento)
+        for documento, tipo_huevo_id, cantidad in lineas
+        if cantidad
+    ]
+
+
+def _deltas(movimientos):
+    """Suma la cantidad de los movimientos por tipo de huevo: {tipo_huevo_id: delta}."""
+    deltas = defaultdict(int)
+    for movimiento in movimientos:
+        deltas[movimiento.tipo_huevo_id] += movimiento.cantidad
+    return deltas
+
+
+def _aplicar_deltas_stock(deltas, condiciones=None):
+    """
+    Aplica varios deltas de stock en una sola sentencia UPDATE con CASE e invalida el
+    catálogo de tipos de huevo (ver catalogo.py).
+
+    Args:
+        deltas (dict): {tipo_huevo_id: delta} (positivo suma, negativo resta)
+        condiciones (Q, optional): Condición adicional que deben cumplir las filas
+
+    Returns:
+        int: Número de filas actualizadas
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+
+    qs = TipoHuevo.objects.filter(pk__in=deltas)
+    if condiciones is not None:
+        qs = qs.filter(condiciones)
+    actualizadas = qs.update(stock_cubetas=Case(
+        *[When(pk=pk, then=F('stock_cubetas') + delta) for pk, delta in deltas.items()],
+        default=F('stock_cubetas'),
+        output_field=IntegerField(),
+    ))
+    if actualizadas:
+        invalidar_catalogo()
+    return actualizadas
+
+
+def reservar_stock(movimientos):
+    """
+    Descuenta stock para varios tipos de huevo de forma segura ante ventas concurrentes
+    y registra los movimientos de salida en el libro.
+
+    Bloquea las filas de TipoHuevo en orden de id (siempre el mismo orden, para evitar
+    interbloqueos), valida todos los tipos en una sola consulta y aplica los descuentos
+    en un único UPDATE condicional (stock = stock - n WHERE stock >= n).
+    Debe llamarse dentro de transaction.atomic().
+
+    Args:
+        movimientos (list): MovimientoInventario de salida sin guardar (ver movimientos_de_lineas)
+
+    Returns:
+        list: Los TipoHuevo bloqueados, con el stock previo a la reserva
+
+    Raises:
+        StockInsuficiente: Si uno o más tipos no tienen stock suficiente
+    """
+    cantidades = {pk: -delta for pk, delta in _deltas(movimientos).items() if delta}
+    tipos = list(
+        TipoHuevo.objects.select_for_update()
+        .filter(pk__in=cantidades)
+        .order_by('pk')
+    )
+
+    faltantes = [
+        (tipo, cantidades[tipo.pk])
+        for tipo in tipos
+        if tipo.stock_cubetas < cantidades[tipo.pk]
+    ]
+    if faltantes:
+        raise StockInsuficiente(faltantes)
+
+    condiciones = reduce(or_, [
+        Q(pk=pk, stock_cubetas__gte=cantidad) for pk, cantidad in cantidades.items()
+    ], Q(pk__in=[]))
+    actualizadas = _aplicar_deltas_stock(
+        {pk: -cantidad for pk, cantidad in cantidades.items()},
+        condiciones
+    )
+    if actualizadas != len(cantidades):
+        # Sin bloqueo de filas (SQLite) otra venta pudo descontar antes; la transacción
+        # del llamador debe revertirse al recibir la excepción
+        disponibles = dict(TipoHuevo.objects.filter(pk__in=cantidades).values_list('pk', 'stock_cubetas'))
+        for tipo in tipos:
+            tipo.stock_cubetas = disponibles[tipo.pk]
+        raise StockInsuficiente([
+            (tipo, cantidades[tipo.pk]) for tipo in tipos
+            if tipo.stock_cubetas < cantidades[tipo.pk]
+        ])
+
+    MovimientoInventario.objects.bulk_create(movimientos)
+    return tipos
+
+
+def registrar_movimientos(movimientos):
+    """
+    Aplica movimientos sin validar disponibilidad: un único UPDATE atómico (F()) del
+    stock de todos los tipos y un INSERT en el libro. Se usa para entradas (compras,
+    reversión de ventas), para revertir compras eliminadas, que ya sumaron ese stock,
+    y para ajustes.
+
+    Args:
+        movimientos (list): MovimientoInventario sin guardar
+    """
+    _aplicar_deltas_stock(_deltas(movimientos))
+    MovimientoInventario.objects.bulk_create(movimientos)
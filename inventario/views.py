@@ -1,9 +1,9 @@
 from django.shortcuts import render
-from django.http import HttpResponse
 from django.views.generic import ListView
 from django.contrib.auth.mixins import LoginRequiredMixin
-from openpyxl import Workbook
+from core.exports import xlsx_response, ColumnaExport
 from .models import TipoHuevo
+from .catalogo import obtener_catalogo
 
 
 class InventarioListView(LoginRequiredMixin, ListView):
@@ -16,6 +16,10 @@ class InventarioListView(LoginRequiredMixin, ListView):
     context_object_name = 'tipos_huevo'
     login_url = 'core:login'
 
+    def get_queryset(self):
+        """Tipos de huevo del catálogo cacheado (ver catalogo.py)."""
+        return list(obtener_catalogo().values())
+
     def get(self, request, *args, **kwargs):
         """
         Verifica si se solicita exportar a Excel.
@@ -30,35 +34,10 @@ class InventarioListView(LoginRequiredMixin, ListView):
         """
         Genera un archivo Excel con los datos del inventario.
         """
-        # Crear workbook y hoja
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Inventario"
-
-        # Encabezados
-        headers = ['Tipo', 'Precio por Cubeta', 'Stock en Cubetas']
-        ws.append(headers)
-
-        # Datos
-        tipos_huevo = TipoHuevo.objects.all()
-        for tipo in tipos_huevo:
-            ws.append([
-                tipo.get_tipo_display(),
-                float(tipo.precio_cubeta),
-                tipo.stock_cubetas
-            ])
-
-        # Ajustar anchos de columna
-        ws.column_dimensions['A'].width = 15
-        ws.column_dimensions['B'].width = 20
-        ws.column_dimensions['C'].width = 20
-
-        # Crear respuesta HTTP
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename=inventario_huevos.xlsx'
-        
-        wb.save(response)
-        return response
-
+        tipos = dict(TipoHuevo.TIPO_CHOICES)
+        columnas = [
+            ColumnaExport('Tipo', 'tipo', lambda valor: tipos.get(valor, valor), 15),
+            ColumnaExport('Precio por Cubeta', 'precio_cubeta', float, 20),
+            ColumnaExport('Stock en Cubetas', 'stock_cubetas', None, 20),
+        ]
+        return xlsx_response(TipoHuevo.objects.all(), columnas, 'inventario_huevos.xlsx', 'Inventario')
@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:37
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+# Copias de core.autocompletar.normalizar_nombre y de los triggers de core.busqueda
+# tal como estaban al crear esta migración (las migraciones no importan código vivo)
+TABLA = 'proveedores_proveedor'
+CAMPOS_FTS = ('nombre', 'nit', 'telefono', 'email')
+
+
+def normalizar_nombre(texto, largo=200):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    sin_tildes = ''.join(caracter for caracter in descompuesto if not unicodedata.combining(caracter))
+    return ' '.join(sin_tildes.upper().split())[:largo]
+
+
+def calcular_nombre_busqueda(apps, schema_editor):
+    """Calcula el nombre normalizado de los registros existentes."""
+    Proveedor = apps.get_model('proveedores', 'Proveedor')
+    lote = []
+    for registro in Proveedor.objects.only('nombre').iterator(chunk_size=2000):
+        registro.nombre_busqueda = normalizar_nombre(registro.nombre)
+        lote.append(registro)
+        if len(lote) >= 2000:
+            Proveedor.objects.bulk_update(lote, ['nombre_busqueda'])
+            lote = []
+    Proveedor.objects.bulk_update(lote, ['nombre_busqueda'])
+
+
+def reinstalar_triggers_fts(apps, schema_editor):
+    """
+    En SQLite, AddField con default recrea la tabla y se pierden los triggers FTS5 de
+    core.0007_indices_busqueda; se vuelven a crear y se reconstruye el índice.
+    """
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    fts = f'{TABLA}_fts'
+    columnas = ', '.join(CAMPOS_FTS)
+    nuevos = ', '.join(f'new.{campo}' for campo in CAMPOS_FTS)
+    viejos = ', '.join(f'old.{campo}' for campo in CAMPOS_FTS)
+    with schema_editor.connection.cursor() as cursor:
+        for sufijo in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {fts}_{sufijo}')
+        cursor.execute(
+            f'CREATE TRIGGER {fts}_ai AFTER INSERT ON {TABLA} BEGIN '
+            f'INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END'
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {fts}_ad AFTER DELETE ON {TABLA} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); END"
+        )
+        cursor.execute(
+            f'CREATE TRIGGER {fts}_au AFTER UPDATE ON {TABLA} BEGIN '
+            f"INSERT INTO {fts}({fts}, rowid, {columnas}) VALUES ('delete', old.id, {viejos}); "
+            f'INSERT INTO {fts}(rowid, {columnas}) VALUES (new.id, {nuevos}); END'
+        )
+        cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('proveedores', '0001_initial'),
+        ('core', '0007_indices_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='proveedor',
+            name='nombre_busqueda',
+            field=models.CharField(blank=True, default='', editable=False, max_length=200),
+        ),
+        migrations.RunPython(calcular_nombre_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(reinstalar_triggers_fts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='proveedor',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['nombre_busqueda'], name='proveedor_activo_busqueda_idx'),
+        ),
+    ]
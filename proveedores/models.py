@@ -1,5 +1,7 @@
 from django.db import models
 
+from core.autocompletar import NombreBusquedaQuerySet, normalizar_nombre
+
 
 class Proveedor(models.Model):
     """
@@ -24,14 +26,30 @@ class Proveedor(models.Model):
         help_text='Certificado de Cámara de Comercio'
     )
     
+    # Nombre normalizado para el autocompletado (core/autocompletar.py); se calcula al guardar
+    nombre_busqueda = models.CharField(max_length=200, blank=True, default='', editable=False)
+
     fecha_registro = models.DateTimeField(auto_now_add=True)
     activo = models.BooleanField(default=True)
 
+    objects = NombreBusquedaQuerySet.as_manager()
+
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Proveedor'
         verbose_name_plural = 'Proveedores'
+        indexes = [
+            # Autocompletado por prefijo del nombre (core/autocompletar.py)
+            models.Index(fields=['nombre_busqueda'], condition=models.Q(activo=True), name='proveedor_activo_busqueda_idx'),
+        ]
 
     def __str__(self):
         return f"{self.nombre} - {self.nit}"
 
+    def save(self, *args, **kwargs):
+        self.nombre_busqueda = normalizar_nombre(self.nombre)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nombre' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'nombre_busqueda'}
+        super().save(*args, **kwargs)
+
@@ -1,3 +1,32 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 
-# Create your tests here.
+from core.models import CustomUser
+from .models import Proveedor
+
+# Caché en memoria: las versiones de caché no deben pasar de una prueba a otra
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_PRUEBAS)
+class AutocompletarProveedoresTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user('comprador', password='clave-de-prueba')
+        datos = {'direccion': 'Vereda 2', 'telefono': '3100000000', 'email': 'granja@ejemplo.com'}
+        cls.roble = Proveedor.objects.create(nombre='Granja El Roble', nit='9001', **datos)
+        cls.cerrada = Proveedor.objects.create(nombre='Granja Cerrada', nit='9002', activo=False, **datos)
+        cls.avicola = Proveedor.objects.create(nombre='Avícola Granja', nit='8003', **datos)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.usuario)
+
+    def buscar(self, q):
+        return [resultado['id'] for resultado in self.client.get('/proveedores/autocompletar/', {'q': q}).json()['resultados']]
+
+    def test_prefijo_del_nombre_o_nit_solo_activos(self):
+        self.assertEqual(self.buscar('granja'), [self.roble.pk])
+        self.assertEqual(self.buscar('avicola g'), [self.avicola.pk])
+        self.assertEqual(self.buscar('900'), [self.roble.pk])
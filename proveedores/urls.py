@@ -7,7 +7,9 @@ from .views import (
     ProveedorDetailView,
     ProveedorCreateView,
     ProveedorUpdateView,
-    ProveedorDeleteView
+    ProveedorDeleteView,
+    ProveedorSincronizarView,
+    ProveedorAutocompletarView,
 )
 
 app_name = 'proveedores'
@@ -18,4 +20,6 @@ urlpatterns = [
     path('crear/', ProveedorCreateView.as_view(), name='create'),
     path('<int:pk>/editar/', ProveedorUpdateView.as_view(), name='update'),
     path('<int:pk>/eliminar/', ProveedorDeleteView.as_view(), name='delete'),
+    path('sincronizar/', ProveedorSincronizarView.as_view(), name='sincronizar'),
+    path('autocompletar/', ProveedorAutocompletarView.as_view(), name='autocompletar'),
 ]
@@ -1,13 +1,16 @@
 from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.db.models import Q
 from django.contrib.auth.mixins import LoginRequiredMixin
+from core.pagination import KeysetPaginationMixin
+from core.concurrencia import AsyncLoginRequiredMixin, ListadoAsincronoMixin
+from core.busqueda import filtro_documento
+from core.views import AutocompletarView, SincronizacionView
 from .models import Proveedor
 from .forms import ProveedorForm
 
 
-class ProveedorListView(LoginRequiredMixin, ListView):
+class ProveedorListView(AsyncLoginRequiredMixin, KeysetPaginationMixin, ListadoAsincronoMixin, ListView):
     """Vista para listar todos los proveedores."""
     model = Proveedor
     template_name = 'proveedores/proveedor_list.html'
@@ -19,12 +22,7 @@ class ProveedorListView(LoginRequiredMixin, ListView):
         qs = super().get_queryset().order_by('-id')
         q = self.request.GET.get('q')
         if q:
-            qs = qs.filter(
-                Q(nombre__icontains=q) |
-                Q(nit__icontains=q) |
-                Q(telefono__icontains=q) |
-                Q(email__icontains=q)
-            )
+            qs = qs.filter(filtro_documento(Proveedor, q, 'nit'))
         return qs
 
     def get_context_data(self, **kwargs):
@@ -71,3 +69,14 @@ class ProveedorDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('proveedores:list')
     login_url = 'core:login'
 
+
+class ProveedorSincronizarView(SincronizacionView):
+    """Vista para crear o actualizar proveedores en lote desde un archivo CSV o XLSX."""
+    tipo = 'proveedores'
+    url_listado = reverse_lazy('proveedores:list')
+    titulo = 'Sincronizar Proveedores'
+
+
+class ProveedorAutocompletarView(AutocompletarView):
+    """Proveedores activos por prefijo de nombre o NIT, para el selector de compras."""
+    tipo = 'proveedores'
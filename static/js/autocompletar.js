@@ -0,0 +1,107 @@
+/*
+ * Selector con autocompletado (core.widgets.AutocompletarWidget).
+ * Consulta el endpoint del atributo data-autocompletar mientras se escribe y guarda
+ * el id elegido en el input oculto, que es el único que se envía con el formulario.
+ */
+(function () {
+    const ESPERA_MS = 200;
+
+    function iniciar(contenedor) {
+        const url = contenedor.dataset.autocompletar;
+        const valor = contenedor.querySelector('[data-autocompletar-valor]');
+        const texto = contenedor.querySelector('[data-autocompletar-texto]');
+        const lista = contenedor.querySelector('[data-autocompletar-lista]');
+        let temporizador = null;
+        let peticion = null;
+        let activo = -1;
+
+        function cerrar() {
+            lista.classList.remove('show');
+            lista.innerHTML = '';
+            activo = -1;
+        }
+
+        function elegir(item) {
+            valor.value = item.dataset.id;
+            texto.value = item.textContent;
+            cerrar();
+            valor.dispatchEvent(new Event('change', { bubbles: true }));
+        }
+
+        function marcar(indice) {
+            const items = lista.querySelectorAll('.dropdown-item');
+            if (!items.length) {
+                return;
+            }
+            activo = (indice + items.length) % items.length;
+            items.forEach(function (item, i) {
+                item.classList.toggle('active', i === activo);
+            });
+        }
+
+        function mostrar(resultados) {
+            lista.innerHTML = '';
+            activo = -1;
+            if (!resultados.length) {
+                lista.innerHTML = '<span class="dropdown-item-text text-muted">Sin resultados</span>';
+            }
+            resultados.forEach(function (resultado) {
+                const item = document.createElement('button');
+                item.type = 'button';
+                item.className = 'dropdown-item';
+                item.dataset.id = resultado.id;
+                item.textContent = resultado.texto;
+                item.addEventListener('mousedown', function (evento) {
+                    evento.preventDefault();
+                    elegir(item);
+                });
+                lista.appendChild(item);
+            });
+            lista.classList.add('show');
+        }
+
+        function buscar() {
+            const q = texto.value.trim();
+            if (peticion) {
+                peticion.abort();
+            }
+            if (!q) {
+                cerrar();
+                return;
+            }
+            peticion = new AbortController();
+            fetch(url + '?q=' + encodeURIComponent(q), { signal: peticion.signal, headers: { 'Accept': 'application/json' } })
+                .then(function (respuesta) { return respuesta.json(); })
+                .then(function (datos) { mostrar(datos.resultados); })
+                .catch(function () {});
+        }
+
+        texto.addEventListener('input', function () {
+            // Al cambiar el texto se descarta la selección anterior
+            valor.value = '';
+            clearTimeout(temporizador);
+            temporizador = setTimeout(buscar, ESPERA_MS);
+        });
+
+        texto.addEventListener('keydown', function (evento) {
+            if (evento.key === 'ArrowDown') {
+                evento.preventDefault();
+                marcar(activo + 1);
+            } else if (evento.key === 'ArrowUp') {
+                evento.preventDefault();
+                marcar(activo - 1);
+            } else if (evento.key === 'Enter' && activo >= 0) {
+                evento.preventDefault();
+                elegir(lista.querySelectorAll('.dropdown-item')[activo]);
+            } else if (evento.key === 'Escape') {
+                cerrar();
+            }
+        });
+
+        texto.addEventListener('blur', cerrar);
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        document.querySelectorAll('[data-autocompletar]').forEach(iniciar);
+    });
+})();
@@ -1,32 +1,170 @@
 from django.contrib import admin
-from .models import Venta, DetalleVenta, Compra, DetalleCompra
+from django.contrib.admin.models import DELETION, LogEntry
+from django.contrib.admin.utils import quote
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Sum
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.text import capfirst
+from clientes.models import Cliente
+from proveedores.models import Proveedor
+from core.admin import FechaHoraFilter, ListadoGrandeAdmin
+from core.busqueda import es_documento
+from .facturas import renovar_facturas
+from .listados import filtro_transaccion
+from .models import Venta, DetalleVenta, Compra, DetalleCompra, ImportacionTransacciones
 
 
-class DetalleVentaInline(admin.TabularInline):
-    model = DetalleVenta
+class EliminacionAgregadaAdmin(ListadoGrandeAdmin):
+    """
+    Admin de ventas/compras: eliminar uno o muchos documentos cuesta un número fijo de
+    consultas. El stock y la caja se revierten con consultas agregadas (ver
+    EliminacionAgregadaQuerySet), la confirmación cuenta las líneas en lugar de cargar
+    cada una y las entradas del historial se guardan con un solo INSERT.
+    """
+    # Modelo de las líneas del documento
+    modelo_lineas = None
+
+    def get_queryset(self, request):
+        """Anota la cantidad de líneas y de cubetas con subconsultas correlacionadas (solo para las filas de la página)."""
+        lineas = self.modelo_lineas.objects.filter(**{self.model._meta.model_name: OuterRef('pk')}).order_by().values(self.model._meta.model_name)
+        return super().get_queryset(request).annotate(
+            num_lineas=Subquery(lineas.annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+            num_cubetas=Subquery(lineas.annotate(n=Sum('cantidad_cubetas')).values('n'), output_field=IntegerField()),
+        )
+
+    @admin.display(description='Líneas')
+    def lineas(self, obj):
+        return obj.num_lineas or 0
+
+    @admin.display(description='Cubetas')
+    def cubetas(self, obj):
+        return obj.num_cubetas or 0
+
+    def get_deleted_objects(self, objs, request):
+        opts = self.model._meta
+        objs = list(objs)
+        lineas = self.modelo_lineas.objects.filter(**{f'{opts.model_name}__in': objs}).count()
+        eliminados = [
+            format_html(
+                '{}: <a href="{}">{}</a>',
+                capfirst(opts.verbose_name),
+                reverse(f'admin:{opts.app_label}_{opts.model_name}_change', args=[quote(obj.pk)]),
+                obj,
+            )
+            for obj in objs
+        ]
+        cantidades = {
+            opts.verbose_name_plural: len(objs),
+            self.modelo_lineas._meta.verbose_name_plural: lineas,
+        }
+        permisos_faltantes = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        return eliminados, cantidades, permisos_faltantes, []
+
+    def log_deletion(self, request, obj, object_repr):
+        # Se acumulan y se guardan juntas al eliminar (delete_model/delete_queryset)
+        if not hasattr(request, '_eliminaciones_admin'):
+            request._eliminaciones_admin = []
+        request._eliminaciones_admin.append(LogEntry(
+            user_id=request.user.pk,
+            content_type_id=ContentType.objects.get_for_model(obj, for_concrete_model=False).pk,
+            object_id=str(obj.pk),
+            object_repr=object_repr[:200],
+            action_flag=DELETION,
+        ))
+
+    def _guardar_historial(self, request):
+        LogEntry.objects.bulk_create(getattr(request, '_eliminaciones_admin', []))
+        request._eliminaciones_admin = []
+
+    def delete_model(self, request, obj):
+        """Elimina el documento revirtiendo stock y caja."""
+        obj.delete()
+        self._guardar_historial(request)
+
+    def delete_queryset(self, request, queryset):
+        """Elimina los documentos seleccionados revirtiendo stock y caja en lote."""
+        queryset.delete()
+        self._guardar_historial(request)
+
+
+class DetalleInline(admin.TabularInline):
+    """
+    Líneas de un documento. Las opciones de tipo de huevo se consultan una vez por
+    petición y se comparten entre todas las filas del formset; el tipo de cada línea
+    (que aparece en su nombre) se carga con la misma consulta de las líneas.
+    """
     extra = 1
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tipo_huevo')
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'tipo_huevo':
+            if not hasattr(request, '_opciones_tipo_huevo'):
+                request._opciones_tipo_huevo = list(formfield.choices)
+            formfield.choices = request._opciones_tipo_huevo
+        return formfield
+
+
+class DetalleVentaInline(DetalleInline):
+    model = DetalleVenta
+
 
 @admin.register(Venta)
-class VentaAdmin(admin.ModelAdmin):
+class VentaAdmin(EliminacionAgregadaAdmin):
     """Admin para el modelo Venta."""
-    list_display = ['id', 'cliente', 'usuario_vendedor', 'fecha_hora', 'total']
-    list_filter = ['fecha_hora', 'usuario_vendedor']
+    list_display = ['id', 'cliente', 'usuario_vendedor', 'fecha_hora', 'total', 'lineas', 'cubetas']
+    list_filter = [FechaHoraFilter, 'usuario_vendedor']
+    list_select_related = ['cliente', 'usuario_vendedor']
     search_fields = ['cliente__nombre', 'cliente__cedula_nit']
+    autocomplete_fields = ['cliente', 'usuario_vendedor']
     readonly_fields = ['fecha_hora']
     inlines = [DetalleVentaInline]
+    modelo_lineas = DetalleVenta
 
+    def save_related(self, request, form, formsets, change):
+        """Tras guardar las líneas, renueva la factura cacheada de la venta editada."""
+        super().save_related(request, form, formsets, change)
+        if change:
+            renovar_facturas(Venta.objects.filter(pk=form.instance.pk))
 
-class DetalleCompraInline(admin.TabularInline):
+    def get_search_results(self, request, queryset, search_term):
+        """Busca por número, nombre o cédula del cliente con los índices de core/busqueda.py."""
+        if not search_term.strip():
+            return queryset, False
+        extra = [Q(cliente__cedula_nit=search_term.strip())] if es_documento(search_term) else []
+        return queryset.filter(filtro_transaccion(search_term, Cliente, 'cliente__', *extra)), False
+
+
+class DetalleCompraInline(DetalleInline):
     model = DetalleCompra
-    extra = 1
 
 
 @admin.register(Compra)
-class CompraAdmin(admin.ModelAdmin):
+class CompraAdmin(EliminacionAgregadaAdmin):
     """Admin para el modelo Compra."""
-    list_display = ['id', 'proveedor', 'fecha_hora', 'medio_pago', 'total']
-    list_filter = ['fecha_hora', 'medio_pago']
+    list_display = ['id', 'proveedor', 'fecha_hora', 'medio_pago', 'total', 'lineas', 'cubetas']
+    list_filter = [FechaHoraFilter, 'medio_pago']
+    list_select_related = ['proveedor']
     search_fields = ['proveedor__nombre', 'proveedor__nit']
+    autocomplete_fields = ['proveedor']
     inlines = [DetalleCompraInline]
+    modelo_lineas = DetalleCompra
+
+    def get_search_results(self, request, queryset, search_term):
+        """Busca por número, nombre o NIT del proveedor con los índices de core/busqueda.py."""
+        if not search_term.strip():
+            return queryset, False
+        extra = [Q(proveedor__nit=search_term.strip())] if es_documento(search_term) else []
+        return queryset.filter(filtro_transaccion(search_term, Proveedor, 'proveedor__', *extra)), False
+
 
+@admin.register(ImportacionTransacciones)
+class ImportacionTransaccionesAdmin(admin.ModelAdmin):
+    """Admin para las importaciones masivas de ventas y compras."""
+    list_display = ['id', 'tipo', 'usuario', 'estado', 'documentos_creados', 'filas_con_error', 'creado', 'terminado']
+    list_filter = ['estado', 'tipo']
+    list_select_related = ['usuario']
+    readonly_fields = ['creado', 'reclamado', 'terminado', 'fila_procesada', 'documentos_creados', 'lineas_creadas', 'filas_con_error']
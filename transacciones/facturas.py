@@ -0,0 +1,162 @@
+"""
+Generación y caché en disco de las facturas PDF de ventas.
+
+Cada factura se guarda una vez por (venta, versión de la venta, versión de la plantilla);
+editar la venta incrementa su versión y elimina los archivos anteriores.
+"""
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.template.loader import render_to_string
+from weasyprint import HTML
+
+from .models import Venta
+
+logger = logging.getLogger(__name__)
+
+# Incrementar al modificar transacciones/factura_pdf.html para descartar facturas cacheadas
+FACTURA_PLANTILLA_VERSION = 1
+
+# Tras este tiempo una marca de "en generación" se considera abandonada (proceso caído)
+FACTURA_GENERACION_SEGUNDOS = 60
+
+
+def _directorio_facturas():
+    directorio = Path(settings.FACTURAS_CACHE_DIR)
+    directorio.mkdir(parents=True, exist_ok=True)
+    return directorio
+
+
+def ruta_factura(venta_id, version):
+    """Ruta del PDF cacheado para una versión concreta de la venta."""
+    return _directorio_facturas() / f'venta_{venta_id}_v{version}_p{FACTURA_PLANTILLA_VERSION}.pdf'
+
+
+def etag_factura(venta_id, version):
+    """ETag de la factura; cambia con la versión de la venta o de la plantilla."""
+    return f'"factura-{venta_id}-{version}-{FACTURA_PLANTILLA_VERSION}"'
+
+
+def renderizar_factura(venta):
+    """
+    Genera el PDF de la factura con WeasyPrint.
+
+    Returns:
+        bytes: Contenido del PDF
+    """
+    html_string = render_to_string('transacciones/factura_pdf.html', {
+        'venta': venta,
+        'detalles': venta.detalles.select_related('tipo_huevo'),
+    })
+    return HTML(string=html_string).write_pdf()
+
+
+def obtener_factura(venta):
+    """
+    Devuelve la ruta de la factura en disco, generándola si aún no existe.
+
+    Quien genera la factura crea antes una marca `.generando` (O_EXCL); las demás
+    peticiones para la misma versión (la pre-generación y la redirección tras crear la
+    venta, o dos descargas simultáneas) esperan a que aparezca el PDF en vez de
+    renderizarlo otra vez. La escritura es atómica (archivo temporal + rename), así
+    que nunca se sirve un PDF a medio escribir.
+
+    Args:
+        venta (Venta): Venta con su versión actual
+
+    Returns:
+        Path: Ruta del PDF
+    """
+    ruta = ruta_factura(venta.pk, venta.version)
+    marca = ruta.with_suffix('.generando')
+    while not ruta.exists():
+        try:
+            descriptor = os.open(marca, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            _esperar_marca(marca)
+            continue
+        os.close(descriptor)
+        try:
+            if not ruta.exists():
+                _escribir_factura(venta, ruta)
+        finally:
+            marca.unlink(missing_ok=True)
+    return ruta
+
+
+def _esperar_marca(marca):
+    """Espera un momento a que otra petición termine la factura; descarta marcas abandonadas."""
+    try:
+        antiguedad = time.time() - marca.stat().st_mtime
+    except FileNotFoundError:
+        return
+    if antiguedad > FACTURA_GENERACION_SEGUNDOS:
+        marca.unlink(missing_ok=True)
+    else:
+        time.sleep(0.05)
+
+
+def _escribir_factura(venta, ruta):
+    contenido = renderizar_factura(venta)
+    descriptor, temporal = tempfile.mkstemp(dir=ruta.parent, suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+
+
+def invalidar_factura(venta_id):
+    """Elimina todas las versiones cacheadas de la factura de una venta."""
+    for ruta in _directorio_facturas().glob(f'venta_{venta_id}_v*.pdf'):
+        ruta.unlink(missing_ok=True)
+
+
+def renovar_facturas(ventas):
+    """
+    Incrementa la versión de las ventas del queryset (cambia su ETag) y, al confirmar,
+    elimina sus facturas cacheadas. Para cambios que afectan a la factura sin pasar
+    por VentaUpdateView: líneas editadas en el admin o datos del cliente.
+
+    Args:
+        ventas (QuerySet): Ventas cuya factura cambió
+    """
+    venta_ids = set(ventas.values_list('pk', flat=True))
+    if not venta_ids:
+        return
+    Venta.objects.filter(pk__in=venta_ids).update(version=F('version') + 1)
+
+    def eliminar():
+        # Un solo recorrido del directorio aunque sean muchas ventas
+        for ruta in _directorio_facturas().glob('venta_*_v*.pdf'):
+            if int(ruta.name.split('_')[1]) in venta_ids:
+                ruta.unlink(missing_ok=True)
+
+    transaction.on_commit(eliminar)
+
+
+def _prerenderizar(venta_id):
+    try:
+        venta = Venta.objects.select_related('cliente', 'usuario_vendedor').get(pk=venta_id)
+        obtener_factura(venta)
+    except Exception:
+        logger.exception('No se pudo pre-generar la factura de la venta #%s', venta_id)
+    finally:
+        connection.close()
+
+
+def prerenderizar_factura(venta_id):
+    """
+    Genera la factura en un hilo aparte para que la redirección tras crear la venta
+    la encuentre lista; si llega antes de que termine, obtener_factura espera a este
+    hilo en lugar de renderizarla otra vez. Llamar después del commit (transaction.on_commit).
+    Se desactiva con FACTURAS_PRERENDER = False.
+    """
+    if not settings.FACTURAS_PRERENDER:
+        return
+    threading.Thread(target=_prerenderizar, args=(venta_id,), daemon=True).start()
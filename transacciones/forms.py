@@ -2,29 +2,58 @@
 Formularios para la app de transacciones (ventas y compras).
 """
 from django import forms
+from django.core.validators import FileExtensionValidator
 from django.forms import inlineformset_factory
-from .models import Venta, DetalleVenta, Compra, DetalleCompra
+from django.urls import reverse_lazy
+from core.widgets import AutocompletarWidget
+from inventario.forms import TipoHuevoChoiceField, TipoHuevoSelect
+from .models import Venta, DetalleVenta, Compra, DetalleCompra, ImportacionTransacciones
 
 
 class VentaForm(forms.ModelForm):
-    """Formulario para crear una venta."""
+    """
+    Formulario para crear una venta. El cliente se elige con autocompletado: el
+    formulario no carga la lista de clientes y solo recibe el id elegido.
+    """
     
     class Meta:
         model = Venta
         fields = ['cliente']
         widgets = {
-            'cliente': forms.Select(attrs={'class': 'form-control'}),
+            'cliente': AutocompletarWidget(
+                url=reverse_lazy('clientes:autocompletar'),
+                attrs={'class': 'form-control', 'placeholder': 'Buscar por nombre o cédula/NIT'},
+            ),
         }
 
 
-class DetalleVentaForm(forms.ModelForm):
-    """Formulario para los detalles de venta."""
+class DetalleForm(forms.ModelForm):
+    """
+    Base de las líneas de venta y compra. tipo_huevo ya se valida contra el catálogo
+    (TipoHuevoChoiceField), así que se excluye de la validación del modelo, que
+    consultaría su existencia una vez por línea.
+    """
+
+    def _get_validation_exclusions(self):
+        exclusiones = super()._get_validation_exclusions()
+        exclusiones.add('tipo_huevo')
+        return exclusiones
+
+
+class DetalleVentaForm(DetalleForm):
+    """
+    Formulario para los detalles de venta. Los tipos de huevo salen del catálogo
+    cacheado, compartido por todas las líneas del formset.
+    """
     
     class Meta:
         model = DetalleVenta
         fields = ['tipo_huevo', 'cantidad_cubetas', 'precio_unitario_cubeta']
+        field_classes = {
+            'tipo_huevo': TipoHuevoChoiceField,
+        }
         widgets = {
-            'tipo_huevo': forms.Select(attrs={'class': 'form-control'}),
+            'tipo_huevo': TipoHuevoSelect(attrs={'class': 'form-control'}),
             'cantidad_cubetas': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
             'precio_unitario_cubeta': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -47,13 +76,19 @@ DetalleVentaFormSet = inlineformset_factory(
 
 
 class CompraForm(forms.ModelForm):
-    """Formulario para crear una compra."""
+    """
+    Formulario para crear una compra. El proveedor se elige con autocompletado, como
+    el cliente en VentaForm.
+    """
     
     class Meta:
         model = Compra
         fields = ['proveedor', 'fecha_hora', 'medio_pago']
         widgets = {
-            'proveedor': forms.Select(attrs={'class': 'form-control'}),
+            'proveedor': AutocompletarWidget(
+                url=reverse_lazy('proveedores:autocompletar'),
+                attrs={'class': 'form-control', 'placeholder': 'Buscar por nombre o NIT'},
+            ),
             'fecha_hora': forms.DateTimeInput(attrs={
                 'class': 'form-control',
                 'type': 'datetime-local'
@@ -62,14 +97,20 @@ class CompraForm(forms.ModelForm):
         }
 
 
-class DetalleCompraForm(forms.ModelForm):
-    """Formulario para los detalles de compra."""
+class DetalleCompraForm(DetalleForm):
+    """
+    Formulario para los detalles de compra. Los tipos de huevo salen del catálogo
+    cacheado, compartido por todas las líneas del formset.
+    """
     
     class Meta:
         model = DetalleCompra
         fields = ['tipo_huevo', 'cantidad_cubetas', 'precio_unitario_cubeta']
+        field_classes = {
+            'tipo_huevo': TipoHuevoChoiceField,
+        }
         widgets = {
-            'tipo_huevo': forms.Select(attrs={'class': 'form-control'}),
+            'tipo_huevo': TipoHuevoSelect(attrs={'class': 'form-control'}),
             'cantidad_cubetas': forms.NumberInput(attrs={'class': 'form-control', 'min': '1'}),
             'precio_unitario_cubeta': forms.NumberInput(attrs={
                 'class': 'form-control',
@@ -89,3 +130,20 @@ DetalleCompraFormSet = inlineformset_factory(
     min_num=1,
     validate_min=True
 )
+
+
+class ImportacionForm(forms.ModelForm):
+    """Formulario para subir un archivo de ventas o compras históricas."""
+    archivo = forms.FileField(
+        label='Archivo',
+        validators=[FileExtensionValidator(['csv', 'xlsx'])],
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'}),
+    )
+
+    class Meta:
+        model = ImportacionTransacciones
+        fields = ['tipo', 'archivo', 'aplicar_stock']
+        widgets = {
+            'tipo': forms.Select(attrs={'class': 'form-control'}),
+            'aplicar_stock': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
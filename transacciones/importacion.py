@@ -0,0 +1,497 @@
+"""
+Importación masiva de ventas y compras históricas desde CSV o XLSX.
+
+El archivo tiene una fila por línea de detalle; las filas consecutivas con la misma
+`referencia` forman un documento (una venta o una compra). Columnas:
+
+- ventas: referencia, fecha, cliente (cédula/NIT), tipo_huevo, cantidad_cubetas,
+  precio_unitario_cubeta y vendedor (usuario; opcional, por defecto quien importa)
+- compras: referencia, fecha, proveedor (NIT), medio_pago, tipo_huevo,
+  cantidad_cubetas, precio_unitario_cubeta
+
+El archivo se lee fila por fila sin cargarlo completo. Clientes, proveedores, tipos de
+huevo y vendedores se resuelven con diccionarios cargados una sola vez, y los documentos
+válidos se guardan por lotes: bulk_create de encabezados, detalles y movimientos de caja
+y de inventario, y un único ajuste de stock, saldo y resúmenes diarios por lote. Un documento con alguna
+fila inválida se rechaza completo; sus filas se escriben en el reporte de errores con el
+motivo, en el mismo formato del archivo para corregirlas y volver a importarlas. Si a un
+lote de ventas le falta stock de algún tipo, se rechazan solo los documentos de ese tipo
+que no alcanzan a cubrirse y el resto del lote se guarda.
+
+Las importaciones subidas desde la web guardan, con cada lote, la última fila procesada
+y los contadores, y el reporte de errores parcial si el lote agregó filas rechazadas.
+Si el worker se detiene, otro la retoma desde esa fila sin duplicar los lotes ya
+guardados y continúa el reporte parcial.
+
+Las compras importadas no validan el saldo en caja (SaldoInsuficiente), a diferencia de
+las creadas desde la web: un histórico puede dejar la caja en negativo durante la carga.
+"""
+import csv
+import io
+import re
+import tempfile
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from itertools import groupby
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from clientes.models import Cliente
+from core.archivos import leer_filas, texto_celda
+from core.exports import reclamar_siguiente
+from core.models import TransaccionCaja
+from core.utils import registrar_transacciones_caja_lote, sin_auto_now_add
+from inventario.catalogo import obtener_catalogo
+from inventario.utils import reservar_stock, registrar_movimientos, movimientos_de_lineas, StockInsuficiente
+from proveedores.models import Proveedor
+from .listados import invalidar_listados
+from .models import Venta, DetalleVenta, Compra, DetalleCompra, ImportacionTransacciones
+
+# Documentos guardados por lote (una transacción por lote)
+IMPORTACION_LOTE = 1000
+
+# Filas por INSERT dentro de un lote
+IMPORTACION_BATCH_SIZE = 2000
+
+COLUMNAS = {
+    'ventas': ['referencia', 'fecha', 'cliente', 'tipo_huevo', 'cantidad_cubetas', 'precio_unitario_cubeta', 'vendedor'],
+    'compras': ['referencia', 'fecha', 'proveedor', 'medio_pago', 'tipo_huevo', 'cantidad_cubetas', 'precio_unitario_cubeta'],
+}
+COLUMNAS_OPCIONALES = {'referencia', 'vendedor'}
+
+FORMATOS_FECHA = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%d/%m/%Y %H:%M', '%d/%m/%Y')
+
+# Límite de Venta.total / Compra.total (DecimalField de 10 dígitos y 2 decimales)
+TOTAL_MAXIMO = Decimal('99999999.99')
+
+# Errores que se conservan en memoria para mostrarlos (el reporte los tiene todos)
+ERRORES_EN_RESUMEN = 20
+
+
+class ErrorFila(ValueError):
+    """Valor inválido en una fila del archivo."""
+
+
+def _clave_documento(valor):
+    """Cédula/NIT sin puntos, guiones ni espacios, para comparar sin importar el formato."""
+    return re.sub(r'[^0-9A-Z]', '', str(valor or '').upper())
+
+
+def _fecha(valor):
+    if isinstance(valor, datetime):
+        fecha = valor
+    elif isinstance(valor, date):
+        fecha = datetime(valor.year, valor.month, valor.day)
+    else:
+        texto = texto_celda(valor)
+        for formato in FORMATOS_FECHA:
+            try:
+                fecha = datetime.strptime(texto, formato)
+                break
+            except ValueError:
+                continue
+        else:
+            raise ErrorFila(f"fecha inválida '{texto}' (use AAAA-MM-DD o AAAA-MM-DD HH:MM)")
+    return timezone.make_aware(fecha) if timezone.is_naive(fecha) else fecha
+
+
+def _cantidad(valor):
+    texto = texto_celda(valor)
+    try:
+        cantidad = Decimal(texto.replace(',', '.'))
+    except InvalidOperation:
+        raise ErrorFila(f"cantidad_cubetas inválida '{texto}'")
+    if cantidad != cantidad.to_integral_value() or cantidad < 1:
+        raise ErrorFila(f"cantidad_cubetas debe ser un entero mayor que cero, no '{texto}'")
+    return int(cantidad)
+
+
+def _precio(valor):
+    texto = texto_celda(valor)
+    try:
+        precio = Decimal(texto.replace(',', '.'))
+    except InvalidOperation:
+        raise ErrorFila(f"precio_unitario_cubeta inválido '{texto}'")
+    if precio < 0 or precio > TOTAL_MAXIMO:
+        raise ErrorFila(f"precio_unitario_cubeta fuera de rango '{texto}'")
+    return precio.quantize(Decimal('0.01'))
+
+
+class Importador:
+    """
+    Importa los documentos de un archivo de ventas o compras.
+
+    Attributes:
+        documentos (int): Documentos creados (o válidos, con solo_validar)
+        lineas (int): Líneas de detalle creadas (o válidas)
+        filas_con_error (int): Filas rechazadas
+        errores (list): Primeras ERRORES_EN_RESUMEN filas rechazadas, como (fila, motivo)
+    """
+
+    def __init__(self, tipo, usuario=None, aplicar_stock=True, solo_validar=False,
+                 reporte=None, lote=IMPORTACION_LOTE, al_guardar=None):
+        """
+        Args:
+            tipo (str): 'ventas' o 'compras'
+            usuario (CustomUser, optional): Vendedor de las ventas sin columna vendedor
+            aplicar_stock (bool): Descontar (ventas) o sumar (compras) las cubetas al inventario
+            solo_validar (bool): Validar el archivo sin guardar nada
+            reporte (file, optional): Archivo de texto donde escribir las filas rechazadas (CSV)
+            lote (int): Documentos por transacción
+            al_guardar (callable, optional): Se llama dentro de la transacción de cada
+                lote guardado, con el importador, para registrar el avance
+        """
+        if tipo not in COLUMNAS:
+            raise ValueError(f"Tipo de importación desconocido: {tipo}")
+        self.tipo = tipo
+        self.usuario = usuario
+        self.aplicar_stock = aplicar_stock
+        self.solo_validar = solo_validar
+        self.lote = lote
+        self.documentos = 0
+        self.lineas = 0
+        self.filas_con_error = 0
+        self.fila_actual = 0
+        self.errores = []
+        self.al_guardar = al_guardar
+        self.reporte = None
+        if reporte is not None:
+            self.reporte = csv.writer(reporte)
+            self.reporte.writerow(['fila', *COLUMNAS[tipo], 'error'])
+        self._cargar_mapas()
+
+    @property
+    def obligatorias(self):
+        return [columna for columna in COLUMNAS[self.tipo] if columna not in COLUMNAS_OPCIONALES]
+
+    def _cargar_mapas(self):
+        """Carga en memoria los diccionarios de búsqueda (una consulta por tabla; los tipos de huevo, del catálogo)."""
+        self.tipos_huevo = {
+            tipo.tipo.strip().upper(): pk for pk, tipo in obtener_catalogo().items()
+        }
+        if self.tipo == 'ventas':
+            terceros = Cliente.objects.values_list('pk', 'cedula_nit', 'nombre')
+            self.vendedores = {
+                username.lower(): pk for pk, username in get_user_model().objects.values_list('pk', 'username')
+            }
+        else:
+            terceros = Proveedor.objects.values_list('pk', 'nit', 'nombre')
+            self.medios_pago = {clave for clave, _ in Compra.MEDIO_PAGO_CHOICES}
+
+        self.terceros = {}
+        for pk, documento, nombre in terceros.iterator(chunk_size=IMPORTACION_BATCH_SIZE):
+            clave = _clave_documento(documento)
+            # Dos terceros con el mismo documento normalizado no se pueden distinguir
+            self.terceros[clave] = None if clave in self.terceros else (pk, nombre)
+
+    def ejecutar(self, filas):
+        """
+        Valida y guarda los documentos de `filas` (ver leer_filas) lote por lote.
+
+        Returns:
+            dict: documentos, lineas y filas_con_error
+        """
+        pendientes = []
+        for _, grupo in groupby(filas, key=self._referencia):
+            documento = self._validar_documento(list(grupo))
+            if documento is None:
+                continue
+            pendientes.append(documento)
+            if len(pendientes) >= self.lote:
+                self._guardar(pendientes)
+                pendientes = []
+        if pendientes:
+            self._guardar(pendientes)
+
+        if self.documentos and not self.solo_validar:
+            invalidar_listados()
+        return {
+            'documentos': self.documentos,
+            'lineas': self.lineas,
+            'filas_con_error': self.filas_con_error,
+        }
+
+    def _referencia(self, fila):
+        numero, datos = fila
+        # Sin referencia, cada fila es un documento
+        return texto_celda(datos.get('referencia')) or f'fila-{numero}'
+
+    def _encabezado(self, datos):
+        """Datos del documento en una fila: (tercero_id, nombre, fecha, vendedor_id | medio_pago)."""
+        columna = 'cliente' if self.tipo == 'ventas' else 'proveedor'
+        documento = texto_celda(datos.get(columna))
+        if not documento:
+            raise ErrorFila(f'falta {columna}')
+        tercero = self.terceros.get(_clave_documento(documento), False)
+        if tercero is False:
+            raise ErrorFila(f"{columna} '{documento}' no existe")
+        if tercero is None:
+            raise ErrorFila(f"hay varios registros de {columna} con el documento '{documento}'")
+        fecha = _fecha(datos.get('fecha'))
+
+        if self.tipo == 'ventas':
+            username = texto_celda(datos.get('vendedor'))
+            if username:
+                extra = self.vendedores.get(username.lower())
+                if extra is None:
+                    raise ErrorFila(f"vendedor '{username}' no existe")
+            elif self.usuario is not None:
+                extra = self.usuario.pk
+            else:
+                raise ErrorFila('falta vendedor')
+        else:
+            extra = texto_celda(datos.get('medio_pago')).lower()
+            if extra not in self.medios_pago:
+                raise ErrorFila(f"medio_pago '{extra}' inválido (use {', '.join(sorted(self.medios_pago))})")
+        return (*tercero, fecha, extra)
+
+    def _linea(self, datos):
+        """Detalle de una fila: (tipo_huevo_id, cantidad_cubetas, precio_unitario_cubeta)."""
+        tipo = texto_celda(datos.get('tipo_huevo'))
+        tipo_id = self.tipos_huevo.get(tipo.upper())
+        if tipo_id is None:
+            raise ErrorFila(f"tipo_huevo '{tipo}' no existe")
+        return tipo_id, _cantidad(datos.get('cantidad_cubetas')), _precio(datos.get('precio_unitario_cubeta'))
+
+    def _validar_documento(self, filas):
+        """Valida las filas de un documento; devuelve el documento o None si se rechazó."""
+        self.fila_actual = filas[-1][0]
+        encabezado = None
+        lineas = []
+        motivos = {}
+        for numero, datos in filas:
+            try:
+                encabezado_fila = self._encabezado(datos)
+                lineas.append(self._linea(datos))
+            except ErrorFila as error:
+                motivos[numero] = str(error)
+                continue
+            if encabezado is None:
+                encabezado = encabezado_fila
+            elif encabezado_fila != encabezado:
+                motivos[numero] = 'tercero, fecha o vendedor/medio de pago distinto al de las demás filas de la referencia'
+
+        total = sum(cantidad * precio for _, cantidad, precio in lineas)
+        if not motivos and total > TOTAL_MAXIMO:
+            motivos[filas[0][0]] = f'el total del documento ({total}) supera el máximo permitido'
+        if motivos:
+            self._rechazar(filas, motivos)
+            return None
+        return {'filas': filas, 'encabezado': encabezado, 'lineas': lineas, 'total': total}
+
+    def _rechazar(self, filas, motivos, motivo_general='documento rechazado por errores en otras filas'):
+        for numero, datos in filas:
+            motivo = motivos.get(numero, motivo_general)
+            self.filas_con_error += 1
+            if len(self.errores) < ERRORES_EN_RESUMEN:
+                self.errores.append((numero, motivo))
+            if self.reporte is not None:
+                self.reporte.writerow([numero, *(texto_celda(datos.get(columna)) for columna in COLUMNAS[self.tipo]), motivo])
+
+    def _guardar(self, documentos):
+        if self.solo_validar:
+            self._contar(documentos)
+            return
+        while documentos:
+            try:
+                with transaction.atomic():
+                    self._guardar_lote(documentos)
+                    self._contar(documentos)
+                    if self.al_guardar is not None:
+                        self.al_guardar(self)
+                return
+            except StockInsuficiente as error:
+                # Se revirtió el lote: se rechaza solo lo que no cabe y se reintenta el resto
+                documentos = self._descartar_sin_stock(documentos, error)
+
+    def _descartar_sin_stock(self, documentos, error):
+        """
+        Rechaza, en el orden del archivo, los documentos que ya no caben en el stock de
+        los tipos de huevo faltantes; devuelve los demás para reintentar el lote.
+        """
+        disponibles = {tipo.pk: tipo.stock_cubetas for tipo, _ in error.faltantes}
+        nombres = {tipo.pk: tipo.tipo for tipo, _ in error.faltantes}
+        restantes = []
+        for documento in documentos:
+            pedidos = defaultdict(int)
+            for tipo_id, cantidad, _ in documento['lineas']:
+                if tipo_id in disponibles:
+                    pedidos[tipo_id] += cantidad
+            sin_stock = [pk for pk, cantidad in pedidos.items() if cantidad > disponibles[pk]]
+            if sin_stock:
+                self._rechazar(documento['filas'], {}, 'stock insuficiente: ' + ', '.join(
+                    f'{nombres[pk]} (disponible {disponibles[pk]})' for pk in sin_stock
+                ))
+                continue
+            for pk, cantidad in pedidos.items():
+                disponibles[pk] -= cantidad
+            restantes.append(documento)
+        return restantes
+
+    def _contar(self, documentos):
+        self.documentos += len(documentos)
+        self.lineas += sum(len(documento['lineas']) for documento in documentos)
+
+    def _guardar_lote(self, documentos):
+        """Encabezados, detalles, caja y stock de un lote, con un número fijo de sentencias."""
+        es_venta = self.tipo == 'ventas'
+        if es_venta:
+            encabezados = [
+                Venta(cliente_id=tercero_id, usuario_vendedor_id=vendedor_id, fecha_hora=fecha, total=documento['total'])
+                for documento in documentos
+                for tercero_id, _, fecha, vendedor_id in [documento['encabezado']]
+            ]
+            with sin_auto_now_add(Venta):
+                Venta.objects.bulk_create(encabezados, batch_size=IMPORTACION_BATCH_SIZE)
+        else:
+            encabezados = [
+                Compra(proveedor_id=tercero_id, fecha_hora=fecha, medio_pago=medio_pago, total=documento['total'])
+                for documento in documentos
+                for tercero_id, _, fecha, medio_pago in [documento['encabezado']]
+            ]
+            Compra.objects.bulk_create(encabezados, batch_size=IMPORTACION_BATCH_SIZE)
+
+        detalle_modelo, campo_fk = (DetalleVenta, 'venta_id') if es_venta else (DetalleCompra, 'compra_id')
+        detalle_modelo.objects.bulk_create([
+            detalle_modelo(**{campo_fk: encabezado.pk}, tipo_huevo_id=tipo_id,
+                           cantidad_cubetas=cantidad, precio_unitario_cubeta=precio)
+            for encabezado, documento in zip(encabezados, documentos)
+            for tipo_id, cantidad, precio in documento['lineas']
+        ], batch_size=IMPORTACION_BATCH_SIZE)
+
+        if self.aplicar_stock:
+            # Una fila del libro de inventario por línea; si falta stock la excepción
+            # revierte todo el lote
+            movimientos = movimientos_de_lineas([
+                (encabezado.pk, tipo_id, cantidad)
+                for encabezado, documento in zip(encabezados, documentos)
+                for tipo_id, cantidad, _ in documento['lineas']
+            ], 'venta' if es_venta else 'compra')
+            if es_venta:
+                reservar_stock(movimientos)
+            else:
+                registrar_movimientos(movimientos)
+
+        etiqueta = 'Venta' if es_venta else 'Compra'
+        registrar_transacciones_caja_lote([
+            TransaccionCaja(
+                tipo='ingreso' if es_venta else 'egreso',
+                monto=encabezado.total,
+                fecha_hora=encabezado.fecha_hora,
+                descripcion=(
+                    f"{etiqueta} #{encabezado.pk} - {documento['encabezado'][1]} "
+                    f"(importada, ref. {self._referencia(documento['filas'][0])})"
+                ),
+                **{campo_fk: encabezado.pk},
+            )
+            for encabezado, documento in zip(encabezados, documentos)
+        ], batch_size=IMPORTACION_BATCH_SIZE)
+
+
+def tomar_siguiente_importacion():
+    """
+    Reclama la importación pendiente (o abandonada por un worker detenido) más antigua
+    y la marca como 'procesando' (ver core.exports.reclamar_siguiente).
+
+    Returns:
+        ImportacionTransacciones | None: Importación reclamada, o None si no hay pendientes
+    """
+    return reclamar_siguiente(ImportacionTransacciones)
+
+
+def _guardar_reporte(importacion, reporte, texto):
+    """Guarda (reemplaza) el reporte de errores de la importación con lo escrito hasta ahora en `reporte`."""
+    texto.flush()
+    if importacion.reporte:
+        importacion.reporte.delete(save=False)
+    importacion.reporte.save(f'{importacion.pk}/errores.csv', File(reporte), save=False)
+    # Se sigue escribiendo al final del temporal
+    reporte.seek(0, io.SEEK_END)
+
+
+def _continuar_reporte(importacion, importador):
+    """
+    Copia al reporte del importador las filas del reporte parcial guardado hasta
+    fila_procesada (las posteriores se vuelven a procesar) y devuelve cuántas son.
+    """
+    if not importacion.reporte:
+        return 0
+    copiadas = 0
+    with importacion.reporte.open('rb') as guardado:
+        filas = csv.reader(io.TextIOWrapper(guardado, encoding='utf-8-sig', newline=''))
+        next(filas, None)
+        for fila in filas:
+            if fila and int(fila[0]) <= importacion.fila_procesada:
+                importador.reporte.writerow(fila)
+                copiadas += 1
+    return copiadas
+
+
+def _registrar_avance(importacion, reporte, texto):
+    """
+    Devuelve el callback al_guardar del Importador: guarda la última fila procesada,
+    los contadores y, si hay filas rechazadas nuevas, el reporte parcial, y renueva la
+    reclamación, en la misma transacción que el lote.
+    """
+    def registrar(importador):
+        campos = ['fila_procesada', 'documentos_creados', 'lineas_creadas', 'filas_con_error', 'reclamado']
+        if importador.filas_con_error != importacion.filas_con_error:
+            _guardar_reporte(importacion, reporte, texto)
+            campos.append('reporte')
+        importacion.fila_procesada = importador.fila_actual
+        importacion.documentos_creados = importador.documentos
+        importacion.lineas_creadas = importador.lineas
+        importacion.filas_con_error = importador.filas_con_error
+        importacion.reclamado = timezone.now()
+        importacion.save(update_fields=campos)
+    return registrar
+
+
+def procesar_importacion(importacion):
+    """
+    Importa el archivo de una importación reclamada y guarda el reporte de errores.
+    Los errores que impiden procesar el archivo quedan registrados en lugar de propagarse;
+    los lotes ya guardados se conservan. Una importación retomada sigue desde
+    fila_procesada y continúa el reporte parcial guardado con su último lote.
+    """
+    importador = None
+    try:
+        with importacion.archivo.open('rb') as archivo, tempfile.TemporaryFile() as reporte:
+            texto = io.TextIOWrapper(reporte, encoding='utf-8-sig', newline='')
+            importador = Importador(
+                importacion.tipo, importacion.usuario,
+                aplicar_stock=importacion.aplicar_stock, reporte=texto,
+                al_guardar=_registrar_avance(importacion, reporte, texto),
+            )
+            desde = importacion.fila_procesada
+            if desde:
+                # Importación retomada: conserva el avance guardado con su último lote
+                importador.documentos = importacion.documentos_creados
+                importador.lineas = importacion.lineas_creadas
+                importador.filas_con_error = _continuar_reporte(importacion, importador)
+                importacion.filas_con_error = importador.filas_con_error
+            try:
+                filas = leer_filas(archivo, importacion.archivo.name, importador.obligatorias)
+                importador.ejecutar(fila for fila in filas if fila[0] > desde)
+                importacion.estado = 'listo'
+            finally:
+                # También si falla: el reporte debe coincidir con filas_con_error
+                if importador.filas_con_error:
+                    _guardar_reporte(importacion, reporte, texto)
+                texto.detach()
+    except Exception as error:
+        importacion.estado = 'error'
+        importacion.error = str(error)
+    if importador is not None:
+        importacion.documentos_creados = importador.documentos
+        importacion.lineas_creadas = importador.lineas
+        importacion.filas_con_error = importador.filas_con_error
+    importacion.terminado = timezone.now()
+    importacion.save(update_fields=[
+        'estado', 'error', 'reporte', 'documentos_creados', 'lineas_creadas', 'filas_con_error', 'terminado',
+    ])
+    return importacion
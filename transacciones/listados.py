@@ -0,0 +1,148 @@
+"""
+Filtros y resúmenes de los listados de ventas y compras.
+
+Los listados, sus páginas y las exportaciones de un mismo filtro comparten un único
+resumen (cantidad y total) calculado con un solo aggregate y cacheado bajo la versión
+de datos de transacciones, que cambia al confirmar cualquier escritura de ventas,
+compras, clientes o proveedores.
+"""
+import hashlib
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils.functional import cached_property
+
+from clientes.models import Cliente
+from proveedores.models import Proveedor
+from core.busqueda import filtro_texto, id_buscado
+from core.utils import como_fecha, filtro_rango_fechas, get_version_cache, invalidar_version_cache
+from .models import Venta, Compra
+
+# Versión de los datos de ventas/compras; cambia con cada escritura confirmada
+TRANSACCIONES_VERSION_KEY = 'transacciones:version'
+
+# Tiempo máximo de vida de un resumen; la invalidación real ocurre al cambiar la versión
+RESUMEN_LISTADO_TIMEOUT = 60 * 60
+
+
+def filtro_transaccion(q, modelo_tercero, prefijo, *extra):
+    """
+    Búsqueda de ventas/compras: '#123' busca solo por número; '123' por número
+    (llave primaria) o por nombre del tercero; cualquier otro texto por nombre del
+    tercero (índice de búsqueda) y las condiciones extra.
+    """
+    numero = id_buscado(q)
+    if numero is not None and q.strip().startswith('#'):
+        return Q(pk=numero)
+    condicion = reduce(or_, extra, filtro_texto(modelo_tercero, q, campos=('nombre',), prefijo=prefijo))
+    if numero is not None:
+        condicion |= Q(pk=numero)
+    return condicion
+
+
+def filtrar_ventas(params):
+    """Filtra ventas según q/start_date/end_date de un dict o QueryDict."""
+    qs = Venta.objects.select_related('cliente', 'usuario_vendedor').order_by('-id')
+    q = params.get('q')
+    if q:
+        qs = qs.filter(filtro_transaccion(q, Cliente, 'cliente__', Q(usuario_vendedor__username__icontains=q)))
+    return qs.filter(**filtro_rango_fechas('fecha_hora', params.get('start_date'), params.get('end_date')))
+
+
+def filtrar_compras(params):
+    """Filtra compras según q/start_date/end_date de un dict o QueryDict."""
+    qs = Compra.objects.select_related('proveedor').order_by('-id')
+    q = params.get('q')
+    if q:
+        qs = qs.filter(filtro_transaccion(q, Proveedor, 'proveedor__'))
+    return qs.filter(**filtro_rango_fechas('fecha_hora', params.get('start_date'), params.get('end_date')))
+
+
+FILTROS_LISTADO = {
+    'ventas': filtrar_ventas,
+    'compras': filtrar_compras,
+}
+
+
+def invalidar_listados():
+    """Invalida los resúmenes de listados cuando la transacción actual se confirme."""
+    invalidar_version_cache(TRANSACCIONES_VERSION_KEY)
+
+
+def normalizar_filtros(params):
+    """
+    Reduce los parámetros de un listado a su forma canónica, de modo que filtros
+    equivalentes ('  abc ', fechas inválidas, parámetros de página) compartan resumen.
+
+    Returns:
+        dict: {'q', 'start_date', 'end_date'} con texto recortado y fechas ISO ('' si faltan)
+    """
+    start_date = como_fecha(params.get('start_date'))
+    end_date = como_fecha(params.get('end_date'))
+    return {
+        'q': (params.get('q') or '').strip(),
+        'start_date': start_date.isoformat() if start_date else '',
+        'end_date': end_date.isoformat() if end_date else '',
+    }
+
+
+def resumen_listado(tipo, params):
+    """
+    Cantidad de registros y suma de `total` del listado filtrado, en un solo aggregate
+    y cacheado por filtro normalizado y versión de datos.
+
+    Args:
+        tipo (str): 'ventas' o 'compras'
+        params (dict | QueryDict): Filtros de la petición o del trabajo de exportación
+
+    Returns:
+        dict: {'cantidad': int, 'total': Decimal}
+    """
+    filtros = normalizar_filtros(params)
+    huella = hashlib.md5(json.dumps(filtros, sort_keys=True).encode('utf-8')).hexdigest()
+    clave = f'listado:{tipo}:{get_version_cache(TRANSACCIONES_VERSION_KEY)}:{huella}'
+
+    resumen = cache.get(clave)
+    if resumen is None:
+        resumen = FILTROS_LISTADO[tipo](filtros).order_by().aggregate(
+            cantidad=Count('pk'),
+            total=Sum('total')
+        )
+        resumen['total'] = resumen['total'] or 0
+        cache.set(clave, resumen, RESUMEN_LISTADO_TIMEOUT)
+    return resumen
+
+
+class ResumenListadoMixin:
+    """
+    Mixin para los ListView de ventas y compras: toma el conteo del paginador y el
+    total filtrado del resumen cacheado en lugar de consultar la base de datos.
+    Debe ir antes de KeysetPaginationMixin.
+    """
+    tipo_listado = None
+
+    @cached_property
+    def resumen(self):
+        return resumen_listado(self.tipo_listado, self.request.GET)
+
+    def get_paginator(self, *args, **kwargs):
+        paginator = super().get_paginator(*args, **kwargs)
+        paginator.count = self.resumen['cantidad']
+        return paginator
+
+    def contar_total(self, queryset):
+        return self.resumen['cantidad']
+
+    def consultas_precargadas(self, queryset, page_size):
+        consultas = super().consultas_precargadas(queryset, page_size)
+        # El conteo sale del resumen, que además trae el total filtrado
+        consultas['total'] = lambda: self.resumen['cantidad']
+        return consultas
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['total_filtrado'] = self.resumen['total']
+        return context
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacciones', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacciones', '0002_venta_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='compra',
+            index=models.Index(fields=['fecha_hora'], name='compra_fecha_hora_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['fecha_hora'], name='venta_fecha_hora_idx'),
+        ),
+    ]
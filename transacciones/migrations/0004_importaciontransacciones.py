@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 02:59
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('transacciones', '0003_indices_fecha_hora'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacionTransacciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('ventas', 'Ventas'), ('compras', 'Compras')], max_length=10, verbose_name='Tipo')),
+                ('archivo', models.FileField(upload_to='importaciones/', verbose_name='Archivo')),
+                ('aplicar_stock', models.BooleanField(default=True, help_text='Desmarcar si el inventario actual ya refleja estas transacciones.', verbose_name='Aplicar al inventario')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('listo', 'Listo'), ('error', 'Error')], default='pendiente', max_length=12)),
+                ('documentos_creados', models.PositiveIntegerField(default=0)),
+                ('lineas_creadas', models.PositiveIntegerField(default=0)),
+                ('filas_con_error', models.PositiveIntegerField(default=0)),
+                ('reporte', models.FileField(blank=True, upload_to='importaciones/reportes/')),
+                ('error', models.TextField(blank=True)),
+                ('creado', models.DateTimeField(auto_now_add=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importaciones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importación de Transacciones',
+                'verbose_name_plural': 'Importaciones de Transacciones',
+                'ordering': ['-creado'],
+                'indexes': [models.Index(fields=['estado', 'creado'], name='transaccion_estado_a180d5_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-17 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('transacciones', '0004_importaciontransacciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importaciontransacciones',
+            name='fila_procesada',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='importaciontransacciones',
+            name='reclamado',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
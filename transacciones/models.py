@@ -1,11 +1,83 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from clientes.models import Cliente
 from proveedores.models import Proveedor
 from inventario.models import TipoHuevo
 
 
-class Venta(models.Model):
+class EliminacionAgregadaQuerySet(models.QuerySet):
+    """
+    QuerySet cuyo delete() revierte primero el efecto de las filas en inventario y caja
+    con consultas agregadas (una por tipo de efecto, no una por fila) y luego las
+    elimina, todo en una transacción. Las filas se bloquean para que dos eliminaciones
+    concurrentes del mismo documento no lo reviertan dos veces.
+    """
+
+    def revertir(self, ids):
+        """Revierte el efecto de las filas `ids` antes de eliminarlas."""
+        raise NotImplementedError
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            ids = list(self.select_for_update().order_by('pk').values_list('pk', flat=True))
+            if not ids:
+                return 0, {}
+            self.revertir(ids)
+            # El manager base usa el QuerySet de Django: elimina sin volver a revertir
+            return self.model._base_manager.using(self.db).filter(pk__in=ids).delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
+
+
+class EliminacionAgregadaMixin:
+    """Hace que instancia.delete() pase por EliminacionAgregadaQuerySet.delete()."""
+
+    def delete(self, using=None, keep_parents=False):
+        resultado = type(self).objects.using(using or self._state.db).filter(pk=self.pk).delete()
+        self.pk = None
+        return resultado
+
+    delete.alters_data = True
+
+
+class VentaQuerySet(EliminacionAgregadaQuerySet):
+    def revertir(self, ids):
+        from .facturas import invalidar_factura
+        from .listados import invalidar_listados
+        from .utils import revertir_ventas
+        revertir_ventas(ids)
+        invalidar_listados()
+
+        def invalidar_facturas():
+            for venta_id in ids:
+                invalidar_factura(venta_id)
+
+        # Descartar las facturas cacheadas cuando la eliminación se confirme
+        transaction.on_commit(invalidar_facturas, using=self.db)
+
+
+class DetalleVentaQuerySet(EliminacionAgregadaQuerySet):
+    def revertir(self, ids):
+        from .utils import revertir_detalles_venta
+        revertir_detalles_venta(ids)
+
+
+class CompraQuerySet(EliminacionAgregadaQuerySet):
+    def revertir(self, ids):
+        from .listados import invalidar_listados
+        from .utils import revertir_compras
+        revertir_compras(ids)
+        invalidar_listados()
+
+
+class DetalleCompraQuerySet(EliminacionAgregadaQuerySet):
+    def revertir(self, ids):
+        from .utils import revertir_detalles_compra
+        revertir_detalles_compra(ids)
+
+
+class Venta(EliminacionAgregadaMixin, models.Model):
     """
     Modelo para registrar las ventas realizadas.
     """
@@ -28,17 +100,24 @@ class Venta(models.Model):
         default=0,
         verbose_name='Total'
     )
+    # Se incrementa al editar la venta; identifica la factura PDF cacheada
+    version = models.PositiveIntegerField(default=1, editable=False)
+
+    objects = VentaQuerySet.as_manager()
 
     class Meta:
         ordering = ['-fecha_hora']
         verbose_name = 'Venta'
         verbose_name_plural = 'Ventas'
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='venta_fecha_hora_idx'),
+        ]
 
     def __str__(self):
         return f"Venta #{self.id} - {self.cliente.nombre} - ${self.total}"
 
 
-class DetalleVenta(models.Model):
+class DetalleVenta(EliminacionAgregadaMixin, models.Model):
     """
     Modelo para los detalles de cada venta (líneas de venta).
     """
@@ -60,6 +139,8 @@ class DetalleVenta(models.Model):
         verbose_name='Precio Unitario'
     )
 
+    objects = DetalleVentaQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Detalle de Venta'
         verbose_name_plural = 'Detalles de Venta'
@@ -73,7 +154,7 @@ class DetalleVenta(models.Model):
         return self.cantidad_cubetas * self.precio_unitario_cubeta
 
 
-class Compra(models.Model):
+class Compra(EliminacionAgregadaMixin, models.Model):
     """
     Modelo para registrar las compras realizadas a proveedores.
     """
@@ -101,16 +182,21 @@ class Compra(models.Model):
         verbose_name='Total'
     )
 
+    objects = CompraQuerySet.as_manager()
+
     class Meta:
         ordering = ['-fecha_hora']
         verbose_name = 'Compra'
         verbose_name_plural = 'Compras'
+        indexes = [
+            models.Index(fields=['fecha_hora'], name='compra_fecha_hora_idx'),
+        ]
 
     def __str__(self):
         return f"Compra #{self.id} - {self.proveedor.nombre} - ${self.total}"
 
 
-class DetalleCompra(models.Model):
+class DetalleCompra(EliminacionAgregadaMixin, models.Model):
     """
     Modelo para los detalles de cada compra (líneas de compra).
     """
@@ -132,6 +218,8 @@ class DetalleCompra(models.Model):
         verbose_name='Precio Unitario'
     )
 
+    objects = DetalleCompraQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Detalle de Compra'
         verbose_name_plural = 'Detalles de Compra'
@@ -144,3 +232,57 @@ class DetalleCompra(models.Model):
         """Calcula el subtotal de esta línea de detalle."""
         return self.cantidad_cubetas * self.precio_unitario_cubeta
 
+
+
+class ImportacionTransacciones(models.Model):
+    """
+    Archivo CSV/XLSX de ventas o compras históricas subido para importarse en segundo plano.
+    El worker `procesar_exportaciones` lo procesa con transacciones.importacion.
+    """
+    TIPO_CHOICES = [
+        ('ventas', 'Ventas'),
+        ('compras', 'Compras'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('listo', 'Listo'),
+        ('error', 'Error'),
+    ]
+
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='importaciones'
+    )
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES, verbose_name='Tipo')
+    archivo = models.FileField(upload_to='importaciones/', verbose_name='Archivo')
+    aplicar_stock = models.BooleanField(
+        default=True,
+        verbose_name='Aplicar al inventario',
+        help_text='Desmarcar si el inventario actual ya refleja estas transacciones.'
+    )
+    estado = models.CharField(max_length=12, choices=ESTADO_CHOICES, default='pendiente')
+    documentos_creados = models.PositiveIntegerField(default=0)
+    lineas_creadas = models.PositiveIntegerField(default=0)
+    filas_con_error = models.PositiveIntegerField(default=0)
+    # CSV con las filas rechazadas y el motivo, listo para corregir y volver a importar
+    reporte = models.FileField(upload_to='importaciones/reportes/', blank=True)
+    error = models.TextField(blank=True)
+    creado = models.DateTimeField(auto_now_add=True)
+    # Reclamación del worker, renovada con cada lote (ver core.exports.reclamar_siguiente)
+    reclamado = models.DateTimeField(null=True, blank=True)
+    # Última fila del archivo ya procesada; una importación retomada sigue desde aquí
+    fila_procesada = models.PositiveIntegerField(default=0)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-creado']
+        verbose_name = 'Importación de Transacciones'
+        verbose_name_plural = 'Importaciones de Transacciones'
+        indexes = [
+            models.Index(fields=['estado', 'creado']),
+        ]
+
+    def __str__(self):
+        return f"Importación de {self.get_tipo_display().lower()} #{self.id} - {self.get_estado_display()}"
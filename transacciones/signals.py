@@ -1,56 +1,46 @@
 """
-Señales para manejar la integridad de datos cuando se eliminan o modifican transacciones.
-Restaura stock y ajusta movimientos de caja automáticamente.
+Señales de la app de transacciones.
+
+La reversión de stock y caja al eliminar ventas, compras o sus líneas no se hace con
+señales por fila: la hacen los QuerySet de esos modelos con consultas agregadas
+(ver EliminacionAgregadaQuerySet en models.py), tanto para queryset.delete() como
+para instancia.delete().
 """
 
-from django.db.models.signals import pre_delete, post_delete
+from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
-from django.db import transaction as db_transaction
-
-from .models import Venta, DetalleVenta, Compra, DetalleCompra
-from core.models import TransaccionCaja
-
-
-@receiver(pre_delete, sender=DetalleVenta)
-def restaurar_stock_detalle_venta(sender, instance, **kwargs):
-    """
-    Restaura el stock cuando se elimina un detalle de venta.
-    Esto ocurre al editar una venta y eliminar líneas, o al borrar la venta completa.
-    """
-    if instance.pk:  # Solo si el detalle ya existe en BD
-        tipo_huevo = instance.tipo_huevo
-        tipo_huevo.stock_cubetas += instance.cantidad_cubetas
-        tipo_huevo.save(update_fields=['stock_cubetas'])
 
+from .models import Venta, Compra
+from clientes.models import Cliente
+from proveedores.models import Proveedor
+from .facturas import renovar_facturas
+from .listados import invalidar_listados
 
-@receiver(post_delete, sender=Venta)
-def ajustar_caja_venta_eliminada(sender, instance, **kwargs):
-    """
-    Elimina la transacción de caja asociada cuando se elimina una venta.
-    El pre_delete de DetalleVenta ya restauró el stock.
-    """
-    # Eliminar el ingreso de caja asociado a esta venta
-    TransaccionCaja.objects.filter(venta_id=instance.id).delete()
+# Datos del cliente impresos en la factura (transacciones/factura_pdf.html)
+CAMPOS_CLIENTE_FACTURA = ['nombre', 'cedula_nit', 'direccion', 'telefono', 'email']
 
 
-@receiver(pre_delete, sender=DetalleCompra)
-def restaurar_stock_detalle_compra(sender, instance, **kwargs):
+@receiver(post_save, sender=Venta)
+@receiver(post_save, sender=Compra)
+@receiver(post_save, sender=Cliente)
+@receiver(post_save, sender=Proveedor)
+def invalidar_resumenes_listados(sender, **kwargs):
     """
-    Resta el stock cuando se elimina un detalle de compra.
-    (Revertir la adición de stock que se hizo al crear la compra)
+    Invalida los resúmenes cacheados de los listados de ventas y compras al confirmar
+    cambios en ellas o en los nombres de clientes/proveedores por los que se busca.
+    Las eliminaciones de ventas y compras los invalidan desde su QuerySet.
     """
-    if instance.pk:  # Solo si el detalle ya existe en BD
-        tipo_huevo = instance.tipo_huevo
-        # Al eliminar una compra, RESTAMOS el stock que se había agregado
-        tipo_huevo.stock_cubetas -= instance.cantidad_cubetas
-        tipo_huevo.save(update_fields=['stock_cubetas'])
+    invalidar_listados()
 
 
-@receiver(post_delete, sender=Compra)
-def ajustar_caja_compra_eliminada(sender, instance, **kwargs):
-    """
-    Elimina la transacción de caja asociada cuando se elimina una compra.
-    El pre_delete de DetalleCompra ya ajustó el stock.
-    """
-    # Eliminar el egreso de caja asociado a esta compra
-    TransaccionCaja.objects.filter(compra_id=instance.id).delete()
+@receiver(pre_save, sender=Cliente)
+def renovar_facturas_cliente(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Renueva las facturas de las ventas del cliente cuando cambian los datos que aparecen en ellas."""
+    if raw or instance.pk is None:
+        return
+    if update_fields is not None and not set(update_fields) & set(CAMPOS_CLIENTE_FACTURA):
+        return
+    anterior = Cliente.objects.filter(pk=instance.pk).values(*CAMPOS_CLIENTE_FACTURA).first()
+    if anterior is None or all(anterior[campo] == getattr(instance, campo) for campo in CAMPOS_CLIENTE_FACTURA):
+        return
+    renovar_facturas(Venta.objects.filter(cliente_id=instance.pk))
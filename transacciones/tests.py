@@ -1,3 +1,547 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import os
+import tempfile
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from clientes.models import Cliente
+from core.archivos import leer_filas
+from core.models import CustomUser, SaldoCaja, CajaResumenDiario
+from core.utils import SALDO_CAJA_PK, recalcular_saldo, registrar_transaccion_caja
+from inventario.models import TipoHuevo
+from inventario.utils import registrar_movimientos, movimientos_de_lineas, StockInsuficiente
+from proveedores.models import Proveedor
+from .facturas import FACTURA_GENERACION_SEGUNDOS, obtener_factura, renderizar_factura, ruta_factura
+from .importacion import Importador, procesar_importacion
+from .listados import resumen_listado
+from .models import Venta, DetalleVenta, Compra, DetalleCompra, ImportacionTransacciones
+from .utils import crear_venta, crear_compra
+
+# Caché en memoria: las versiones de caché no deben pasar de una prueba a otra
+CACHE_PRUEBAS = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+def linea(tipo, cantidad, precio=Decimal('10000')):
+    """cleaned_data de una línea de venta o compra."""
+    return {'tipo_huevo': tipo, 'cantidad_cubetas': cantidad, 'precio_unitario_cubeta': precio}
+
+
+@override_settings(CACHES=CACHE_PRUEBAS, CONSULTAS_PARALELAS=False)
+class TransaccionesTestCase(TestCase):
+    """Un vendedor, un cliente, un proveedor, dos tipos de huevo con stock y capital en caja."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = CustomUser.objects.create_user('vendedor', password='clave-de-prueba')
+        cls.cliente = Cliente.objects.create(
+            nombre='Tienda La Esquina', cedula_nit='1010', direccion='Calle 1', telefono='3000000000', email='cliente@ejemplo.com'
+        )
+        cls.proveedor = Proveedor.objects.create(
+            nombre='Granja El Roble', nit='9001', direccion='Vereda 2', telefono='3100000000', email='granja@ejemplo.com'
+        )
+        cls.tipo_a = TipoHuevo.objects.create(tipo='A', precio_cubeta=Decimal('10000'))
+        cls.tipo_aa = TipoHuevo.objects.create(tipo='AA', precio_cubeta=Decimal('12000'))
+        registrar_movimientos(movimientos_de_lineas([(None, cls.tipo_a.pk, 50), (None, cls.tipo_aa.pk, 50)], 'ajuste'))
+        registrar_transaccion_caja(Decimal('1000000'), 'ingreso', descripcion='Capital inicial')
+
+    def setUp(self):
+        cache.clear()
+
+    def vender(self, *lineas):
+        return crear_venta(Venta(cliente=self.cliente, usuario_vendedor=self.usuario), list(lineas))
+
+    def comprar(self, *lineas):
+        return crear_compra(Compra(proveedor=self.proveedor, fecha_hora=timezone.now(), medio_pago='efectivo'), list(lineas))
+
+    def stock(self, tipo):
+        return TipoHuevo.objects.get(pk=tipo.pk).stock_cubetas
+
+    def saldo(self):
+        return SaldoCaja.objects.get(pk=SALDO_CAJA_PK).saldo
+
+    def consultas(self, funcion, *args):
+        with CaptureQueriesContext(connection) as contexto:
+            funcion(*args)
+        return len(contexto)
+
+
+class CrearVentaCompraTests(TransaccionesTestCase):
+
+    def test_venta_sin_stock_suficiente_no_cambia_nada(self):
+        with self.assertRaises(StockInsuficiente):
+            self.vender(linea(self.tipo_a, 10), linea(self.tipo_aa, 51))
+
+        self.assertEqual(self.stock(self.tipo_a), 50)
+        self.assertEqual(self.stock(self.tipo_aa), 50)
+        self.assertFalse(Venta.objects.exists())
+        self.assertEqual(self.saldo(), Decimal('1000000'))
+
+    def test_saldo_persistido_coincide_con_el_libro(self):
+        self.vender(linea(self.tipo_a, 5), linea(self.tipo_aa, 3, Decimal('12500')))
+        self.comprar(linea(self.tipo_a, 20, Decimal('8000')))
+        self.vender(linea(self.tipo_a, 1))
+        self.comprar(linea(self.tipo_aa, 4, Decimal('9000')), linea(self.tipo_a, 2, Decimal('8000')))
+
+        esperado = Decimal('1000000') + 50000 + 37500 - 160000 + 10000 - 36000 - 16000
+        self.assertEqual(self.saldo(), esperado)
+        self.assertEqual(self.saldo(), recalcular_saldo())
+        self.assertEqual(self.stock(self.tipo_a), 50 - 5 + 20 - 1 + 2)
+        self.assertEqual(self.stock(self.tipo_aa), 50 - 3 + 4)
+
+    def test_consultas_de_venta_no_dependen_de_las_lineas(self):
+        una = self.consultas(self.vender, linea(self.tipo_a, 1))
+        lineas = [linea(tipo, 1) for tipo in (self.tipo_a, self.tipo_aa) * 10]
+        with self.assertNumQueries(una):
+            self.vender(*lineas)
+
+    def test_consultas_de_compra_no_dependen_de_las_lineas(self):
+        una = self.consultas(self.comprar, linea(self.tipo_a, 1))
+        lineas = [linea(tipo, 1) for tipo in (self.tipo_a, self.tipo_aa) * 10]
+        with self.assertNumQueries(una):
+            self.comprar(*lineas)
+
+
+class EliminacionTests(TransaccionesTestCase):
+    """Eliminar ventas y compras devuelve stock, saldo y resumen diario al estado previo."""
+
+    def estado(self):
+        resumen = CajaResumenDiario.objects.get(fecha=timezone.localdate())
+        return {
+            'stock': dict(TipoHuevo.objects.values_list('tipo', 'stock_cubetas')),
+            'saldo': self.saldo(),
+            'ingresos': resumen.ingresos,
+            'egresos': resumen.egresos,
+        }
+
+    def documentos(self, cantidad=2):
+        ventas = [self.vender(linea(self.tipo_a, 2), linea(self.tipo_aa, 1)) for _ in range(cantidad)]
+        compras = [self.comprar(linea(self.tipo_a, 3, Decimal('7000'))) for _ in range(cantidad)]
+        return ventas, compras
+
+    def test_eliminar_instancias(self):
+        antes = self.estado()
+        ventas, compras = self.documentos()
+        for documento in ventas + compras:
+            documento.delete()
+
+        self.assertEqual(self.estado(), antes)
+        self.assertEqual(self.saldo(), recalcular_saldo())
+
+    def test_eliminar_queryset(self):
+        antes = self.estado()
+        ventas, compras = self.documentos()
+        Venta.objects.filter(pk__in=[venta.pk for venta in ventas]).delete()
+        Compra.objects.filter(pk__in=[compra.pk for compra in compras]).delete()
+
+        self.assertEqual(self.estado(), antes)
+        self.assertFalse(DetalleVenta.objects.exists())
+        self.assertFalse(DetalleCompra.objects.exists())
+        self.assertEqual(self.saldo(), recalcular_saldo())
+
+    def test_eliminar_desde_la_accion_del_admin(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-de-prueba')
+        self.client.force_login(admin)
+        antes = self.estado()
+        ventas, compras = self.documentos()
+
+        for url, documentos in (('/admin/transacciones/venta/', ventas), ('/admin/transacciones/compra/', compras)):
+            respuesta = self.client.post(url, {
+                'action': 'delete_selected',
+                '_selected_action': [documento.pk for documento in documentos],
+                'post': 'yes',
+            })
+            self.assertEqual(respuesta.status_code, 302)
+
+        self.assertFalse(Venta.objects.exists())
+        self.assertFalse(Compra.objects.exists())
+        self.assertEqual(self.estado(), antes)
+        self.assertEqual(self.saldo(), recalcular_saldo())
+
+    def test_consultas_de_eliminacion_no_dependen_de_los_documentos(self):
+        ventas, compras = self.documentos(6)
+        for modelo, documentos in ((Venta, ventas), (Compra, compras)):
+            with self.subTest(modelo=modelo.__name__):
+                una = self.consultas(modelo.objects.filter(pk=documentos[0].pk).delete)
+                with self.assertNumQueries(una):
+                    modelo.objects.filter(pk__in=[documento.pk for documento in documentos[1:]]).delete()
+
+
+class FacturaTests(TransaccionesTestCase):
+    """Caché en disco de las facturas PDF: una generación por versión, ETag/304 e invalidación."""
+
+    def setUp(self):
+        super().setUp()
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = self.settings(FACTURAS_CACHE_DIR=directorio.name, FACTURAS_PRERENDER=False)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+        self.directorio = Path(directorio.name)
+        self.client.force_login(self.usuario)
+        self.venta = self.vender(linea(self.tipo_a, 2))
+
+    def renders(self):
+        return mock.patch('transacciones.facturas.renderizar_factura', wraps=renderizar_factura)
+
+    def pdf(self, venta=None, **cabeceras):
+        return self.client.get(f'/transacciones/ventas/{(venta or self.venta).pk}/pdf/', **cabeceras)
+
+    def test_factura_se_genera_una_vez_y_responde_304(self):
+        with self.renders() as render:
+            primera = self.pdf()
+            segunda = self.pdf()
+            no_modificada = self.pdf(HTTP_IF_NONE_MATCH=primera['ETag'])
+
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(b''.join(primera.streaming_content), b''.join(segunda.streaming_content))
+        self.assertEqual(segunda['ETag'], primera['ETag'])
+        self.assertEqual(no_modificada.status_code, 304)
+        self.assertEqual(no_modificada['ETag'], primera['ETag'])
+
+    def test_espera_a_la_generacion_en_curso(self):
+        ruta = ruta_factura(self.venta.pk, self.venta.version)
+        marca = ruta.with_suffix('.generando')
+        marca.touch()
+
+        def terminar():
+            ruta.write_bytes(b'%PDF generada por otra peticion')
+            marca.unlink()
+
+        hilo = threading.Timer(0.2, terminar)
+        hilo.start()
+        self.addCleanup(hilo.join)
+        with self.renders() as render:
+            self.assertEqual(obtener_factura(self.venta), ruta)
+        self.assertEqual(render.call_count, 0)
+        self.assertEqual(ruta.read_bytes(), b'%PDF generada por otra peticion')
+
+    def test_marca_abandonada_no_bloquea_la_factura(self):
+        marca = ruta_factura(self.venta.pk, self.venta.version).with_suffix('.generando')
+        marca.touch()
+        antigua = time.time() - FACTURA_GENERACION_SEGUNDOS - 1
+        os.utime(marca, (antigua, antigua))
+
+        with self.renders() as render:
+            obtener_factura(self.venta)
+        self.assertEqual(render.call_count, 1)
+        self.assertFalse(marca.exists())
+
+    def test_editar_lineas_en_el_admin_renueva_la_factura(self):
+        admin = CustomUser.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-de-prueba')
+        etag = self.pdf()['ETag']
+        detalle = self.venta.detalles.get()
+        self.client.force_login(admin)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post(f'/admin/transacciones/venta/{self.venta.pk}/change/', {
+                'cliente': self.cliente.pk,
+                'usuario_vendedor': self.usuario.pk,
+                'total': '20000',
+                'detalles-TOTAL_FORMS': '1',
+                'detalles-INITIAL_FORMS': '1',
+                'detalles-MIN_NUM_FORMS': '0',
+                'detalles-MAX_NUM_FORMS': '1000',
+                'detalles-0-id': detalle.pk,
+                'detalles-0-venta': self.venta.pk,
+                'detalles-0-tipo_huevo': self.tipo_a.pk,
+                'detalles-0-cantidad_cubetas': '3',
+                'detalles-0-precio_unitario_cubeta': '10000',
+            })
+        self.assertEqual(respuesta.status_code, 302)
+
+        self.assertEqual(Venta.objects.get(pk=self.venta.pk).version, self.venta.version + 1)
+        self.assertEqual(list(self.directorio.glob('*.pdf')), [])
+        self.assertNotEqual(self.pdf(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_cambiar_datos_del_cliente_renueva_sus_facturas(self):
+        otra = self.vender(linea(self.tipo_aa, 1))
+        self.pdf()
+        self.pdf(otra)
+
+        self.cliente.telefono = '3000000000'
+        self.cliente.save()
+        self.assertEqual(Venta.objects.get(pk=self.venta.pk).version, self.venta.version)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.nombre = 'Tienda La Nueva Esquina'
+            self.cliente.save()
+
+        self.assertEqual(
+            set(Venta.objects.values_list('pk', 'version')),
+            {(self.venta.pk, self.venta.version + 1), (otra.pk, otra.version + 1)},
+        )
+        self.assertEqual(list(self.directorio.glob('*.pdf')), [])
+
+
+class AdminListadosTests(TransaccionesTestCase):
+    """Changelists y formularios del admin de ventas y compras con un número fijo de consultas."""
+
+    def setUp(self):
+        super().setUp()
+        self.admin = CustomUser.objects.create_superuser('admin', 'admin@ejemplo.com', 'clave-de-prueba')
+        self.client.force_login(self.admin)
+
+    def documentos(self, cantidad):
+        for _ in range(cantidad):
+            self.vender(linea(self.tipo_a, 1), linea(self.tipo_aa, 2))
+            self.comprar(linea(self.tipo_a, 3))
+
+    def assertConsultasFijas(self, url, crear):
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        crear()
+        with self.assertNumQueries(len(pocas)):
+            self.client.get(url)
+
+    def test_changelists_no_dependen_de_las_filas(self):
+        self.documentos(1)
+        for url in ['/admin/transacciones/venta/', '/admin/transacciones/compra/', '/admin/core/transaccioncaja/']:
+            with self.subTest(url=url):
+                self.assertConsultasFijas(url, lambda: self.documentos(8))
+
+    def test_columnas_de_lineas_y_cubetas(self):
+        venta = self.vender(linea(self.tipo_a, 1), linea(self.tipo_aa, 2), linea(self.tipo_a, 4))
+        respuesta = self.client.get('/admin/transacciones/venta/', {'q': f'#{venta.pk}'})
+
+        fila = respuesta.context['cl'].result_list.get()
+        self.assertEqual((fila.num_lineas, fila.num_cubetas), (3, 7))
+        self.assertEqual(respuesta.context['cl'].result_count, 1)
+
+    def test_formulario_no_depende_de_las_lineas(self):
+        venta = self.vender(linea(self.tipo_a, 1))
+        url = f'/admin/transacciones/venta/{venta.pk}/change/'
+
+        def agregar_lineas():
+            DetalleVenta.objects.bulk_create([
+                DetalleVenta(venta=venta, tipo_huevo=self.tipo_aa, cantidad_cubetas=1, precio_unitario_cubeta=Decimal('1'))
+                for _ in range(10)
+            ])
+
+        self.assertConsultasFijas(url, agregar_lineas)
+
+
+class ResumenListadoTests(TransaccionesTestCase):
+    """Resumen cacheado (cantidad y total) de los listados, invalidado al confirmar escrituras."""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.vender(linea(self.tipo_a, 2))
+            self.vender(linea(self.tipo_aa, 1, Decimal('12000')))
+
+    def test_un_aggregate_cacheado_por_filtro_normalizado(self):
+        with self.assertNumQueries(1):
+            resumen = resumen_listado('ventas', {'q': 'Esquina', 'start_date': 'no-es-fecha'})
+        self.assertEqual(resumen, {'cantidad': 2, 'total': Decimal('32000')})
+
+        with self.assertNumQueries(0):
+            self.assertEqual(resumen_listado('ventas', {'q': '  Esquina ', 'page': '3'}), resumen)
+        self.assertEqual(resumen_listado('ventas', {'q': 'no-existe'}), {'cantidad': 0, 'total': 0})
+        self.assertEqual(resumen_listado('compras', {}), {'cantidad': 0, 'total': 0})
+
+    def test_escrituras_confirmadas_invalidan_el_resumen(self):
+        self.assertEqual(resumen_listado('ventas', {})['cantidad'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            venta = self.vender(linea(self.tipo_a, 1))
+        self.assertEqual(resumen_listado('ventas', {}), {'cantidad': 3, 'total': Decimal('42000')})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Venta.objects.filter(pk=venta.pk).delete()
+        self.assertEqual(resumen_listado('ventas', {})['cantidad'], 2)
+
+        # Renombrar al cliente cambia lo que encuentra la búsqueda
+        self.assertEqual(resumen_listado('ventas', {'q': 'Bodega'})['cantidad'], 0)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.nombre = 'Bodega Central'
+            self.cliente.save()
+        self.assertEqual(resumen_listado('ventas', {'q': 'Bodega'})['cantidad'], 2)
+
+
+class ListadoVentasTests(TransaccionesTestCase):
+    """Listado asíncrono de ventas con las consultas en serie (CONSULTAS_PARALELAS = False)."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+
+    def test_contexto_del_listado(self):
+        ventas = [self.vender(linea(self.tipo_a, 1)) for _ in range(12)]
+        respuesta = self.client.get('/transacciones/ventas/')
+
+        self.assertEqual(respuesta.status_code, 200)
+        contexto = respuesta.context
+        self.assertEqual([venta.pk for venta in contexto['ventas']], [venta.pk for venta in ventas[::-1][:10]])
+        self.assertEqual(contexto['paginator'].count, 12)
+        self.assertEqual(contexto['total_filtrado'], Decimal('120000'))
+
+        segunda = self.client.get('/transacciones/ventas/?page=2').context
+        self.assertEqual([venta.pk for venta in segunda['ventas']], [ventas[1].pk, ventas[0].pk])
+
+    def test_consultas_del_listado_no_dependen_de_las_ventas(self):
+        self.vender(linea(self.tipo_a, 1))
+        with CaptureQueriesContext(connection) as pocas:
+            self.client.get('/transacciones/ventas/?q=Esquina')
+        for _ in range(15):
+            self.vender(linea(self.tipo_a, 1))
+        with self.assertNumQueries(len(pocas)):
+            self.client.get('/transacciones/ventas/?q=Tienda')
+
+
+def archivo_ventas(*filas, separador=','):
+    """CSV de ventas para importar, con encabezado."""
+    encabezado = ['referencia', 'fecha', 'cliente', 'tipo_huevo', 'cantidad_cubetas', 'precio_unitario_cubeta']
+    return '\n'.join(separador.join(fila) for fila in [encabezado, *filas]).encode('utf-8')
+
+
+class ImportacionTests(TransaccionesTestCase):
+    """Importación por lotes: lectura del archivo, rechazo por stock y reanudación."""
+
+    def importar(self, contenido, **opciones):
+        reporte = io.StringIO()
+        importador = Importador('ventas', self.usuario, reporte=reporte, **opciones)
+        importador.ejecutar(leer_filas(io.BytesIO(contenido), 'ventas.csv', importador.obligatorias))
+        return importador, list(csv.reader(io.StringIO(reporte.getvalue())))[1:]
+
+    def test_lectura_del_archivo(self):
+        contenido = archivo_ventas(
+            ['V1', '15/03/2024', '1.010', 'a', '2', '10000,50'],
+            ['V1', '15/03/2024', '1010', 'AA', '1', '12000'],
+            ['V2', '2024-03-16 08:30', '1010', 'A', '1', '10000'],
+            ['V2', '2024-13-01', '1010', 'A', '1', '10000'],
+            ['', '', '', '', '', ''],
+            ['', '2024-03-17', '99', 'A', '1,5', '10000'],
+            separador=';',
+        )
+        filas = list(leer_filas(io.BytesIO(contenido), 'ventas.csv'))
+        self.assertEqual([numero for numero, _ in filas], [2, 3, 4, 5, 7])
+        self.assertEqual(filas[0][1]['precio_unitario_cubeta'], '10000,50')
+
+        importador, rechazadas = self.importar(contenido, solo_validar=True)
+
+        self.assertEqual((importador.documentos, importador.lineas, importador.filas_con_error), (1, 2, 3))
+        self.assertEqual([(fila[0], fila[-1]) for fila in rechazadas], [
+            ('4', 'documento rechazado por errores en otras filas'),
+            ('5', "fecha inválida '2024-13-01' (use AAAA-MM-DD o AAAA-MM-DD HH:MM)"),
+            ('7', "cliente '99' no existe"),
+        ])
+        self.assertFalse(Venta.objects.exists())
+
+        with self.assertRaises(ValueError):
+            list(leer_filas(io.BytesIO(b'referencia,fecha\nV1,2024-03-15\n'), 'ventas.csv', importador.obligatorias))
+
+    def test_lote_sin_stock_rechaza_solo_lo_que_no_cabe(self):
+        importador, rechazadas = self.importar(archivo_ventas(
+            ['V1', '2024-03-15', '1010', 'A', '30', '10000'],
+            ['V2', '2024-03-15', '1010', 'A', '30', '10000'],
+            ['V3', '2024-03-15', '1010', 'AA', '5', '12000'],
+            ['V4', '2024-03-15', '1010', 'A', '20', '10000'],
+        ))
+
+        self.assertEqual((importador.documentos, importador.filas_con_error), (3, 1))
+        self.assertEqual(rechazadas, [['3', 'V2', '2024-03-15', '1010', 'A', '30', '10000', '', 'stock insuficiente: A (disponible 20)']])
+        self.assertEqual(Venta.objects.count(), 3)
+        self.assertEqual((self.stock(self.tipo_a), self.stock(self.tipo_aa)), (0, 45))
+        self.assertEqual(self.saldo(), Decimal('1000000') + Decimal('560000'))
+
+    def test_importacion_retomada_continua_el_reporte(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        configuracion = self.settings(MEDIA_ROOT=directorio.name)
+        configuracion.enable()
+        self.addCleanup(configuracion.disable)
+
+        importacion = ImportacionTransacciones(usuario=self.usuario, tipo='ventas')
+        importacion.archivo.save('ventas.csv', ContentFile(archivo_ventas(
+            ['V1', '2024-03-15', '1010', 'A', '2', '10000'],
+            ['V2', '2024-03-15', '99', 'A', '1', '10000'],
+            ['V3', '2024-03-16', '1010', 'AA', '3', '12000'],
+            ['V4', '2024-03-16', '98', 'A', '1', '10000'],
+        )))
+        # Un worker anterior guardó V1 y V2 (fila 3) y se detuvo durante el lote siguiente,
+        # cuyo reporte parcial (fila 5) quedó en el almacenamiento sin confirmarse
+        self.vender(linea(self.tipo_a, 2))
+        importacion.reporte.save(f'{importacion.pk}/errores.csv', ContentFile(
+            'fila,referencia,fecha,cliente,tipo_huevo,cantidad_cubetas,precio_unitario_cubeta,vendedor,error\r\n'
+            "3,V2,2024-03-15,99,A,1,10000,,cliente '99' no existe\r\n"
+            "5,V4,2024-03-16,98,A,1,10000,,cliente '98' no existe\r\n"
+        ), save=False)
+        importacion.fila_procesada = 3
+        importacion.documentos_creados = importacion.lineas_creadas = 1
+        importacion.filas_con_error = 2
+        importacion.estado = 'procesando'
+        importacion.save()
+
+        procesar_importacion(importacion)
+
+        importacion.refresh_from_db()
+        self.assertEqual(importacion.estado, 'listo', importacion.error)
+        self.assertEqual((importacion.fila_procesada, importacion.documentos_creados, importacion.filas_con_error), (5, 2, 2))
+        self.assertEqual(Venta.objects.count(), 2)
+        self.assertEqual((self.stock(self.tipo_a), self.stock(self.tipo_aa)), (48, 47))
+        with importacion.reporte.open('rb') as reporte:
+            filas = list(csv.reader(io.TextIOWrapper(reporte, encoding='utf-8-sig', newline='')))[1:]
+        self.assertEqual([(fila[0], fila[3]) for fila in filas], [('3', '99'), ('5', '98')])
+        self.assertEqual(len(filas), importacion.filas_con_error)
+        self.assertEqual(os.listdir(Path(directorio.name, 'importaciones', 'reportes', str(importacion.pk))), ['errores.csv'])
+
+
+class ExportacionListadosTests(TransaccionesTestCase):
+    """Exportaciones CSV (en streaming) y XLSX del listado filtrado."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.usuario)
+        self.ventas = [self.vender(linea(self.tipo_a, cantidad)) for cantidad in (1, 2, 3)]
+
+    def filas_csv(self, contenido):
+        return list(csv.reader(io.StringIO(contenido.decode('utf-8'))))
+
+    def test_csv_en_streaming_con_y_sin_gzip(self):
+        respuesta = self.client.get('/transacciones/ventas/export/csv/')
+
+        self.assertTrue(respuesta.streaming)
+        self.assertNotIn('Content-Encoding', respuesta)
+        filas = self.filas_csv(b''.join(respuesta.streaming_content))
+        self.assertEqual(filas[0], ['ID', 'Cliente', 'Vendedor', 'Fecha', 'Total'])
+        self.assertEqual(
+            sorted((fila[0], fila[1], fila[2], fila[4]) for fila in filas[1:]),
+            sorted((str(venta.pk), 'Tienda La Esquina', 'vendedor', f'{venta.total:.2f}') for venta in self.ventas),
+        )
+
+        comprimida = self.client.get('/transacciones/ventas/export/csv/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', comprimida['Vary'])
+        self.assertEqual(self.filas_csv(gzip.decompress(b''.join(comprimida.streaming_content))), filas)
+
+    def test_xlsx_con_las_filas_filtradas(self):
+        compra = self.comprar(linea(self.tipo_aa, 4, Decimal('8000')))
+        respuesta = self.client.get('/transacciones/compras/export/xlsx/')
+
+        self.assertEqual(respuesta['Content-Type'], 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+        self.assertIn('filename="compras.xlsx"', respuesta['Content-Disposition'])
+        contenido = b''.join(respuesta.streaming_content)
+        self.assertEqual(int(respuesta['Content-Length']), len(contenido))
+        hoja = load_workbook(io.BytesIO(contenido), read_only=True)['Compras']
+        self.assertEqual(list(hoja.iter_rows(values_only=True)), [
+            ('ID', 'Proveedor', 'Fecha', 'Medio de Pago', 'Total'),
+            (compra.pk, 'Granja El Roble', timezone.localtime(compra.fecha_hora).strftime('%Y-%m-%d %H:%M'), 'Efectivo', 32000),
+        ])
+
+        respuesta = self.client.get('/transacciones/ventas/export/xlsx/', {'q': 'no-existe'})
+        hoja = load_workbook(io.BytesIO(b''.join(respuesta.streaming_content)), read_only=True)['Ventas']
+        self.assertEqual(list(hoja.iter_rows(values_only=True)), [('ID', 'Cliente', 'Vendedor', 'Fecha', 'Total')])
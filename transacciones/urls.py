@@ -8,6 +8,7 @@ from .views import (
     VentaCSVExportView, CompraCSVExportView,
     VentaXLSXExportView, CompraXLSXExportView,
     VentaPDFExportView, CompraPDFExportView,
+    ImportacionCreateView, ImportacionDetailView, ImportacionReporteView,
     generar_factura_pdf
 )
 
@@ -32,4 +33,9 @@ urlpatterns = [
     path('compras/<int:pk>/', CompraDetailView.as_view(), name='compra_detail'),
     path('compras/crear/', CompraCreateView.as_view(), name='compra_create'),
     path('compras/<int:pk>/editar/', CompraUpdateView.as_view(), name='compra_update'),
+
+    # Importación masiva
+    path('importaciones/nueva/', ImportacionCreateView.as_view(), name='importacion_create'),
+    path('importaciones/<int:pk>/', ImportacionDetailView.as_view(), name='importacion_detail'),
+    path('importaciones/<int:pk>/reporte/', ImportacionReporteView.as_view(), name='importacion_reporte'),
 ]
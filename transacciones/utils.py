@@ -0,0 +1,175 @@
+"""
+Funciones de utilidad para persistir ventas y compras con un número fijo de consultas.
+"""
+from django.db import transaction
+
+from .models import DetalleVenta, DetalleCompra
+from core.models import TransaccionCaja
+from core.utils import registrar_transaccion_caja, get_saldo_actual, eliminar_transacciones_caja, SaldoInsuficiente
+from inventario.utils import reservar_stock, registrar_movimientos, movimientos_de_lineas
+
+
+def lineas_formset(formset):
+    """
+    Devuelve los cleaned_data de las líneas válidas de un formset ya validado
+    (excluye formularios vacíos y marcados para eliminar).
+    """
+    return [
+        detalle_form.cleaned_data
+        for detalle_form in formset
+        if detalle_form.cleaned_data and not detalle_form.cleaned_data.get('DELETE')
+    ]
+
+
+def _total_lineas(lineas):
+    """Total monetario de las líneas."""
+    return sum(linea['cantidad_cubetas'] * linea['precio_unitario_cubeta'] for linea in lineas)
+
+
+def _movimientos_detalles(detalles, campo_documento, motivo):
+    """Movimientos de inventario (uno por línea) de detalles guardados o por eliminar."""
+    return movimientos_de_lineas(
+        [(getattr(detalle, campo_documento), detalle.tipo_huevo_id, detalle.cantidad_cubetas) for detalle in detalles],
+        motivo,
+    )
+
+
+def crear_venta(venta, lineas):
+    """
+    Guarda una venta con sus detalles, descuenta stock (una salida en el libro de
+    inventario por línea) y registra el ingreso en caja.
+
+    Args:
+        venta (Venta): Venta sin guardar, con cliente y vendedor asignados
+        lineas (list): cleaned_data de cada línea (tipo_huevo, cantidad_cubetas, precio_unitario_cubeta)
+
+    Returns:
+        Venta: La venta guardada
+
+    Raises:
+        StockInsuficiente: Si algún tipo de huevo no tiene stock suficiente
+    """
+    total = _total_lineas(lineas)
+
+    with transaction.atomic():
+        venta.total = total
+        venta.save()
+
+        detalles = DetalleVenta.objects.bulk_create([
+            DetalleVenta(
+                venta=venta,
+                tipo_huevo=linea['tipo_huevo'],
+                cantidad_cubetas=linea['cantidad_cubetas'],
+                precio_unitario_cubeta=linea['precio_unitario_cubeta'],
+            )
+            for linea in lineas
+        ])
+
+        # Si falta stock la excepción revierte la venta y sus detalles
+        reservar_stock(_movimientos_detalles(detalles, 'venta_id', 'venta'))
+
+        registrar_transaccion_caja(
+            monto=total,
+            tipo='ingreso',
+            venta_id=venta.id,
+            descripcion=f"Venta #{venta.id} - {venta.cliente.nombre}"
+        )
+    return venta
+
+
+def crear_compra(compra, lineas):
+    """
+    Guarda una compra con sus detalles, suma stock (una entrada en el libro de
+    inventario por línea) y registra el egreso en caja.
+    El saldo se valida con la fila de saldo bloqueada hasta el commit.
+
+    Args:
+        compra (Compra): Compra sin guardar, con proveedor, fecha y medio de pago asignados
+        lineas (list): cleaned_data de cada línea (tipo_huevo, cantidad_cubetas, precio_unitario_cubeta)
+
+    Returns:
+        Compra: La compra guardada
+
+    Raises:
+        SaldoInsuficiente: Si el total supera el saldo en caja
+    """
+    total = _total_lineas(lineas)
+
+    with transaction.atomic():
+        saldo_actual = get_saldo_actual(bloquear=True)
+        if total > saldo_actual:
+            raise SaldoInsuficiente(saldo_actual, total)
+
+        compra.total = total
+        compra.save()
+
+        detalles = DetalleCompra.objects.bulk_create([
+            DetalleCompra(
+                compra=compra,
+                tipo_huevo=linea['tipo_huevo'],
+                cantidad_cubetas=linea['cantidad_cubetas'],
+                precio_unitario_cubeta=linea['precio_unitario_cubeta'],
+            )
+            for linea in lineas
+        ])
+
+        registrar_movimientos(_movimientos_detalles(detalles, 'compra_id', 'compra'))
+
+        registrar_transaccion_caja(
+            monto=total,
+            tipo='egreso',
+            compra_id=compra.id,
+            descripcion=f"Compra #{compra.id} - {compra.proveedor.nombre}"
+        )
+    return compra
+
+
+def _lineas(detalles, campo_documento):
+    """(documento_id, tipo_huevo_id, cantidad_cubetas) de cada línea, en una sola consulta."""
+    return detalles.order_by().values_list(campo_documento, 'tipo_huevo_id', 'cantidad_cubetas')
+
+
+def revertir_ventas(venta_ids):
+    """
+    Revierte el efecto de ventas que se van a eliminar: devuelve sus cubetas al
+    inventario (un UPDATE para todos los tipos y una entrada en el libro por línea)
+    y elimina sus ingresos de caja (ver eliminar_transacciones_caja). El número de
+    consultas no depende de cuántas ventas o líneas sean. Debe llamarse dentro de la
+    transacción que las elimina.
+
+    Args:
+        venta_ids (list): Ids de las ventas
+    """
+    registrar_movimientos(movimientos_de_lineas(
+        _lineas(DetalleVenta.objects.filter(venta_id__in=venta_ids), 'venta_id'), 'reversion_venta'
+    ))
+    eliminar_transacciones_caja(TransaccionCaja.objects.filter(venta_id__in=venta_ids))
+
+
+def revertir_compras(compra_ids):
+    """
+    Revierte el efecto de compras que se van a eliminar: resta del inventario las
+    cubetas compradas y elimina sus egresos de caja, con consultas agregadas como
+    revertir_ventas.
+
+    Args:
+        compra_ids (list): Ids de las compras
+    """
+    registrar_movimientos(movimientos_de_lineas(
+        _lineas(DetalleCompra.objects.filter(compra_id__in=compra_ids), 'compra_id'), 'reversion_compra'
+    ))
+    eliminar_transacciones_caja(TransaccionCaja.objects.filter(compra_id__in=compra_ids))
+
+
+def revertir_detalles_venta(detalle_ids):
+    """Devuelve al inventario las cubetas de líneas de venta que se van a eliminar."""
+    registrar_movimientos(movimientos_de_lineas(
+        _lineas(DetalleVenta.objects.filter(pk__in=detalle_ids), 'venta_id'), 'reversion_venta'
+    ))
+
+
+def revertir_detalles_compra(detalle_ids):
+    """Resta del inventario las cubetas de líneas de compra que se van a eliminar."""
+    registrar_movimientos(movimientos_de_lineas(
+        _lineas(DetalleCompra.objects.filter(pk__in=detalle_ids), 'compra_id'), 'reversion_compra'
+    ))
@@ -1,73 +1,56 @@
-import csv
-import io
 import json
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, View
-from django.db.models import Q, Sum
+from django.db.models import F
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib import messages
 from django.db import transaction
-from django.http import HttpResponse
+from django.http import HttpResponseNotModified, FileResponse, Http404, JsonResponse
 from django.template.loader import render_to_string
 from weasyprint import HTML
 import tempfile
 from django.utils import timezone
-from openpyxl import Workbook
 
-from .models import Venta, DetalleVenta, Compra, DetalleCompra
+from .models import Venta, Compra, ImportacionTransacciones
 from .forms import (
     VentaForm, DetalleVentaFormSet,
-    CompraForm, DetalleCompraFormSet
+    CompraForm, DetalleCompraFormSet,
+    ImportacionForm
 )
-from core.utils import registrar_transaccion_caja, get_saldo_actual
+from .utils import crear_venta, crear_compra, lineas_formset
+from .listados import filtrar_ventas, filtrar_compras, resumen_listado, ResumenListadoMixin
+from .importacion import COLUMNAS, COLUMNAS_OPCIONALES
+from .facturas import obtener_factura, etag_factura, invalidar_factura, prerenderizar_factura
+from core.utils import get_saldo_actual, SaldoInsuficiente
+from core.pagination import KeysetPaginationMixin
+from core.concurrencia import AsyncLoginRequiredMixin, ListadoAsincronoMixin
+from core.exports import (
+    streaming_csv_response, xlsx_response, formatear_fecha_local,
+    ColumnaExport, EXPORT_CHUNK_SIZE, encolar_exportacion
+)
+from inventario.utils import StockInsuficiente
 
 
 # Helpers to reuse filtering logic for list and export views
 def filter_ventas_qs(request):
-    qs = Venta.objects.select_related('cliente', 'usuario_vendedor').order_by('-id')
-    q = request.GET.get('q')
-    if q:
-        qs = qs.filter(
-            Q(id__icontains=q) |
-            Q(cliente__nombre__icontains=q) |
-            Q(usuario_vendedor__username__icontains=q)
-        )
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    if start_date:
-        qs = qs.filter(fecha_hora__date__gte=start_date)
-    if end_date:
-        qs = qs.filter(fecha_hora__date__lte=end_date)
-    return qs
+    return filtrar_ventas(request.GET)
 
 
 def filter_compras_qs(request):
-    qs = Compra.objects.select_related('proveedor').order_by('-id')
-    q = request.GET.get('q')
-    if q:
-        qs = qs.filter(
-            Q(id__icontains=q) |
-            Q(proveedor__nombre__icontains=q)
-        )
-    start_date = request.GET.get('start_date')
-    end_date = request.GET.get('end_date')
-    if start_date:
-        qs = qs.filter(fecha_hora__date__gte=start_date)
-    if end_date:
-        qs = qs.filter(fecha_hora__date__lte=end_date)
-    return qs
+    return filtrar_compras(request.GET)
 
 
 # ==================== VENTAS ====================
 
-class VentaListView(LoginRequiredMixin, ListView):
+class VentaListView(AsyncLoginRequiredMixin, ResumenListadoMixin, KeysetPaginationMixin, ListadoAsincronoMixin, ListView):
     """Vista para listar todas las ventas."""
     model = Venta
     template_name = 'transacciones/venta_list.html'
     context_object_name = 'ventas'
     paginate_by = 10
+    tipo_listado = 'ventas'
     login_url = 'core:login'
 
     def get_queryset(self):
@@ -78,12 +61,7 @@ class VentaListView(LoginRequiredMixin, ListView):
         context['q'] = self.request.GET.get('q', '')
         context['start_date'] = self.request.GET.get('start_date', '')
         context['end_date'] = self.request.GET.get('end_date', '')
-        # Totals of filtered queryset (without pagination)
-        filtered_qs = filter_ventas_qs(self.request)
-        context['total_filtrado'] = filtered_qs.aggregate(total=Sum('total'))['total'] or 0
-        params = self.request.GET.copy()
-        params.pop('page', None)
-        context['export_querystring'] = params.urlencode()
+        context['export_querystring'] = context['cursor_querystring']
         return context
 
 
@@ -106,72 +84,48 @@ class VentaCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy('transacciones:ventas_list')
     login_url = 'core:login'
 
+    def get_formset(self):
+        if self.request.POST:
+            return DetalleVentaFormSet(self.request.POST)
+        return DetalleVentaFormSet()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['formset'] = DetalleVentaFormSet(self.request.POST)
-        else:
-            context['formset'] = DetalleVentaFormSet()
+        if context.get('formset') is None:
+            context['formset'] = self.get_formset()
         return context
 
+    def form_invalid(self, form, formset=None):
+        return self.render_to_response(self.get_context_data(form=form, formset=formset))
+
     def form_valid(self, form):
-        context = self.get_context_data()
-        formset = context['formset']
+        formset = self.get_formset()
 
         if not formset.is_valid():
-            return self.form_invalid(form)
+            return self.form_invalid(form, formset)
+
+        venta = form.save(commit=False)
+        venta.usuario_vendedor = self.request.user
+
+        try:
+            self.object = crear_venta(venta, lineas_formset(formset))
+        except StockInsuficiente as error:
+            for tipo_huevo, cantidad in error.faltantes:
+                messages.error(
+                    self.request,
+                    f"Stock insuficiente para {tipo_huevo.tipo}. "
+                    f"Disponible: {tipo_huevo.stock_cubetas} cubetas."
+                )
+            return self.form_invalid(form, formset)
 
-        with transaction.atomic():
-            # Guardar la venta
-            self.object = form.save(commit=False)
-            self.object.usuario_vendedor = self.request.user
-            self.object.save()
+        messages.success(self.request, f"Venta #{self.object.id} creada exitosamente.")
 
-            # Procesar detalles
-            formset.instance = self.object
-            total = 0
-
-            for detalle_form in formset:
-                if detalle_form.cleaned_data and not detalle_form.cleaned_data.get('DELETE'):
-                    detalle = detalle_form.save(commit=False)
-                    
-                    # Validar stock disponible
-                    if detalle.cantidad_cubetas > detalle.tipo_huevo.stock_cubetas:
-                        messages.error(
-                            self.request,
-                            f"Stock insuficiente para {detalle.tipo_huevo.tipo}. "
-                            f"Disponible: {detalle.tipo_huevo.stock_cubetas} cubetas."
-                        )
-                        transaction.set_rollback(True)
-                        return self.form_invalid(form)
-
-                    # Restar del stock
-                    detalle.tipo_huevo.stock_cubetas -= detalle.cantidad_cubetas
-                    detalle.tipo_huevo.save()
-
-                    # Guardar detalle
-                    detalle.venta = self.object
-                    detalle.save()
-
-                    # Acumular total
-                    total += detalle.subtotal
-
-            # Actualizar total de la venta
-            self.object.total = total
-            self.object.save()
-
-            # Registrar ingreso en caja
-            registrar_transaccion_caja(
-                monto=total,
-                tipo='ingreso',
-                venta_id=self.object.id,
-                descripcion=f"Venta #{self.object.id} - {self.object.cliente.nombre}"
-            )
+        # crear_venta ya confirmó; on_commit se ejecuta de inmediato fuera de un atomic
+        venta_id = self.object.id
+        transaction.on_commit(lambda: prerenderizar_factura(venta_id))
 
-            messages.success(self.request, f"Venta #{self.object.id} creada exitosamente.")
-            
-            # Redirigir a la página de generación de PDF
-            return redirect('transacciones:venta_pdf', pk=self.object.id)
+        # Redirigir a la página de generación de PDF
+        return redirect('transacciones:venta_pdf', pk=self.object.id)
 
 
 class VentaUpdateView(LoginRequiredMixin, UpdateView):
@@ -182,43 +136,53 @@ class VentaUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('transacciones:ventas_list')
     login_url = 'core:login'
 
+    def get_formset(self):
+        if self.request.POST:
+            return DetalleVentaFormSet(self.request.POST, instance=self.object)
+        return DetalleVentaFormSet(instance=self.object)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['formset'] = DetalleVentaFormSet(self.request.POST, instance=self.object)
-        else:
-            context['formset'] = DetalleVentaFormSet(instance=self.object)
+        if context.get('formset') is None:
+            context['formset'] = self.get_formset()
         return context
 
+    def form_invalid(self, form, formset=None):
+        return self.render_to_response(self.get_context_data(form=form, formset=formset))
+
     def form_valid(self, form):
-        context = self.get_context_data()
-        formset = context['formset']
+        formset = self.get_formset()
 
         if not formset.is_valid():
-            return self.form_invalid(form)
+            return self.form_invalid(form, formset)
 
         with transaction.atomic():
             self.object = form.save()
             formset.instance = self.object
             formset.save()
 
-            # Recalcular total
+            # Recalcular total y nueva versión (invalida la factura cacheada)
             total = sum(detalle.subtotal for detalle in self.object.detalles.all())
             self.object.total = total
+            self.object.version = F('version') + 1
             self.object.save()
 
+            venta_id = self.object.id
+            transaction.on_commit(lambda: invalidar_factura(venta_id))
+
             messages.success(self.request, f"Venta #{self.object.id} actualizada exitosamente.")
             return redirect(self.success_url)
 
 
 # ==================== COMPRAS ====================
 
-class CompraListView(LoginRequiredMixin, ListView):
+class CompraListView(AsyncLoginRequiredMixin, ResumenListadoMixin, KeysetPaginationMixin, ListadoAsincronoMixin, ListView):
     """Vista para listar todas las compras."""
     model = Compra
     template_name = 'transacciones/compra_list.html'
     context_object_name = 'compras'
     paginate_by = 10
+    tipo_listado = 'compras'
     login_url = 'core:login'
 
     def get_queryset(self):
@@ -229,11 +193,7 @@ class CompraListView(LoginRequiredMixin, ListView):
         context['q'] = self.request.GET.get('q', '')
         context['start_date'] = self.request.GET.get('start_date', '')
         context['end_date'] = self.request.GET.get('end_date', '')
-        filtered_qs = filter_compras_qs(self.request)
-        context['total_filtrado'] = filtered_qs.aggregate(total=Sum('total'))['total'] or 0
-        params = self.request.GET.copy()
-        params.pop('page', None)
-        context['export_querystring'] = params.urlencode()
+        context['export_querystring'] = context['cursor_querystring']
         return context
 
 
@@ -256,73 +216,39 @@ class CompraCreateView(LoginRequiredMixin, CreateView):
     success_url = reverse_lazy('transacciones:compras_list')
     login_url = 'core:login'
 
+    def get_formset(self):
+        if self.request.POST:
+            return DetalleCompraFormSet(self.request.POST)
+        return DetalleCompraFormSet()
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['formset'] = DetalleCompraFormSet(self.request.POST)
-        else:
-            context['formset'] = DetalleCompraFormSet()
+        if context.get('formset') is None:
+            context['formset'] = self.get_formset()
         context['saldo_actual'] = get_saldo_actual()
         return context
 
+    def form_invalid(self, form, formset=None):
+        return self.render_to_response(self.get_context_data(form=form, formset=formset))
+
     def form_valid(self, form):
-        context = self.get_context_data()
-        formset = context['formset']
+        formset = self.get_formset()
 
         if not formset.is_valid():
-            return self.form_invalid(form)
-
-        # Calcular total de la compra
-        total = 0
-        detalles_data = []
-        for detalle_form in formset:
-            if detalle_form.cleaned_data and not detalle_form.cleaned_data.get('DELETE'):
-                cantidad = detalle_form.cleaned_data['cantidad_cubetas']
-                precio = detalle_form.cleaned_data['precio_unitario_cubeta']
-                total += cantidad * precio
-                detalles_data.append(detalle_form.cleaned_data)
-
-        # Validar saldo en caja
-        saldo_actual = get_saldo_actual()
-        if total > saldo_actual:
+            return self.form_invalid(form, formset)
+
+        try:
+            self.object = crear_compra(form.save(commit=False), lineas_formset(formset))
+        except SaldoInsuficiente as error:
             messages.error(
                 self.request,
-                f"Saldo en caja insuficiente. Saldo actual: ${saldo_actual:.2f}, "
-                f"Total de compra: ${total:.2f}"
+                f"Saldo en caja insuficiente. Saldo actual: ${error.saldo:.2f}, "
+                f"Total de compra: ${error.monto:.2f}"
             )
-            return self.form_invalid(form)
+            return self.form_invalid(form, formset)
 
-        with transaction.atomic():
-            # Guardar la compra
-            self.object = form.save(commit=False)
-            self.object.total = total
-            self.object.save()
-
-            # Procesar detalles
-            for detalle_data in detalles_data:
-                detalle = DetalleCompra(
-                    compra=self.object,
-                    tipo_huevo=detalle_data['tipo_huevo'],
-                    cantidad_cubetas=detalle_data['cantidad_cubetas'],
-                    precio_unitario_cubeta=detalle_data['precio_unitario_cubeta']
-                )
-                
-                # Aumentar el stock
-                detalle.tipo_huevo.stock_cubetas += detalle.cantidad_cubetas
-                detalle.tipo_huevo.save()
-                
-                detalle.save()
-
-            # Registrar egreso en caja
-            registrar_transaccion_caja(
-                monto=total,
-                tipo='egreso',
-                compra_id=self.object.id,
-                descripcion=f"Compra #{self.object.id} - {self.object.proveedor.nombre}"
-            )
-
-            messages.success(self.request, f"Compra #{self.object.id} creada exitosamente.")
-            return redirect(self.success_url)
+        messages.success(self.request, f"Compra #{self.object.id} creada exitosamente.")
+        return redirect(self.success_url)
 
 
 class CompraUpdateView(LoginRequiredMixin, UpdateView):
@@ -333,21 +259,26 @@ class CompraUpdateView(LoginRequiredMixin, UpdateView):
     success_url = reverse_lazy('transacciones:compras_list')
     login_url = 'core:login'
 
+    def get_formset(self):
+        if self.request.POST:
+            return DetalleCompraFormSet(self.request.POST, instance=self.object)
+        return DetalleCompraFormSet(instance=self.object)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        if self.request.POST:
-            context['formset'] = DetalleCompraFormSet(self.request.POST, instance=self.object)
-        else:
-            context['formset'] = DetalleCompraFormSet(instance=self.object)
+        if context.get('formset') is None:
+            context['formset'] = self.get_formset()
         context['saldo_actual'] = get_saldo_actual()
         return context
 
+    def form_invalid(self, form, formset=None):
+        return self.render_to_response(self.get_context_data(form=form, formset=formset))
+
     def form_valid(self, form):
-        context = self.get_context_data()
-        formset = context['formset']
+        formset = self.get_formset()
 
         if not formset.is_valid():
-            return self.form_invalid(form)
+            return self.form_invalid(form, formset)
 
         with transaction.atomic():
             self.object = form.save()
@@ -367,25 +298,25 @@ class CompraUpdateView(LoginRequiredMixin, UpdateView):
 
 def generar_factura_pdf(request, pk):
     """
-    Genera una factura en PDF para una venta específica.
+    Sirve la factura en PDF de una venta específica.
+    El PDF se genera una sola vez por versión de la venta y se guarda en disco;
+    los navegadores pueden revalidarlo con If-None-Match (ETag).
     """
-    venta = get_object_or_404(Venta, pk=pk)
-    
-    # Renderizar el template HTML
-    html_string = render_to_string('transacciones/factura_pdf.html', {
-        'venta': venta,
-        'detalles': venta.detalles.all(),
-    })
+    venta = get_object_or_404(Venta.objects.select_related('cliente', 'usuario_vendedor'), pk=pk)
 
-    # Generar PDF con WeasyPrint
-    html = HTML(string=html_string)
-    result = html.write_pdf()
+    etag = etag_factura(venta.pk, venta.version)
+    if etag in request.META.get('HTTP_IF_NONE_MATCH', ''):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
 
-    # Crear respuesta HTTP
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'inline; filename=factura_venta_{venta.id}.pdf'
-    response.write(result)
+    ruta = obtener_factura(venta)
 
+    # FileResponse agrega Content-Length a partir del archivo
+    response = FileResponse(open(ruta, 'rb'), content_type='application/pdf')
+    response['Content-Disposition'] = f'inline; filename=factura_venta_{venta.id}.pdf'
+    response['ETag'] = etag
+    response['Cache-Control'] = 'private, no-cache'
     return response
 
 
@@ -395,152 +326,197 @@ class VentaCSVExportView(LoginRequiredMixin, View):
     login_url = 'core:login'
 
     def get(self, request, *args, **kwargs):
-        qs = filter_ventas_qs(request)
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=ventas.csv'
-
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Cliente', 'Vendedor', 'Fecha', 'Total'])
-        for venta in qs:
-            fecha_local = timezone.localtime(venta.fecha_hora)
-            writer.writerow([
-                venta.id,
-                venta.cliente.nombre,
-                venta.usuario_vendedor.username,
-                fecha_local.strftime('%Y-%m-%d %H:%M'),
-                f'{venta.total:.2f}',
-            ])
+        qs = filter_ventas_qs(request).values_list(
+            'id', 'cliente__nombre', 'usuario_vendedor__username', 'fecha_hora', 'total'
+        )
+        formatear_fecha = formatear_fecha_local()
 
-        return response
+        filas = (
+            [venta_id, cliente, vendedor, formatear_fecha(fecha_hora), f'{total:.2f}']
+            for venta_id, cliente, vendedor, fecha_hora, total in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return streaming_csv_response(
+            request, 'ventas.csv', ['ID', 'Cliente', 'Vendedor', 'Fecha', 'Total'], filas
+        )
 
 
 class CompraCSVExportView(LoginRequiredMixin, View):
     login_url = 'core:login'
 
     def get(self, request, *args, **kwargs):
-        qs = filter_compras_qs(request)
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename=compras.csv'
-
-        writer = csv.writer(response)
-        writer.writerow(['ID', 'Proveedor', 'Fecha', 'Medio de Pago', 'Total'])
-        for compra in qs:
-            fecha_local = timezone.localtime(compra.fecha_hora)
-            writer.writerow([
-                compra.id,
-                compra.proveedor.nombre,
-                fecha_local.strftime('%Y-%m-%d %H:%M'),
-                compra.get_medio_pago_display(),
-                f'{compra.total:.2f}',
-            ])
+        qs = filter_compras_qs(request).values_list(
+            'id', 'proveedor__nombre', 'fecha_hora', 'medio_pago', 'total'
+        )
+        formatear_fecha = formatear_fecha_local()
+        medios_pago = dict(Compra.MEDIO_PAGO_CHOICES)
 
-        return response
+        filas = (
+            [compra_id, proveedor, formatear_fecha(fecha_hora), medios_pago.get(medio_pago, medio_pago), f'{total:.2f}']
+            for compra_id, proveedor, fecha_hora, medio_pago, total in qs.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        return streaming_csv_response(
+            request, 'compras.csv', ['ID', 'Proveedor', 'Fecha', 'Medio de Pago', 'Total'], filas
+        )
 
 
 class VentaXLSXExportView(LoginRequiredMixin, View):
     login_url = 'core:login'
 
     def get(self, request, *args, **kwargs):
-        qs = filter_ventas_qs(request)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Ventas'
-        ws.append(['ID', 'Cliente', 'Vendedor', 'Fecha', 'Total'])
-
-        for venta in qs:
-            fecha_local = timezone.localtime(venta.fecha_hora)
-            ws.append([
-                venta.id,
-                venta.cliente.nombre,
-                venta.usuario_vendedor.username,
-                fecha_local.strftime('%Y-%m-%d %H:%M'),
-                float(venta.total),
-            ])
-
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename=ventas.xlsx'
-        return response
+        columnas = [
+            ColumnaExport('ID', 'id'),
+            ColumnaExport('Cliente', 'cliente__nombre'),
+            ColumnaExport('Vendedor', 'usuario_vendedor__username'),
+            ColumnaExport('Fecha', 'fecha_hora', formatear_fecha_local()),
+            ColumnaExport('Total', 'total', float),
+        ]
+        return xlsx_response(filter_ventas_qs(request), columnas, 'ventas.xlsx', 'Ventas')
 
 
 class CompraXLSXExportView(LoginRequiredMixin, View):
     login_url = 'core:login'
 
     def get(self, request, *args, **kwargs):
-        qs = filter_compras_qs(request)
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Compras'
-        ws.append(['ID', 'Proveedor', 'Fecha', 'Medio de Pago', 'Total'])
-
-        for compra in qs:
-            fecha_local = timezone.localtime(compra.fecha_hora)
-            ws.append([
-                compra.id,
-                compra.proveedor.nombre,
-                fecha_local.strftime('%Y-%m-%d %H:%M'),
-                compra.get_medio_pago_display(),
-                float(compra.total),
-            ])
-
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-
-        response = HttpResponse(
-            buffer.getvalue(),
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        response['Content-Disposition'] = 'attachment; filename=compras.xlsx'
-        return response
+        medios_pago = dict(Compra.MEDIO_PAGO_CHOICES)
+        columnas = [
+            ColumnaExport('ID', 'id'),
+            ColumnaExport('Proveedor', 'proveedor__nombre'),
+            ColumnaExport('Fecha', 'fecha_hora', formatear_fecha_local()),
+            ColumnaExport('Medio de Pago', 'medio_pago', lambda valor: medios_pago.get(valor, valor)),
+            ColumnaExport('Total', 'total', float),
+        ]
+        return xlsx_response(filter_compras_qs(request), columnas, 'compras.xlsx', 'Compras')
+
+
+def render_ventas_pdf(params, destino):
+    """
+    Escribe en `destino` el PDF del listado de ventas filtrado. Lo ejecuta el worker de exportaciones.
+
+    Returns:
+        str: Nombre del archivo
+    """
+    qs = filtrar_ventas(params)
+    total_filtrado = resumen_listado('ventas', params)['total']
+
+    html_string = render_to_string('transacciones/venta_list_pdf.html', {
+        'ventas': qs,
+        'total_filtrado': total_filtrado,
+        'generated_at': timezone.localtime(),
+    })
+    HTML(string=html_string).write_pdf(destino)
+    return 'ventas.pdf'
+
+
+def render_compras_pdf(params, destino):
+    """
+    Escribe en `destino` el PDF del listado de compras filtrado. Lo ejecuta el worker de exportaciones.
+
+    Returns:
+        str: Nombre del archivo
+    """
+    qs = filtrar_compras(params)
+    total_filtrado = resumen_listado('compras', params)['total']
+
+    html_string = render_to_string('transacciones/compra_list_pdf.html', {
+        'compras': qs,
+        'total_filtrado': total_filtrado,
+        'generated_at': timezone.localtime(),
+    })
+    HTML(string=html_string).write_pdf(destino)
+    return 'compras.pdf'
 
 
 class VentaPDFExportView(LoginRequiredMixin, View):
+    """Encola el PDF del listado de ventas y redirige a la página de estado."""
     login_url = 'core:login'
 
     def get(self, request, *args, **kwargs):
-        qs = filter_ventas_qs(request)
-        total_filtrado = qs.aggregate(total=Sum('total'))['total'] or 0
+        trabajo = encolar_exportacion(request.user, 'ventas_pdf', request.GET)
+        return redirect('core:exportacion_detail', pk=trabajo.pk)
+
 
-        html_string = render_to_string('transacciones/venta_list_pdf.html', {
-            'ventas': qs,
-            'total_filtrado': total_filtrado,
-            'generated_at': timezone.localtime(),
-        })
+class CompraPDFExportView(LoginRequiredMixin, View):
+    """Encola el PDF del listado de compras y redirige a la página de estado."""
+    login_url = 'core:login'
 
-        pdf_file = HTML(string=html_string).write_pdf()
+    def get(self, request, *args, **kwargs):
+        trabajo = encolar_exportacion(request.user, 'compras_pdf', request.GET)
+        return redirect('core:exportacion_detail', pk=trabajo.pk)
 
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename=ventas.pdf'
-        return response
 
+# ==================== IMPORTACIÓN MASIVA ====================
 
-class CompraPDFExportView(LoginRequiredMixin, View):
+class ImportacionCreateView(LoginRequiredMixin, CreateView):
+    """
+    Sube un archivo CSV/XLSX de ventas o compras históricas. La importación la procesa
+    el worker `procesar_exportaciones`; se redirige a la página de estado.
+    """
+    model = ImportacionTransacciones
+    form_class = ImportacionForm
+    template_name = 'transacciones/importacion_form.html'
     login_url = 'core:login'
 
-    def get(self, request, *args, **kwargs):
-        qs = filter_compras_qs(request)
-        total_filtrado = qs.aggregate(total=Sum('total'))['total'] or 0
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.request.GET.get('tipo') in ('ventas', 'compras'):
+            initial['tipo'] = self.request.GET['tipo']
+        return initial
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['columnas'] = COLUMNAS
+        context['columnas_opcionales'] = COLUMNAS_OPCIONALES
+        return context
 
-        html_string = render_to_string('transacciones/compra_list_pdf.html', {
-            'compras': qs,
-            'total_filtrado': total_filtrado,
-            'generated_at': timezone.localtime(),
-        })
+    def form_valid(self, form):
+        form.instance.usuario = self.request.user
+        return super().form_valid(form)
 
-        pdf_file = HTML(string=html_string).write_pdf()
+    def get_success_url(self):
+        return reverse('transacciones:importacion_detail', args=[self.object.pk])
 
-        response = HttpResponse(pdf_file, content_type='application/pdf')
-        response['Content-Disposition'] = 'attachment; filename=compras.pdf'
-        return response
 
+class ImportacionDetailView(LoginRequiredMixin, DetailView):
+    """
+    Estado de una importación del usuario.
+    Con ?format=json devuelve el estado para que la página lo consulte periódicamente.
+    """
+    model = ImportacionTransacciones
+    template_name = 'transacciones/importacion_detail.html'
+    context_object_name = 'importacion'
+    login_url = 'core:login'
+
+    def get_queryset(self):
+        return ImportacionTransacciones.objects.filter(usuario=self.request.user)
+
+    def render_to_response(self, context, **response_kwargs):
+        if self.request.GET.get('format') == 'json':
+            importacion = self.object
+            return JsonResponse({
+                'estado': importacion.estado,
+                'estado_display': importacion.get_estado_display(),
+                'error': importacion.error,
+                'documentos_creados': importacion.documentos_creados,
+                'lineas_creadas': importacion.lineas_creadas,
+                'filas_con_error': importacion.filas_con_error,
+                'url_reporte': (
+                    reverse('transacciones:importacion_reporte', args=[importacion.pk])
+                    if importacion.reporte else None
+                ),
+            })
+        return super().render_to_response(context, **response_kwargs)
+
+
+class ImportacionReporteView(LoginRequiredMixin, View):
+    """Descarga el CSV con las filas rechazadas de una importación."""
+    login_url = 'core:login'
+
+    def get(self, request, pk):
+        importacion = get_object_or_404(ImportacionTransacciones, pk=pk, usuario=request.user)
+        if not importacion.reporte:
+            raise Http404('La importación no tiene reporte de errores.')
+        return FileResponse(
+            importacion.reporte.open('rb'),
+            as_attachment=True,
+            filename=f'errores_importacion_{importacion.pk}.csv'
+        )